@@ -0,0 +1,239 @@
+# benchmarks/carga.py
+"""
+Generador de carga en proceso: reproduce archivos de payloads (JSONL) contra
+la aplicación FastAPI a una concurrencia fija, sin red ni servidor aparte
+(transporte ASGI de httpx, con el mismo lifespan del servidor).
+
+Cada línea del archivo es un envoltorio {"ruta", "cuerpo", "metodo"?,
+"cabeceras"?} o, con --ruta, directamente el cuerpo JSON de la request. Los
+payloads se envían en orden, ciclando, desde `concurrencia` clientes que
+esperan cada respuesta antes de mandar la siguiente. Informa por ruta y en
+total las latencias p50/p95/p99, requests por segundo y códigos de estado, y
+la memoria residente del proceso durante la prueba. Las latencias incluyen
+el cliente httpx, que corre en el mismo event loop.
+
+Uso:
+    python benchmarks/carga.py --generar benchmarks/payloads --filas 2000
+    python benchmarks/carga.py benchmarks/payloads/*.jsonl --concurrencia 16 --segundos 20 --salida carga.json
+    python benchmarks/carga.py cuerpos.jsonl --ruta /api/v1/fraud/predict --peticiones 5000
+    python benchmarks/comparar.py base.json carga.json
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import random
+import time
+from collections import Counter, defaultdict
+from typing import Dict, List, NamedTuple, Optional
+
+import httpx
+
+from comun import MODELOS, entorno, guardar, latencias
+from core.ejemplos import EJEMPLOS
+from core.memoria import uso_memoria
+import main
+
+# Endpoint de una fila y de lote de cada modelo
+RUTAS = {
+    "fraude": ("/api/v1/fraud/predict", "/api/v1/fraud/predict/batch"),
+    "fuga": ("/fuga/predecir", "/fuga/predecir/lote"),
+    "morosidad": ("/morosidad/predict", "/morosidad/predict/lote"),
+    "retiro_atm": ("/retiro_atm/predecir", "/retiro_atm/predecir/lote"),
+}
+
+# Campos continuos que varían entre los payloads generados (el resto queda
+# como en el ejemplo); sin variación la caché de predicciones respondería todo
+VARIABLES = {
+    "fraude": ("amt", "city_pop"),
+    "fuga": ("Balance", "EstimatedSalary"),
+    "morosidad": ("LIMIT_BAL", "BILL_AMT1", "BILL_AMT2", "PAY_AMT1", "PAY_AMT2"),
+    "retiro_atm": ("lag1", "lag5", "lag7", "lag11", "media_movil_3d"),
+}
+
+# Intervalo de muestreo de la memoria residente
+MUESTREO_MEMORIA_S = 0.25
+
+
+class Payload(NamedTuple):
+    metodo: str
+    ruta: str
+    cuerpo: bytes
+    cabeceras: Dict[str, str]
+
+
+def variar(modelo: str, aleatorio: random.Random, indice: int) -> Dict:
+    fila = dict(EJEMPLOS[modelo])
+    for campo in VARIABLES[modelo]:
+        valor = fila[campo] * aleatorio.uniform(0.5, 1.5)
+        fila[campo] = round(valor) if isinstance(fila[campo], int) else round(valor, 2)
+    if modelo == "fraude":
+        fila["transaction_id"] = f"TXN-{indice:07d}"
+    return fila
+
+
+def generar_payloads(directorio: str, filas: int, tamano_lote: int, semilla: int) -> List[str]:
+    """
+    Escribe <modelo>.jsonl (una fila por request) y <modelo>_lote.jsonl
+    (`tamano_lote` filas por request) con variaciones deterministas de los ejemplos.
+    """
+    os.makedirs(directorio, exist_ok=True)
+    archivos = []
+    for modelo in MODELOS:
+        aleatorio = random.Random(f"{semilla}-{modelo}")
+        datos = [variar(modelo, aleatorio, i) for i in range(filas)]
+        ruta_fila, ruta_lote = RUTAS[modelo]
+        for nombre, lineas in (
+            (f"{modelo}.jsonl", ({"ruta": ruta_fila, "cuerpo": fila} for fila in datos)),
+            (f"{modelo}_lote.jsonl", ({"ruta": ruta_lote, "cuerpo": datos[i:i + tamano_lote]}
+                                      for i in range(0, filas, tamano_lote))),
+        ):
+            archivo = os.path.join(directorio, nombre)
+            with open(archivo, "w", encoding="utf-8") as salida:
+                for linea in lineas:
+                    salida.write(json.dumps(linea, ensure_ascii=False) + "\n")
+            archivos.append(archivo)
+    return archivos
+
+
+def leer_payloads(archivos: List[str], ruta: Optional[str]) -> List[Payload]:
+    """
+    Payloads de los archivos intercalados (uno de cada archivo por turno), con
+    el cuerpo ya serializado para no medir la codificación del cliente.
+
+    Raises:
+        ValueError: Si una línea no es un envoltorio y no se indicó --ruta.
+    """
+    por_archivo = []
+    for archivo in archivos:
+        payloads = []
+        with open(archivo, encoding="utf-8") as entrada:
+            for numero, linea in enumerate(entrada, start=1):
+                if not linea.strip():
+                    continue
+                dato = json.loads(linea)
+                if isinstance(dato, dict) and "ruta" in dato and "cuerpo" in dato:
+                    cabeceras = {"content-type": "application/json", **dato.get("cabeceras", {})}
+                    payloads.append(Payload(dato.get("metodo", "POST"), dato["ruta"],
+                                            json.dumps(dato["cuerpo"]).encode(), cabeceras))
+                elif ruta is not None:
+                    payloads.append(Payload("POST", ruta, json.dumps(dato).encode(),
+                                            {"content-type": "application/json"}))
+                else:
+                    raise ValueError(f"{archivo}:{numero}: la línea no tiene 'ruta' y 'cuerpo'; indique --ruta")
+        por_archivo.append(payloads)
+    return [p for grupo in itertools.zip_longest(*por_archivo) for p in grupo if p is not None]
+
+
+async def _muestrear_memoria(muestras: List[float], detener: asyncio.Event) -> None:
+    while not detener.is_set():
+        uso = uso_memoria(os.getpid())
+        if uso is not None:
+            muestras.append(uso["rss_mb"])
+        try:
+            await asyncio.wait_for(detener.wait(), MUESTREO_MEMORIA_S)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def reproducir(payloads: List[Payload], concurrencia: int, segundos: Optional[float],
+                     peticiones: Optional[int], calentamiento: int) -> Dict:
+    """Envía los payloads con `concurrencia` clientes hasta agotar el tiempo o las peticiones"""
+    registros = []
+    memoria: List[float] = []
+
+    async with main.app.router.lifespan_context(main.app):
+        transporte = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transporte, base_url="http://benchmark", timeout=None) as cliente:
+            for payload in payloads[:calentamiento]:
+                await cliente.request(payload.metodo, payload.ruta, content=payload.cuerpo, headers=payload.cabeceras)
+
+            turnos = itertools.count()
+            inicio = time.perf_counter()
+            fin = inicio + segundos if segundos else None
+
+            async def cliente_virtual():
+                for turno in turnos:
+                    if (peticiones is not None and turno >= peticiones) or (fin is not None and time.perf_counter() >= fin):
+                        return
+                    payload = payloads[turno % len(payloads)]
+                    antes = time.perf_counter()
+                    respuesta = await cliente.request(payload.metodo, payload.ruta,
+                                                      content=payload.cuerpo, headers=payload.cabeceras)
+                    registros.append((payload.ruta, respuesta.status_code, time.perf_counter() - antes))
+
+            detener = asyncio.Event()
+            muestreo = asyncio.create_task(_muestrear_memoria(memoria, detener))
+            await asyncio.gather(*(cliente_virtual() for _ in range(concurrencia)))
+            duracion = time.perf_counter() - inicio
+            detener.set()
+            await muestreo
+        datos_entorno = entorno()
+
+    por_ruta = defaultdict(list)
+    for ruta, estado, segundos_request in registros:
+        por_ruta[ruta].append((estado, segundos_request))
+
+    def resumen(clave: str, filas) -> Dict:
+        estados = Counter(estado for estado, _ in filas)
+        return {
+            "clave": clave,
+            **latencias([s for _, s in filas], duracion),
+            "errores": sum(n for estado, n in estados.items() if estado >= 400),
+            "estados": {str(estado): n for estado, n in sorted(estados.items())},
+        }
+
+    resultados = [resumen(ruta, filas) for ruta, filas in sorted(por_ruta.items())]
+    total = resumen("total", [(estado, s) for _, estado, s in registros])
+    if memoria:
+        total.update(rss_inicial_mb=memoria[0], rss_max_mb=max(memoria), rss_final_mb=memoria[-1])
+    resultados.append(total)
+    return {"entorno": datos_entorno, "duracion_s": round(duracion, 3), "resultados": resultados}
+
+
+def main_benchmark(argv=None) -> Optional[Dict]:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("archivos", nargs="*", help="Archivos JSONL de payloads")
+    parser.add_argument("--ruta", default=None, help="Ruta de los archivos con un cuerpo por línea")
+    parser.add_argument("--concurrencia", type=int, default=8, help="Clientes simultáneos")
+    parser.add_argument("--segundos", type=float, default=10.0, help="Duración de la prueba")
+    parser.add_argument("--peticiones", type=int, default=None, help="Total de requests (en lugar de --segundos)")
+    parser.add_argument("--calentamiento", type=int, default=50, help="Requests previas que no se miden")
+    parser.add_argument("--generar", metavar="DIRECTORIO", default=None,
+                        help="Escribe archivos de payloads de ejemplo y termina")
+    parser.add_argument("--filas", type=int, default=2000, help="Filas a generar por modelo")
+    parser.add_argument("--tamano-lote", type=int, default=64, help="Filas por request en los archivos _lote")
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--salida", default=None, help="Archivo JSON con los resultados")
+    args = parser.parse_args(argv)
+
+    if args.generar:
+        for archivo in generar_payloads(args.generar, args.filas, args.tamano_lote, args.semilla):
+            print(archivo)
+        return None
+    if not args.archivos:
+        parser.error("indique al menos un archivo de payloads (o --generar)")
+
+    payloads = leer_payloads(args.archivos, args.ruta)
+    if not payloads:
+        parser.error("los archivos no tienen payloads")
+    informe = asyncio.run(reproducir(
+        payloads, args.concurrencia, None if args.peticiones else args.segundos, args.peticiones, args.calentamiento
+    ))
+    informe = {"tipo": "carga", "archivos": args.archivos, "concurrencia": args.concurrencia, **informe}
+
+    print(f"\n{'ruta':<32} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errores':>8}")
+    for fila in informe["resultados"]:
+        if fila["llamadas"]:
+            print(f"{fila['clave']:<32} {fila['llamadas_s']:>9} {fila['p50_ms']:>9} "
+                  f"{fila['p95_ms']:>9} {fila['p99_ms']:>9} {fila['errores']:>8}")
+    total = informe["resultados"][-1]
+    if "rss_max_mb" in total:
+        print(f"RSS: {total['rss_inicial_mb']} MB al inicio, {total['rss_max_mb']} MB máximo")
+    guardar(informe, args.salida)
+    return informe
+
+
+if __name__ == "__main__":
+    main_benchmark()
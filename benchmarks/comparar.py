@@ -0,0 +1,111 @@
+# benchmarks/comparar.py
+"""
+Compara dos informes de benchmarks/micro.py o benchmarks/carga.py y marca
+las regresiones: latencias o memoria que suben, o rendimiento que baja, más
+allá del umbral relativo. Termina con código 1 si hay alguna, para usarlo
+en CI.
+
+Uso:
+    python benchmarks/comparar.py base.json nuevo.json
+    python benchmarks/comparar.py base.json nuevo.json --umbral 0.05 --metricas p50_ms,p99_ms
+"""
+import argparse
+import json
+import sys
+from typing import Dict, List, Optional
+
+# Métricas comparadas y si un valor mayor es mejor
+METRICAS = {
+    "filas_s": True,
+    "llamadas_s": True,
+    "media_ms": False,
+    "p50_ms": False,
+    "p95_ms": False,
+    "p99_ms": False,
+    "rss_max_mb": False,
+}
+
+# Datos del entorno que, si cambian, hacen dudosa la comparación
+_ENTORNO_RELEVANTE = ("nucleos", "python", "paquetes", "modelos", "configuracion")
+
+
+def _leer(ruta: str) -> Dict:
+    with open(ruta, encoding="utf-8") as archivo:
+        return json.load(archivo)
+
+
+def diferencias_entorno(base: Dict, nuevo: Dict) -> List[str]:
+    entorno_base, entorno_nuevo = base.get("entorno", {}), nuevo.get("entorno", {})
+    return [
+        f"{clave}: {entorno_base.get(clave)} -> {entorno_nuevo.get(clave)}"
+        for clave in _ENTORNO_RELEVANTE
+        if entorno_base.get(clave) != entorno_nuevo.get(clave)
+    ]
+
+
+def comparar(base: Dict, nuevo: Dict, umbral: float, metricas: Optional[List[str]] = None) -> List[Dict]:
+    """
+    Una fila por caso y métrica presentes en ambos informes, con el cambio
+    relativo y si es una regresión o una mejora mayor que `umbral`.
+
+    Raises:
+        ValueError: Si los informes son de tipos distintos.
+    """
+    if base.get("tipo") != nuevo.get("tipo"):
+        raise ValueError(f"No se pueden comparar informes '{base.get('tipo')}' y '{nuevo.get('tipo')}'")
+    nuevos = {fila["clave"]: fila for fila in nuevo.get("resultados", [])}
+    filas = []
+    for anterior in base.get("resultados", []):
+        actual = nuevos.get(anterior["clave"])
+        if actual is None:
+            continue
+        for metrica, mayor_es_mejor in METRICAS.items():
+            if metricas and metrica not in metricas:
+                continue
+            valor_base, valor_nuevo = anterior.get(metrica), actual.get(metrica)
+            if not valor_base or valor_nuevo is None:
+                continue
+            cambio = (valor_nuevo - valor_base) / valor_base
+            empeora = -cambio if mayor_es_mejor else cambio
+            filas.append({
+                "clave": anterior["clave"], "metrica": metrica, "base": valor_base, "nuevo": valor_nuevo,
+                "cambio": cambio,
+                "estado": "regresion" if empeora > umbral else "mejora" if empeora < -umbral else "igual",
+            })
+    return filas
+
+
+def main_comparar(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("base")
+    parser.add_argument("nuevo")
+    parser.add_argument("--umbral", type=float, default=0.10, help="Cambio relativo tolerado (0.10 = 10%%)")
+    parser.add_argument("--metricas", default=None, help="Métricas a comparar, separadas por coma")
+    parser.add_argument("--salida", default=None, help="Archivo JSON con la comparación")
+    args = parser.parse_args(argv)
+
+    base, nuevo = _leer(args.base), _leer(args.nuevo)
+    for diferencia in diferencias_entorno(base, nuevo):
+        print(f"[WARN] Entorno distinto, {diferencia}")
+    try:
+        filas = comparar(base, nuevo, args.umbral, args.metricas.split(",") if args.metricas else None)
+    except ValueError as e:
+        parser.error(str(e))
+
+    marcas = {"regresion": "REGRESIÓN", "mejora": "mejora", "igual": ""}
+    print(f"{'caso':<32} {'métrica':<11} {'base':>11} {'nuevo':>11} {'cambio':>8}")
+    for fila in filas:
+        print(f"{fila['clave']:<32} {fila['metrica']:<11} {fila['base']:>11} {fila['nuevo']:>11} "
+              f"{fila['cambio']:>+8.1%} {marcas[fila['estado']]}")
+
+    regresiones = [fila for fila in filas if fila["estado"] == "regresion"]
+    print(f"\n{len(regresiones)} regresiones sobre {len(filas)} métricas (umbral {args.umbral:.0%})")
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as archivo:
+            json.dump({"base": args.base, "nuevo": args.nuevo, "umbral": args.umbral, "filas": filas},
+                      archivo, indent=2, ensure_ascii=False)
+    return 1 if regresiones else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_comparar())
@@ -0,0 +1,122 @@
+# benchmarks/comun.py
+"""
+Utilidades compartidas por los benchmarks: llamadas de lote por modelo,
+medición de latencias y el formato de los informes JSON que compara
+benchmarks/comparar.py.
+"""
+import json
+import os
+import platform
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Sequence
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, os.path.join(RAIZ, "src"))
+
+import numpy as np
+
+import main  # noqa: F401  (registra los modelos)
+from core.ejemplos import EJEMPLOS
+from core.hilos import nucleos_disponibles
+from core.registro import registro
+
+MODELOS = ("fraude", "fuga", "morosidad", "retiro_atm")
+
+
+def llamadas(filas: int) -> Dict[str, Callable[[], object]]:
+    """Una llamada de lote por modelo, por el mismo camino que usan los endpoints"""
+    from fraude.schema.inputs import FraudInput
+    from morosidad.schema import MorosidadRequest
+    from morosidad.service import predecir_morosidad_lote
+    from src.retiro_atm.schema import InputDataRetiroAtm
+
+    fraude = [FraudInput(**EJEMPLOS["fraude"])] * filas
+    fuga = [dict(EJEMPLOS["fuga"])] * filas
+    morosidad = [MorosidadRequest(**EJEMPLOS["morosidad"])] * filas
+    retiro = [InputDataRetiroAtm(**EJEMPLOS["retiro_atm"])] * filas
+    return {
+        "fraude": lambda: registro.obtener("fraude").predict_batch(fraude),
+        "fuga": lambda: registro.obtener("fuga").predict_batch(fuga),
+        "morosidad": lambda: predecir_morosidad_lote(morosidad),
+        "retiro_atm": lambda: registro.obtener("retiro_atm").predecir_retiro_lote(retiro),
+    }
+
+
+def latencias(segundos: Sequence[float], duracion: float) -> Dict:
+    """Conteo, ritmo y percentiles (en milisegundos) de una serie de duraciones"""
+    ms = np.asarray(segundos, dtype=float) * 1000
+    if ms.size == 0:
+        return {"llamadas": 0, "llamadas_s": 0.0}
+    return {
+        "llamadas": int(ms.size),
+        "llamadas_s": round(ms.size / duracion, 1),
+        "media_ms": round(float(ms.mean()), 3),
+        "p50_ms": round(float(np.percentile(ms, 50)), 3),
+        "p95_ms": round(float(np.percentile(ms, 95)), 3),
+        "p99_ms": round(float(np.percentile(ms, 99)), 3),
+    }
+
+
+def medir(llamada: Callable[[], object], concurrencia: int, segundos: float) -> Dict:
+    """Llama en bucle desde `concurrencia` hilos durante `segundos` y resume las latencias"""
+    duraciones: List[float] = []
+    lock = threading.Lock()
+    fin = time.perf_counter() + segundos
+
+    def bucle():
+        propias = []
+        while time.perf_counter() < fin:
+            inicio = time.perf_counter()
+            llamada()
+            propias.append(time.perf_counter() - inicio)
+        with lock:
+            duraciones.extend(propias)
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrencia) as pool:
+        for futuro in [pool.submit(bucle) for _ in range(concurrencia)]:
+            futuro.result()
+    return latencias(duraciones, time.perf_counter() - inicio)
+
+
+def _commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=RAIZ, capture_output=True,
+                              text=True, check=True, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def entorno() -> Dict:
+    """Datos de la máquina, del código y de los modelos para interpretar (y comparar) un informe"""
+    versiones = {}
+    for paquete in ("numpy", "pandas", "sklearn", "xgboost", "fastapi"):
+        try:
+            versiones[paquete] = __import__(paquete).__version__
+        except ImportError:
+            versiones[paquete] = None
+    return {
+        "fecha": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": _commit(),
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "nucleos": nucleos_disponibles(),
+        "paquetes": versiones,
+        "modelos": {modelo: version.version for modelo in MODELOS
+                    if (version := registro.version(modelo)) is not None},
+        "configuracion": {clave: valor for clave, valor in sorted(os.environ.items())
+                          if clave.startswith("BANKMIND_")},
+    }
+
+
+def guardar(informe: Dict, ruta: Optional[str]) -> None:
+    if ruta:
+        with open(ruta, "w", encoding="utf-8") as archivo:
+            json.dump(informe, archivo, indent=2, ensure_ascii=False)
+        print(f"\nResultados guardados en {ruta}")
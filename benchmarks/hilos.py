@@ -0,0 +1,82 @@
+# benchmarks/hilos.py
+"""
+Barrido de hilos por llamada × inferencias concurrentes para cada modelo.
+
+Carga los modelos como lo hace el servidor y, para cada combinación, lanza
+`concurrencia` hilos que llaman en bucle al lote del modelo durante unos
+segundos. Informa filas por segundo y latencias p50/p99 por llamada, y la
+mejor combinación de cada modelo como variables de entorno listas para usar.
+
+Uso:
+    python benchmarks/hilos.py --modelos fraude,fuga --hilos 1,2,4 --concurrencia 1,2,4,8
+    python benchmarks/hilos.py --filas 64 --p99-objetivo-ms 50 --salida hilos.json
+"""
+import argparse
+from typing import Dict, List, Optional
+
+from comun import entorno, guardar, llamadas, medir
+from core.hilos import aplicar_hilos, nucleos_disponibles
+from core.registro import registro
+
+
+def mejor(resultados: List[Dict], p99_objetivo_ms: Optional[float]) -> Dict:
+    """Mayor rendimiento entre las combinaciones que cumplen el objetivo de p99 (o entre todas)"""
+    candidatos = [r for r in resultados if p99_objetivo_ms is None or r["p99_ms"] <= p99_objetivo_ms]
+    return max(candidatos or resultados, key=lambda r: r["filas_s"])
+
+
+def _enteros(texto: str) -> List[int]:
+    return [int(valor) for valor in texto.split(",") if valor]
+
+
+def main_benchmark(argv=None) -> Dict:
+    nucleos = nucleos_disponibles()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modelos", default="fraude,fuga,morosidad,retiro_atm")
+    parser.add_argument("--hilos", default=",".join(str(h) for h in sorted({1, 2, 4, nucleos}) if h <= nucleos),
+                        help="Hilos por llamada a probar (BANKMIND_HILOS_MODELO)")
+    parser.add_argument("--concurrencia", default="1,2,4,8",
+                        help="Inferencias concurrentes a probar (BANKMIND_HILOS_INFERENCIA)")
+    parser.add_argument("--filas", type=int, default=1, help="Filas por llamada")
+    parser.add_argument("--segundos", type=float, default=3.0, help="Duración de cada medición")
+    parser.add_argument("--p99-objetivo-ms", type=float, default=None,
+                        help="Descarta las combinaciones con p99 mayor al elegir la mejor")
+    parser.add_argument("--salida", default=None, help="Archivo JSON con todos los resultados")
+    args = parser.parse_args(argv)
+
+    registro.cargar_pendientes(incluir_diferidos=True)
+    funciones = llamadas(args.filas)
+    informe = {"tipo": "hilos", "entorno": entorno(), "nucleos": nucleos, "filas": args.filas,
+               "segundos": args.segundos, "modelos": {}}
+
+    for modelo in args.modelos.split(","):
+        version = registro.version(modelo)
+        if version is None:
+            print(f"[WARN] Modelo '{modelo}' no disponible; se omite")
+            continue
+        funciones[modelo]()  # calentamiento
+        resultados = []
+        print(f"\n{modelo}\n{'hilos':>6} {'conc':>5} {'filas/s':>10} {'p50 ms':>9} {'p99 ms':>9}")
+        for hilos in _enteros(args.hilos):
+            aplicar_hilos(modelo, version.artefacto, hilos)
+            for concurrencia in _enteros(args.concurrencia):
+                medicion = medir(funciones[modelo], concurrencia, args.segundos)
+                fila = {"hilos": hilos, "concurrencia": concurrencia,
+                        "filas_s": round(medicion["llamadas_s"] * args.filas, 1), **medicion}
+                resultados.append(fila)
+                print(f"{hilos:>6} {concurrencia:>5} {fila['filas_s']:>10} {fila['p50_ms']:>9} {fila['p99_ms']:>9}")
+        # Deja el modelo como lo configura el servidor
+        aplicar_hilos(modelo, version.artefacto)
+
+        elegido = mejor(resultados, args.p99_objetivo_ms)
+        informe["modelos"][modelo] = {"resultados": resultados, "mejor": elegido}
+        print(f"-> mejor: BANKMIND_HILOS_MODELO_{modelo.upper()}={elegido['hilos']} "
+              f"BANKMIND_HILOS_INFERENCIA_{modelo.upper()}={elegido['concurrencia']} "
+              f"({elegido['filas_s']} filas/s, p99 {elegido['p99_ms']} ms)")
+
+    guardar(informe, args.salida)
+    return informe
+
+
+if __name__ == "__main__":
+    main_benchmark()
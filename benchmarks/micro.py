@@ -0,0 +1,101 @@
+# benchmarks/micro.py
+"""
+Micro-benchmarks de cada modelo: una fila, un lote y un lote grande, llamando
+al servicio directamente (sin HTTP), con el tiempo medio de cada etapa del pipeline.
+
+Cada caso se calienta, se mide durante unos segundos en un solo hilo y se
+informa en llamadas y filas por segundo con latencias media/p50/p95/p99. Las
+etapas salen de los mismos cronómetros `etapa(...)` que publica /metrics, así
+que el desglose coincide con lo que se ve en producción.
+
+En fraude el lote grande se mide también con el camino de pandas (sin el
+puntuador fusionado), como referencia de que el fusionado no es más lento.
+
+Uso:
+    python benchmarks/micro.py --salida micro.json
+    python benchmarks/micro.py --modelos fraude --lote 1024 --lote-grande 30000 --segundos 5 --salida fraude.json
+    python benchmarks/comparar.py base.json micro.json
+"""
+import argparse
+from typing import Callable, Dict, List
+
+from comun import MODELOS, entorno, guardar, llamadas, medir
+from core.metricas import estadisticas_etapas, muestreo
+from core.registro import registro
+
+
+def _etapas(modelo: str) -> Dict[str, Dict]:
+    return estadisticas_etapas().get(modelo, {})
+
+
+def tiempos_etapas(antes: Dict[str, Dict], despues: Dict[str, Dict], llamadas: int) -> Dict[str, float]:
+    """Microsegundos por llamada de cada etapa medida entre dos instantáneas"""
+    tiempos = {}
+    for nombre, actual in despues.items():
+        previa = antes.get(nombre, {"suma": 0.0, "total": 0})
+        # Etapas que el caso no recorre (p. ej. las de pandas con el camino fusionado)
+        if actual["total"] == previa["total"]:
+            continue
+        tiempos[nombre] = round((actual["suma"] - previa["suma"]) * 1e6 / llamadas, 2)
+    return tiempos
+
+
+def sin_fusionar(llamada: Callable[[], object]) -> Callable[[], object]:
+    """La misma llamada de fraude por el camino de pandas (IF y XGBoost sin fusionar)"""
+    def referencia():
+        servicio = registro.obtener("fraude")
+        puntuador, servicio.puntuador = servicio.puntuador, None
+        try:
+            return llamada()
+        finally:
+            servicio.puntuador = puntuador
+    return referencia
+
+
+def main_benchmark(argv=None) -> Dict:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modelos", default=",".join(MODELOS))
+    parser.add_argument("--lote", type=int, default=256, help="Filas del caso de lote")
+    parser.add_argument("--lote-grande", type=int, default=5000, help="Filas del caso de lote grande")
+    parser.add_argument("--segundos", type=float, default=3.0, help="Duración de cada medición")
+    parser.add_argument("--salida", default=None, help="Archivo JSON con los resultados")
+    args = parser.parse_args(argv)
+
+    registro.cargar_pendientes(incluir_diferidos=True)
+    # Todas las llamadas miden sus etapas, aunque el entorno tenga el muestreo reducido
+    muestreo.activo, muestreo.fraccion = True, 1.0
+    casos = {"fila": (1, llamadas(1)), "lote": (args.lote, llamadas(args.lote)),
+             "lote_grande": (args.lote_grande, llamadas(args.lote_grande))}
+    casos["lote_grande_sin_fusionar"] = (args.lote_grande, {"fraude": sin_fusionar(casos["lote_grande"][1]["fraude"])})
+    resultados: List[Dict] = []
+
+    print(f"{'caso':<34} {'filas/s':>11} {'media ms':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for modelo in args.modelos.split(","):
+        if registro.version(modelo) is None:
+            print(f"[WARN] Modelo '{modelo}' no disponible; se omite")
+            continue
+        for caso, (filas, funciones) in casos.items():
+            if modelo not in funciones:
+                continue
+            funciones[modelo]()  # calentamiento
+            antes = _etapas(modelo)
+            medicion = medir(funciones[modelo], 1, args.segundos)
+            fila = {
+                "clave": f"{modelo}/{caso}", "modelo": modelo, "caso": caso, "filas": filas,
+                "filas_s": round(medicion["llamadas_s"] * filas, 1), **medicion,
+                "etapas_us": tiempos_etapas(antes, _etapas(modelo), medicion["llamadas"]),
+            }
+            resultados.append(fila)
+            print(f"{fila['clave']:<34} {fila['filas_s']:>11} {fila['media_ms']:>9} "
+                  f"{fila['p50_ms']:>9} {fila['p95_ms']:>9} {fila['p99_ms']:>9}")
+            print("    " + "  ".join(f"{nombre} {us} µs" for nombre, us in fila["etapas_us"].items()))
+
+    informe = {"tipo": "micro", "entorno": entorno(), "lote": args.lote, "lote_grande": args.lote_grande,
+               "segundos": args.segundos,
+               "resultados": resultados}
+    guardar(informe, args.salida)
+    return informe
+
+
+if __name__ == "__main__":
+    main_benchmark()
@@ -1,7 +1,11 @@
 # main.py
 import sys
 import os
-from fastapi import BackgroundTasks, FastAPI, HTTPException
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Optional
+from fastapi import BackgroundTasks, Depends, FastAPI, File, HTTPException, Query, Request, UploadFile
+from fastapi.responses import FileResponse, JSONResponse, Response
 
 # Agregar src al path para importaciones
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src/'))
@@ -9,42 +13,90 @@ sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src/'))
 #Dependencis Internas
 from src.retiro_atm.schema.input_retiro_atm import InputDataRetiroAtm
 from src.retiro_atm.schema.output_retiro_atm import OutputDataRetiroAtm
-from src.retiro_atm.service.service_prediction_retiro_atm import ServicioPredicticionRetiroAtm
 
 # 2. Importaciones
 try:
-    from fuga.schema.inputs import ChurnInput
-    from fuga.service.churn_service import churn_service
+    from fuga.schema.inputs import ChurnInput, ChurnWhatIfInput
+    import fuga.service.churn_service
 except ImportError as e:
     print(f"Error de importación: {e}")
     sys.exit(1)
 
+# Importar Routers (registran sus modelos; la carga ocurre en el lifespan)
+from src.fraude.router import router as fraud_router
+from src.morosidad.router import router as morosidad_router
+from src.retiro_atm.router import guardar_almacen, router as retiro_atm_router
+from core.router import router as core_router
+from core.admision import SolicitudRechazadaError, admision
+from core.batching import registrar_batcher
+from core.cache import registrar_cache
+from core.columnar import LoteColumnar, cuerpo_openapi, leer_lote, respuesta_columnar
+from core.config import obtener_bool, obtener_entero
+from core import prefork
+from core.ejecutor import ColaLlenaError, obtener_ejecutor
+from core.exportador import CONTENT_TYPE_PROMETHEUS, MiddlewareMetricas, texto_prometheus
+from core.registro import ModeloNoDisponibleError, registro
+from core.respuestas import respuesta_json, respuesta_lote, respuesta_rapida
+from core.trabajos import TrabajoNoEncontradoError, TrabajosSaturadosError, gestor_trabajos, tipos_trabajo
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Arranque: carga en paralelo los modelos no diferidos (BANKMIND_CARGA_DIFERIDA_<MODELO>=1
+    deja un modelo para su primer uso). Con BANKMIND_CARGA_BLOQUEANTE=0 el servidor
+    acepta requests mientras carga y /listo responde 503 hasta que termine.
+    Apagado: guarda el historial de retiros de los cajeros. Con varios workers
+    prefork el historial no cambia (POST /retiro_atm/historial responde 409),
+    así que ningún worker lo reescribe.
+    """
+    carga = asyncio.get_running_loop().run_in_executor(None, registro.cargar_pendientes)
+    if obtener_bool("CARGA_BLOQUEANTE", True):
+        await carga
+    yield
+    if not prefork.multiples_workers():
+        guardar_almacen()
+
 # Iniciar la aplicación FastAPI
 app = FastAPI(
     title="BankMind API",
     description="API para detección de fraudes y otros modelos bancarios",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
-# Importar Routers
-from src.fraude.router import router as fraud_router
-from src.morosidad.router import router as morosidad_router
-
 # Registrar Routers
 app.include_router(fraud_router)
 app.include_router(morosidad_router)
+app.include_router(retiro_atm_router)
+app.include_router(core_router)
+
+#Latencia y conteo de todas las requests (se exponen en /metrics)
+app.add_middleware(MiddlewareMetricas)
+
+#Requests descartadas por el control de admisión: 503 con el tiempo sugerido para reintentar
+@app.exception_handler(SolicitudRechazadaError)
+async def solicitud_rechazada(request: Request, exc: SolicitudRechazadaError):
+    return JSONResponse({"detail": str(exc)}, status_code=503, headers={"Retry-After": str(exc.reintentar_s)})
+
+#Micro-batching: las requests concurrentes comparten una sola llamada al modelo
+retiro_batcher = registrar_batcher("retiro_atm", lambda lote: registro.obtener("retiro_atm").predecir_retiro_lote(lote))
+churn_batcher = registrar_batcher("fuga", lambda lote: registro.obtener("fuga").predict_batch(lote, raise_errors=True))
 
-#Instanciamos Servicios
-servicioPrediccionRetiro = ServicioPredicticionRetiroAtm()
+#Cache de predicciones por modelo (BANKMIND_CACHE_<MODELO>=1 para activarla)
+retiro_cache = registrar_cache("retiro_atm")
+churn_cache = registrar_cache("fuga")
 
 #Codigo base
-@app.post("/retiro_atm/predecir",tags=["Predicción del Retiro de Efectivo en ATM"])
+@app.post("/retiro_atm/predecir",tags=["Predicción del Retiro de Efectivo en ATM"],dependencies=[Depends(admision("retiro_atm"))])
 async def predecir_temperatura(input_data: InputDataRetiroAtm ) -> OutputDataRetiroAtm:
     """
     Endpoint para predecir el monto ha retirar en un solo dia en un ATM.
     """
     try:
-        return servicioPrediccionRetiro.predecir_retiro(input_data)
+        resultado = await retiro_cache.obtener(input_data, lambda: retiro_batcher.enviar(input_data))
+        return respuesta_json(resultado) if respuesta_rapida("retiro_atm") else resultado
+    except (ColaLlenaError, ModeloNoDisponibleError) as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail="Error interno del servidor")
     
@@ -56,16 +108,173 @@ async def health():
     """
     return {"mensaje": "ESTOY VIVO."}
 
-@app.post("/fuga/predecir")
-def predict_churn(data: ChurnInput):
+@app.get("/listo",tags=["Verificación de la disponibilidad de la api"])
+def readiness():
+    """
+    Endpoint de readiness: 200 cuando todos los modelos no diferidos están cargados,
+    503 mientras cargan o si alguno falló. Informa el estado y el tiempo de carga de cada modelo.
+    """
+    modelos = {}
+    for nombre, estado in registro.estado().items():
+        activa = estado["activa"] or {}
+        modelos[nombre] = {
+            "estado": estado["estado"],
+            "diferida": estado["diferida"],
+            "version": activa.get("version"),
+            "segundos_carga": activa.get("segundos_carga"),
+            "error": estado["error"],
+        }
+    listo = registro.listo()
+    return JSONResponse({"listo": listo, "modelos": modelos}, status_code=200 if listo else 503)
+
+@app.get("/metrics",tags=["Verificación de la disponibilidad de la api"])
+def metrics():
+    """
+    Histogramas y contadores en formato de texto de Prometheus: latencia HTTP,
+    duración de cada etapa de los pipelines, micro-batching, pools y cachés.
+    """
+    return Response(texto_prometheus(), media_type=CONTENT_TYPE_PROMETHEUS)
+
+@app.post("/fuga/predecir",dependencies=[Depends(admision("fuga"))])
+async def predict_churn(data: ChurnInput):
     input_data = data.model_dump()
-    result = churn_service.predict(input_data)
+    try:
+        # Los resultados con "error" no se guardan en la caché
+        result = await churn_cache.obtener(
+            input_data, lambda: churn_batcher.enviar(input_data), cacheable=lambda r: "error" not in r
+        )
+    except (ColaLlenaError, ModeloNoDisponibleError) as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
     
     if "error" in result:
         raise HTTPException(status_code=500, detail=result["error"])
-    return result
+    return respuesta_json(result) if respuesta_rapida("fuga") else result
+
+@app.post("/fuga/predecir/lote",dependencies=[Depends(admision("fuga_lote"))],openapi_extra=cuerpo_openapi(ChurnInput))
+async def predict_churn_batch(request: Request):
+    """
+    Predice la fuga de N clientes con una sola pasada del modelo.
+    Los resultados se devuelven en el mismo orden de entrada.
+    También acepta el lote en columnas (Arrow IPC o MessagePack) y responde en el mismo formato.
+    """
+    data = await leer_lote(request, ChurnInput)
+    try:
+        churn_service = registro.obtener("fuga")
+        if isinstance(data, LoteColumnar):
+            columns = await obtener_ejecutor("fuga").ejecutar(churn_service.predict_columns, data.columnas)
+            return respuesta_columnar(columns, data.formato)
+        input_list = [item.model_dump() for item in data]
+        # Las filas con features infinitas rechazan el lote con 422, como en el cuerpo columnar
+        results = await obtener_ejecutor("fuga").ejecutar(churn_service.predict_batch, input_list, True)
+    except (ColaLlenaError, ModeloNoDisponibleError) as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except RuntimeError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    for result in results:
+        if "error" in result:
+            raise HTTPException(status_code=500, detail=result["error"])
+    return respuesta_lote("fuga", results) if respuesta_rapida("fuga") else results
+
+@app.post("/fuga/simular",dependencies=[Depends(admision("fuga_simulacion"))])
+async def simulate_churn(data: ChurnWhatIfInput):
+    """
+    Análisis what-if de retención: evalúa todas las combinaciones de la grilla
+    de perturbaciones sobre un cliente con una sola pasada del modelo.
+    - **churn_probability**: Superficie de probabilidades, con un eje por campo de `fields`
+    - **cheapest**: Cambio de menor costo que baja la probabilidad al umbral o menos
+      (null si el cliente ya está bajo el umbral o ningún escenario lo logra)
+    """
+    try:
+        churn_service = registro.obtener("fuga")
+        return await obtener_ejecutor("fuga").ejecutar(
+            churn_service.what_if, data.customer.model_dump(), data.perturbations, data.costs
+        )
+    except (ColaLlenaError, ModeloNoDisponibleError) as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except RuntimeError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+#Trabajos asíncronos: el archivo se guarda, se responde el id y el puntuado corre en segundo plano
+@app.post("/trabajos/{modelo}", status_code=202, tags=["Trabajos"])
+def crear_trabajo(
+    modelo: str,
+    background_tasks: BackgroundTasks,
+    archivo: UploadFile = File(..., description="Dataset a puntuar (CSV, NDJSON o JSON según el modelo)"),
+    formato: Optional[str] = Query(None, description="Formato del archivo; por defecto se deduce de su nombre")
+):
+    """
+    Crea un trabajo de puntuación y devuelve su id de inmediato. El avance se
+    consulta en /trabajos/{id} y el resultado (NDJSON, una línea por fila de
+    entrada) se descarga de /trabajos/{id}/resultado.
+    """
+    if modelo not in tipos_trabajo():
+        raise HTTPException(status_code=404, detail=f"El modelo '{modelo}' no admite trabajos")
+    try:
+        trabajo = gestor_trabajos.crear(modelo, archivo.file, archivo.filename, archivo.content_type, formato)
+    except TrabajosSaturadosError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    # Se encola al terminar la respuesta
+    background_tasks.add_task(gestor_trabajos.encolar, trabajo.id)
+    return trabajo.describir()
+
+@app.get("/trabajos", tags=["Trabajos"])
+def listar_trabajos():
+    """
+    Trabajos de este proceso y formatos aceptados por cada modelo.
+    """
+    return {"modelos": tipos_trabajo(), "trabajos": gestor_trabajos.listar()}
+
+@app.get("/trabajos/{id_trabajo}", tags=["Trabajos"])
+def estado_trabajo(id_trabajo: str):
+    """
+    Estado, filas procesadas y progreso (0 a 1) del trabajo.
+    """
+    try:
+        return gestor_trabajos.obtener(id_trabajo)
+    except TrabajoNoEncontradoError:
+        raise HTTPException(status_code=404, detail="Trabajo no encontrado")
+
+@app.get("/trabajos/{id_trabajo}/resultado", tags=["Trabajos"])
+def resultado_trabajo(id_trabajo: str):
+    """
+    Descarga el resultado de un trabajo completado.
+    """
+    try:
+        ruta = gestor_trabajos.ruta_resultado(id_trabajo)
+    except TrabajoNoEncontradoError:
+        raise HTTPException(status_code=404, detail="Trabajo no encontrado")
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return FileResponse(ruta, media_type="application/x-ndjson", filename=f"{id_trabajo}.ndjson")
+
+@app.delete("/trabajos/{id_trabajo}", tags=["Trabajos"])
+def cancelar_trabajo(id_trabajo: str):
+    """
+    Cancela un trabajo en cola o en ejecución; si ya terminó, elimina sus archivos.
+    """
+    try:
+        return gestor_trabajos.cancelar(id_trabajo)
+    except TrabajoNoEncontradoError:
+        raise HTTPException(status_code=404, detail="Trabajo no encontrado")
 
 #Inicializacion del servidor local
 if __name__ == "__main__":
-    import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    #Con BANKMIND_WORKERS > 1 un proceso maestro carga los modelos una vez y hace fork de los workers
+    workers = obtener_entero("WORKERS", 1)
+    if workers > 1:
+        from core.prefork import ServidorPrefork
+        ServidorPrefork(app, "0.0.0.0", 8000, workers).servir()
+    else:
+        import uvicorn
+        uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
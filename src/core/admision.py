@@ -0,0 +1,203 @@
+# src/core/admision.py
+import asyncio
+import math
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional
+
+from fastapi import HTTPException, Request
+
+from core.config import obtener_entero
+from core.metricas import metricas
+
+# Valores por defecto, configurables por endpoint con BANKMIND_ADMISION_CONCURRENTES_<NOMBRE>
+# y BANKMIND_ADMISION_COLA_<NOMBRE> (p. ej. BANKMIND_ADMISION_COLA_FRAUDE_LOTE)
+ADMISION_CONCURRENTES_DEFECTO = 32
+ADMISION_COLA_DEFECTO = 64
+
+# Cabecera opcional con el tiempo (en milisegundos) que el cliente está
+# dispuesto a esperar la respuesta
+CABECERA_PLAZO = "X-Deadline-Ms"
+
+# Peso de cada observación en el promedio móvil del tiempo de servicio
+_ALFA = 0.2
+
+
+class SolicitudRechazadaError(Exception):
+    """La request se descarta antes de ejecutarse (cola llena o plazo imposible de cumplir)"""
+
+    def __init__(self, nombre: str, motivo: str, reintentar_s: float):
+        mensajes = {
+            "cola_llena": f"El endpoint '{nombre}' está saturado, intente nuevamente en unos segundos.",
+            "plazo": f"El endpoint '{nombre}' no puede responder dentro del plazo indicado en {CABECERA_PLAZO}.",
+        }
+        super().__init__(mensajes[motivo])
+        self.nombre = nombre
+        self.motivo = motivo
+        self.reintentar_s = max(1, math.ceil(reintentar_s))
+
+
+class ControlAdmision:
+    """
+    Límite de concurrencia con cola FIFO acotada para un endpoint.
+
+    Admite hasta `max_concurrentes` requests a la vez y deja esperar a
+    `max_cola` más; por encima de eso rechaza de inmediato. Con un plazo
+    (X-Deadline-Ms) también rechaza, antes de hacer ningún cálculo, las
+    requests que según el tiempo de servicio medido no terminarían a tiempo,
+    y las que vencen mientras esperan en la cola.
+    """
+
+    def __init__(self, nombre: str, max_concurrentes: int = None, max_cola: int = None):
+        self.nombre = nombre
+        self.max_concurrentes = max_concurrentes if max_concurrentes is not None else obtener_entero(
+            "ADMISION_CONCURRENTES", ADMISION_CONCURRENTES_DEFECTO, modelo=nombre)
+        self.max_cola = max_cola if max_cola is not None else obtener_entero(
+            "ADMISION_COLA", ADMISION_COLA_DEFECTO, modelo=nombre)
+        if self.max_concurrentes < 1 or self.max_cola < 0:
+            raise ValueError(f"Configuración de admisión inválida para '{nombre}'")
+        self.en_curso = 0
+        self.servicio_s = 0.0
+        self.admitidas = 0
+        self.rechazadas: Dict[str, int] = {"cola_llena": 0, "plazo": 0}
+        self._cola: deque = deque()
+
+    def espera_estimada(self, posicion: int) -> float:
+        """Segundos hasta que se libere un lugar para la request en `posicion` de la cola"""
+        return math.ceil(posicion / self.max_concurrentes) * self.servicio_s
+
+    def _rechazar(self, motivo: str) -> SolicitudRechazadaError:
+        self.rechazadas[motivo] += 1
+        metricas.contador(
+            "bankmind_admision_rechazadas_total", "Requests descartadas por el control de admisión",
+            modelo=self.nombre, motivo=motivo
+        ).incrementar()
+        return SolicitudRechazadaError(self.nombre, motivo, self.espera_estimada(len(self._cola) + 1))
+
+    async def _esperar_turno(self, plazo: Optional[float]) -> None:
+        ahora = time.monotonic()
+        if self.en_curso < self.max_concurrentes and not self._cola:
+            if plazo is not None and ahora + self.servicio_s > plazo:
+                raise self._rechazar("plazo")
+            self.en_curso += 1
+            return
+
+        if len(self._cola) >= self.max_cola:
+            raise self._rechazar("cola_llena")
+        if plazo is not None and ahora + self.espera_estimada(len(self._cola) + 1) + self.servicio_s > plazo:
+            raise self._rechazar("plazo")
+
+        turno = asyncio.get_running_loop().create_future()
+        self._cola.append(turno)
+        limite = None if plazo is None else max(plazo - self.servicio_s - ahora, 0)
+        try:
+            # El lugar lo transfiere `_liberar`: en_curso no baja mientras haya cola
+            await asyncio.wait_for(asyncio.shield(turno), limite)
+        except asyncio.TimeoutError:
+            if not self._quitar(turno):
+                self._liberar()
+            raise self._rechazar("plazo")
+        except asyncio.CancelledError:
+            # Cliente desconectado: si ya se le había dado el lugar, se devuelve
+            if not self._quitar(turno):
+                self._liberar()
+            raise
+
+    def _quitar(self, turno: asyncio.Future) -> bool:
+        """Saca el turno de la cola; False si ya se le había transferido un lugar"""
+        try:
+            self._cola.remove(turno)
+        except ValueError:
+            return False
+        turno.cancel()
+        return True
+
+    def _liberar(self) -> None:
+        while self._cola:
+            turno = self._cola.popleft()
+            if not turno.done():
+                turno.set_result(None)
+                return
+        self.en_curso -= 1
+
+    @asynccontextmanager
+    async def admitir(self, plazo: Optional[float] = None) -> AsyncIterator[None]:
+        """
+        Ocupa un lugar durante el bloque.
+
+        Args:
+            plazo: Instante (time.monotonic) en el que el cliente deja de esperar.
+
+        Raises:
+            SolicitudRechazadaError: Si la request se descarta.
+        """
+        await self._esperar_turno(plazo)
+        self.admitidas += 1
+        inicio = time.monotonic()
+        try:
+            yield
+        finally:
+            duracion = time.monotonic() - inicio
+            self.servicio_s = duracion if self.servicio_s == 0 else (1 - _ALFA) * self.servicio_s + _ALFA * duracion
+            self._liberar()
+
+    def estadisticas(self) -> Dict:
+        return {
+            "max_concurrentes": self.max_concurrentes,
+            "max_cola": self.max_cola,
+            "en_curso": self.en_curso,
+            "en_cola": len(self._cola),
+            "servicio_ms": round(self.servicio_s * 1000, 3),
+            "admitidas": self.admitidas,
+            "rechazadas_cola_llena": self.rechazadas["cola_llena"],
+            "rechazadas_plazo": self.rechazadas["plazo"],
+        }
+
+
+_controles: Dict[str, ControlAdmision] = {}
+
+
+def registrar_admision(nombre: str, **opciones) -> ControlAdmision:
+    """Crea (o reemplaza) el control de admisión de un endpoint"""
+    control = ControlAdmision(nombre, **opciones)
+    _controles[nombre] = control
+    return control
+
+
+def estadisticas_admision() -> Dict[str, Dict]:
+    return {nombre: control.estadisticas() for nombre, control in _controles.items()}
+
+
+def plazo_de(request: Request) -> Optional[float]:
+    """
+    Instante límite (time.monotonic) según la cabecera X-Deadline-Ms, o None si no viene.
+
+    Raises:
+        HTTPException: 400 si la cabecera no es un número.
+    """
+    valor = request.headers.get(CABECERA_PLAZO)
+    if valor is None:
+        return None
+    try:
+        milisegundos = float(valor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"{CABECERA_PLAZO} debe ser un número de milisegundos")
+    if not math.isfinite(milisegundos):
+        raise HTTPException(status_code=400, detail=f"{CABECERA_PLAZO} debe ser un número de milisegundos")
+    return time.monotonic() + milisegundos / 1000
+
+
+def admision(nombre: str):
+    """
+    Dependencia de FastAPI que pasa la request por el control de admisión del
+    endpoint: `@router.post(..., dependencies=[Depends(admision("fraude"))])`.
+    Los endpoints que usan el mismo nombre comparten el control.
+    """
+    control = _controles.get(nombre) or registrar_admision(nombre)
+
+    async def dependencia(request: Request):
+        async with control.admitir(plazo_de(request)):
+            yield
+
+    return dependencia
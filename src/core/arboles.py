@@ -0,0 +1,575 @@
+# src/core/arboles.py
+import json
+import math
+
+import numpy as np
+import pandas as pd
+
+from core.config import obtener_bool, obtener_entero
+
+# Tolerancia de la verificación de paridad: |compilado - original| <= ABS + REL * |original|.
+# XGBoost acumula en float32 y aquí se suma en float64, de ahí el margen relativo.
+TOLERANCIA_ABSOLUTA = 1e-5
+TOLERANCIA_RELATIVA = 1e-5
+
+# Filas sintéticas (generadas alrededor de los umbrales del ensamble) para la verificación
+FILAS_PRUEBA = 512
+
+# Hasta cuántas filas conviene el recorrido compilado; en lotes más grandes se usa
+# la librería original (BANKMIND_ARBOLES_FILAS_MAX[_<MODELO>])
+FILAS_MAX_DEFECTO = 16
+
+_EULER_GAMMA = np.euler_gamma
+
+
+class ParidadError(ValueError):
+    """El ensamble compilado no reproduce las predicciones del modelo original"""
+
+
+class BosqueCompilado:
+    """
+    Todos los árboles de un ensamble aplanados en arreglos de nodos compartidos
+    (feature, umbral, hijos, valor de hoja). Las hojas apuntan a sí mismas, así
+    que el recorrido son exactamente `profundidad` pasos vectorizados sobre la
+    matriz (filas, árboles) sin ramas por fila.
+    """
+
+    def __init__(self, arboles: list, n_features: int, estricto: bool, float32: bool, cero: float = 0.0):
+        # Cada árbol: dict con arreglos locales feature, umbral, izq, der, faltante (-1 en hojas) y valor
+        total = sum(len(a["valor"]) for a in arboles)
+        self.feature = np.zeros(total, dtype=np.intp)
+        self.umbral = np.zeros(total, dtype=np.float64)
+        self.izq = np.zeros(total, dtype=np.intp)
+        self.der = np.zeros(total, dtype=np.intp)
+        self.faltante = np.zeros(total, dtype=np.intp)
+        self.valor = np.zeros(total, dtype=np.float64)
+        self.es_hoja = np.zeros(total, dtype=bool)
+        self.raices = np.zeros(len(arboles), dtype=np.intp)
+
+        profundidad = 0
+        inicio = 0
+        for i, arbol in enumerate(arboles):
+            n = len(arbol["valor"])
+            fin = inicio + n
+            propios = np.arange(inicio, fin)
+            hoja = np.asarray(arbol["izq"]) < 0
+            self.raices[i] = inicio
+            self.es_hoja[inicio:fin] = hoja
+            self.feature[inicio:fin] = np.where(hoja, 0, arbol["feature"])
+            self.umbral[inicio:fin] = np.where(hoja, 0.0, arbol["umbral"])
+            self.izq[inicio:fin] = np.where(hoja, propios, np.asarray(arbol["izq"]) + inicio)
+            self.der[inicio:fin] = np.where(hoja, propios, np.asarray(arbol["der"]) + inicio)
+            self.faltante[inicio:fin] = np.where(hoja, propios, np.asarray(arbol["faltante"]) + inicio)
+            self.valor[inicio:fin] = arbol["valor"]
+            profundidad = max(profundidad, _profundidad(arbol["izq"], arbol["der"]))
+            inicio = fin
+
+        if (self.feature[~self.es_hoja] >= n_features).any():
+            raise ValueError("El ensamble usa features fuera del rango de entrada")
+        self.n_arboles = len(arboles)
+        self.n_features = n_features
+        self.profundidad = profundidad
+        # XGBoost va a la izquierda con x < umbral; sklearn y LightGBM con x <= umbral
+        self.estricto = estricto
+        # XGBoost y sklearn comparan la entrada convertida a float32
+        self.float32 = float32
+        # LightGBM trata como 0 cualquier valor con |x| <= kZeroThreshold (1e-35f) al leer la fila
+        self.cero = cero
+
+    def preparar(self, X) -> np.ndarray:
+        X = np.asarray(X, dtype=np.float32 if self.float32 else np.float64)
+        if X.ndim != 2 or X.shape[1] != self.n_features:
+            raise ValueError(f"Se esperaban {self.n_features} features, llegaron {X.shape[-1]}")
+        X = X.astype(np.float64, copy=False)
+        if self.cero:
+            X = np.where(np.abs(X) <= self.cero, 0.0, X)
+        return X
+
+    def hojas(self, X) -> np.ndarray:
+        """Índice global de la hoja alcanzada por cada fila en cada árbol: (N, n_arboles)"""
+        X = self.preparar(X)
+        nodos = np.broadcast_to(self.raices, (X.shape[0], self.n_arboles))
+        filas = np.arange(X.shape[0])[:, None]
+        con_faltantes = np.isnan(X).any()
+        for _ in range(self.profundidad):
+            x = X[filas, self.feature[nodos]]
+            umbral = self.umbral[nodos]
+            izquierda = x < umbral if self.estricto else x <= umbral
+            siguiente = np.where(izquierda, self.izq[nodos], self.der[nodos])
+            if con_faltantes:
+                siguiente = np.where(np.isnan(x), self.faltante[nodos], siguiente)
+            nodos = siguiente
+        return nodos
+
+    def suma(self, X) -> np.ndarray:
+        return self.valor[self.hojas(X)].sum(axis=1)
+
+    def media(self, X) -> np.ndarray:
+        return self.valor[self.hojas(X)].mean(axis=1)
+
+    def filas_de_prueba(self, n: int = FILAS_PRUEBA, semilla: int = 0) -> np.ndarray:
+        """
+        Filas sintéticas que caen justo en, justo antes, justo después y alrededor
+        de los umbrales reales del ensamble, para ejercitar ambas ramas de cada nodo.
+        """
+        generador = np.random.default_rng(semilla)
+        X = np.zeros((n, self.n_features))
+        internos = ~self.es_hoja
+        for j in range(self.n_features):
+            umbrales = np.unique(self.umbral[internos & (self.feature == j)])
+            umbrales = umbrales[np.isfinite(umbrales)]
+            if umbrales.size == 0:
+                X[:, j] = generador.normal(size=n)
+                continue
+            if self.float32:
+                umbrales = umbrales.astype(np.float32)
+            elegidos = umbrales[generador.integers(0, umbrales.size, size=n)]
+            abajo = np.nextafter(elegidos, -np.inf)
+            arriba = np.nextafter(elegidos, np.inf)
+            margen = max(float(umbrales[-1] - umbrales[0]), 1.0) * 0.1
+            aleatorio = generador.uniform(umbrales[0] - margen, umbrales[-1] + margen, size=n)
+            modo = generador.integers(0, 4, size=n)
+            X[:, j] = np.choose(modo, [elegidos, abajo, arriba, aleatorio])
+        return X
+
+
+def _profundidad(izq, der) -> int:
+    izq, der = list(izq), list(der)
+    maxima = 0
+    pendientes = [(0, 0)]
+    while pendientes:
+        nodo, nivel = pendientes.pop()
+        if izq[nodo] < 0:
+            maxima = max(maxima, nivel)
+        else:
+            pendientes.append((izq[nodo], nivel + 1))
+            pendientes.append((der[nodo], nivel + 1))
+    return maxima
+
+
+def _sigmoide(margen: np.ndarray) -> np.ndarray:
+    return 1.0 / (1.0 + np.exp(-margen))
+
+
+class EvaluadorCompilado:
+    """
+    Base común de los evaluadores compilados. Expone la misma API que el modelo
+    original; por encima de `filas_max` filas delega en la librería nativa, que
+    para lotes grandes ya amortiza su costo de despacho y recorre más rápido.
+    """
+
+    def __init__(self, original, bosque: BosqueCompilado, columnas=None, dtype=np.float64):
+        self.original = original
+        self.bosque = bosque
+        self.columnas = None if columnas is None else list(columnas)
+        # Mismo tipo de salida que la librería original (XGBoost devuelve float32)
+        self.dtype = dtype
+        self.filas_max = FILAS_MAX_DEFECTO
+
+    def _matriz(self, X) -> np.ndarray:
+        if isinstance(X, pd.DataFrame):
+            if self.columnas is not None and set(self.columnas).issubset(X.columns):
+                X = X[self.columnas]
+            return X.to_numpy(dtype=np.float64)
+        return np.asarray(X, dtype=np.float64)
+
+    def _delegar(self, X) -> bool:
+        return len(X) > self.filas_max
+
+    def describir(self) -> dict:
+        return {
+            "modelo": type(self.original).__name__,
+            "arboles": self.bosque.n_arboles,
+            "nodos": int(self.bosque.valor.size),
+            "profundidad": self.bosque.profundidad,
+            "filas_max": self.filas_max,
+        }
+
+
+class ClasificadorCompilado(EvaluadorCompilado):
+    """Clasificador binario: margen = sesgo + suma (o media) de hojas, probabilidad vía enlace"""
+
+    def __init__(self, original, bosque, columnas=None, sesgo=0.0, promedio=False, sigmoide=True, dtype=np.float64):
+        super().__init__(original, bosque, columnas, dtype)
+        self.classes_ = np.asarray(original.classes_)
+        self.sesgo = sesgo
+        self.promedio = promedio
+        self.sigmoide = sigmoide
+
+    def _probabilidad(self, X) -> np.ndarray:
+        matriz = self._matriz(X)
+        margen = (self.bosque.media(matriz) if self.promedio else self.bosque.suma(matriz)) + self.sesgo
+        return _sigmoide(margen) if self.sigmoide else margen
+
+    def predict_proba(self, X) -> np.ndarray:
+        if self._delegar(X):
+            return self.original.predict_proba(X)
+        p = self._probabilidad(X).astype(self.dtype)
+        return np.column_stack([1.0 - p, p])
+
+    def predict(self, X) -> np.ndarray:
+        if self._delegar(X):
+            return self.original.predict(X)
+        return self.classes_[(self._probabilidad(X) > 0.5).astype(int)]
+
+
+class RegresorCompilado(EvaluadorCompilado):
+    def __init__(self, original, bosque, columnas=None, sesgo=0.0, promedio=False, dtype=np.float64):
+        super().__init__(original, bosque, columnas, dtype)
+        self.sesgo = sesgo
+        self.promedio = promedio
+
+    def predict(self, X) -> np.ndarray:
+        if self._delegar(X):
+            return self.original.predict(X)
+        matriz = self._matriz(X)
+        total = self.bosque.media(matriz) if self.promedio else self.bosque.suma(matriz)
+        return (total + self.sesgo).astype(self.dtype)
+
+
+class IsolationForestCompilado(EvaluadorCompilado):
+    """
+    Cada hoja guarda directamente profundidad + c(n_muestras_hoja), así que
+    score_samples se reduce a una suma por fila y una potencia.
+    """
+
+    def __init__(self, original, bosque, columnas=None):
+        super().__init__(original, bosque, columnas)
+        self.offset_ = float(original.offset_)
+        self.denominador = len(original.estimators_) * _longitud_media(original._max_samples)
+
+    def score_samples(self, X) -> np.ndarray:
+        if self._delegar(X):
+            return self.original.score_samples(X)
+        profundidades = self.bosque.suma(self._matriz(X))
+        return -(2 ** (-profundidades / self.denominador))
+
+    def decision_function(self, X) -> np.ndarray:
+        return self.score_samples(X) - self.offset_
+
+    def predict(self, X) -> np.ndarray:
+        return np.where(self.decision_function(X) < 0, -1, 1)
+
+
+def _longitud_media(n) -> float:
+    """c(n) de Liu et al.: longitud media de una búsqueda fallida en un BST de n puntos"""
+    if n <= 1:
+        return 0.0
+    if n == 2:
+        return 1.0
+    return 2.0 * (math.log(n - 1.0) + _EULER_GAMMA) - 2.0 * (n - 1.0) / n
+
+
+# --- Extracción de árboles -------------------------------------------------
+
+def _arbol_sklearn(tree, valores, features=None) -> dict:
+    izq = tree.children_left.astype(np.intp)
+    der = tree.children_right.astype(np.intp)
+    feature = tree.feature.astype(np.intp)
+    if features is not None:
+        feature = np.where(izq < 0, 0, np.asarray(features)[np.maximum(feature, 0)])
+    ir_izquierda = getattr(tree, "missing_go_to_left", None)
+    if ir_izquierda is None:
+        faltante = der
+    else:
+        faltante = np.where(np.asarray(ir_izquierda, dtype=bool), izq, der)
+    return {
+        "feature": feature,
+        "umbral": tree.threshold.astype(np.float64),
+        "izq": izq,
+        "der": der,
+        "faltante": faltante,
+        "valor": np.asarray(valores, dtype=np.float64),
+    }
+
+
+def _arbol_xgboost(volcado: dict, indices: dict) -> dict:
+    nodos = {}
+    pendientes = [volcado]
+    while pendientes:
+        nodo = pendientes.pop()
+        nodos[nodo["nodeid"]] = nodo
+        pendientes.extend(nodo.get("children", []))
+    n = max(nodos) + 1
+    arbol = {clave: np.full(n, -1, dtype=np.intp) for clave in ("feature", "izq", "der", "faltante")}
+    arbol["umbral"] = np.zeros(n)
+    arbol["valor"] = np.zeros(n)
+    for nodo_id, nodo in nodos.items():
+        if "leaf" in nodo:
+            arbol["valor"][nodo_id] = nodo["leaf"]
+            continue
+        if "split_condition" not in nodo:
+            raise ValueError("Solo se soportan splits numéricos de XGBoost")
+        arbol["feature"][nodo_id] = indices(nodo["split"])
+        arbol["umbral"][nodo_id] = np.float32(nodo["split_condition"])
+        arbol["izq"][nodo_id] = nodo["yes"]
+        arbol["der"][nodo_id] = nodo["no"]
+        arbol["faltante"][nodo_id] = nodo["missing"]
+    return arbol
+
+
+def _arbol_lightgbm(estructura: dict) -> dict:
+    feature, umbral, izq, der, faltante, valor = [], [], [], [], [], []
+
+    def visitar(nodo) -> int:
+        indice = len(valor)
+        for lista in (feature, izq, der, faltante):
+            lista.append(-1)
+        umbral.append(0.0)
+        valor.append(0.0)
+        if "leaf_value" in nodo:
+            valor[indice] = nodo["leaf_value"]
+            return indice
+        if nodo.get("decision_type", "<=") != "<=":
+            raise ValueError("Solo se soportan splits numéricos de LightGBM")
+        tipo_faltante = nodo.get("missing_type", "None")
+        if tipo_faltante not in ("None", "NaN"):
+            raise ValueError(f"missing_type '{tipo_faltante}' de LightGBM no soportado")
+        feature[indice] = nodo["split_feature"]
+        umbral[indice] = float(nodo["threshold"])
+        izq[indice] = visitar(nodo["left_child"])
+        der[indice] = visitar(nodo["right_child"])
+        if tipo_faltante == "NaN":
+            faltante[indice] = izq[indice] if nodo.get("default_left", True) else der[indice]
+        else:
+            # Sin manejo de faltantes LightGBM trata NaN como 0
+            faltante[indice] = izq[indice] if 0.0 <= umbral[indice] else der[indice]
+        return indice
+
+    visitar(estructura)
+    return {"feature": feature, "umbral": umbral, "izq": izq, "der": der, "faltante": faltante, "valor": valor}
+
+
+def _calibrar_sesgo(bosque: BosqueCompilado, margen_original) -> float:
+    """Sesgo constante (base_score, init_, etc.) medido contra el margen del modelo original"""
+    X = bosque.filas_de_prueba(64, semilla=1)
+    return float(np.median(np.asarray(margen_original(X), dtype=np.float64).ravel() - bosque.suma(X)))
+
+
+# --- Compiladores por familia ---------------------------------------------
+
+def _compilar_xgboost(modelo):
+    booster = modelo.get_booster()
+    configuracion = json.loads(booster.save_config())
+    aprendiz = configuracion["learner"]
+    if aprendiz["gradient_booster"]["name"] != "gbtree":
+        raise ValueError("Solo se soporta el booster gbtree")
+    if not (modelo.missing is None or np.isnan(modelo.missing)):
+        raise ValueError("Solo se soporta missing=NaN")
+    objetivo = aprendiz["objective"]["name"]
+
+    nombres = booster.feature_names
+    n_features = int(aprendiz["learner_model_param"]["num_feature"])
+    if nombres:
+        posiciones = {nombre: i for i, nombre in enumerate(nombres)}
+        indices = posiciones.__getitem__
+    else:
+        indices = lambda nombre: int(nombre[1:])  # "f0", "f1", ...
+
+    volcados = booster.get_dump(dump_format="json")
+    # Igual que XGBModel.predict: con early stopping solo se usan best_iteration + 1 rondas
+    try:
+        mejor = modelo.best_iteration
+    except AttributeError:
+        mejor = None
+    if mejor is not None:
+        volcados = volcados[: (mejor + 1) * (len(volcados) // booster.num_boosted_rounds())]
+    arboles = [_arbol_xgboost(json.loads(v), indices) for v in volcados]
+    bosque = BosqueCompilado(arboles, n_features, estricto=True, float32=True)
+    margen = lambda X: modelo.predict(X, output_margin=True)
+    sesgo = _calibrar_sesgo(bosque, margen)
+
+    if hasattr(modelo, "predict_proba"):
+        if objetivo not in ("binary:logistic", "reg:logistic") or len(modelo.classes_) != 2:
+            raise ValueError(f"Objetivo '{objetivo}' no soportado para clasificación")
+        return ClasificadorCompilado(modelo, bosque, nombres, sesgo=sesgo, dtype=np.float32)
+    if objetivo not in ("reg:squarederror", "reg:absoluteerror", "reg:pseudohubererror"):
+        raise ValueError(f"Objetivo '{objetivo}' no soportado para regresión")
+    return RegresorCompilado(modelo, bosque, nombres, sesgo=sesgo, dtype=np.float32)
+
+
+def _compilar_bosque_sklearn(modelo):
+    estimadores = getattr(modelo, "estimators_", [modelo])
+    n_features = modelo.n_features_in_
+    columnas = getattr(modelo, "feature_names_in_", None)
+    if getattr(modelo, "n_outputs_", 1) != 1:
+        raise ValueError("Solo se soportan modelos de una salida")
+    clasificador = hasattr(modelo, "predict_proba")
+    arboles = []
+    for estimador in estimadores:
+        tree = estimador.tree_
+        if clasificador:
+            if len(modelo.classes_) != 2:
+                raise ValueError("Solo se soportan clasificadores binarios")
+            conteos = tree.value[:, 0, :]
+            valores = conteos[:, 1] / conteos.sum(axis=1)
+        else:
+            valores = tree.value[:, 0, 0]
+        arboles.append(_arbol_sklearn(tree, valores))
+    bosque = BosqueCompilado(arboles, n_features, estricto=False, float32=True)
+    if clasificador:
+        return ClasificadorCompilado(modelo, bosque, columnas, promedio=True, sigmoide=False)
+    return RegresorCompilado(modelo, bosque, columnas, promedio=True)
+
+
+def _compilar_gradient_boosting(modelo):
+    if modelo.estimators_.shape[1] != 1:
+        raise ValueError("Solo se soportan GradientBoosting binarios o de regresión")
+    clasificador = hasattr(modelo, "predict_proba")
+    if clasificador and getattr(modelo, "loss", "log_loss") != "log_loss":
+        raise ValueError(f"Pérdida '{modelo.loss}' no soportada")
+    arboles = [
+        _arbol_sklearn(estimador.tree_, estimador.tree_.value[:, 0, 0] * modelo.learning_rate)
+        for estimador in modelo.estimators_[:, 0]
+    ]
+    bosque = BosqueCompilado(arboles, modelo.n_features_in_, estricto=False, float32=True)
+    columnas = getattr(modelo, "feature_names_in_", None)
+    if clasificador:
+        sesgo = _calibrar_sesgo(bosque, lambda X: modelo.decision_function(_como_original(modelo, X)))
+        return ClasificadorCompilado(modelo, bosque, columnas, sesgo=sesgo)
+    sesgo = _calibrar_sesgo(bosque, lambda X: modelo.predict(_como_original(modelo, X)))
+    return RegresorCompilado(modelo, bosque, columnas, sesgo=sesgo)
+
+
+def _compilar_isolation_forest(modelo):
+    n_features = modelo.n_features_in_
+    submuestrea = modelo._max_features != n_features
+    arboles = []
+    for estimador, features in zip(modelo.estimators_, modelo.estimators_features_):
+        tree = estimador.tree_
+        # Profundidad de cada nodo + c(muestras en la hoja), como _compute_score_samples
+        profundidad = np.zeros(tree.node_count)
+        for nodo in range(tree.node_count):
+            for hijo in (tree.children_left[nodo], tree.children_right[nodo]):
+                if hijo >= 0:
+                    profundidad[hijo] = profundidad[nodo] + 1
+        ajuste = np.array([_longitud_media(n) for n in tree.n_node_samples])
+        arboles.append(_arbol_sklearn(tree, profundidad + ajuste, features if submuestrea else None))
+    bosque = BosqueCompilado(arboles, n_features, estricto=False, float32=True)
+    return IsolationForestCompilado(modelo, bosque, getattr(modelo, "feature_names_in_", None))
+
+
+def _compilar_lightgbm(modelo):
+    volcado = modelo.booster_.dump_model()
+    objetivo = volcado.get("objective", "").split(" ")
+    if volcado.get("num_tree_per_iteration", 1) != 1:
+        raise ValueError("Solo se soportan modelos LightGBM de una salida")
+    arboles_info = volcado["tree_info"]
+    mejor = modelo.booster_.best_iteration
+    if mejor and mejor > 0:
+        arboles_info = arboles_info[:mejor]
+    arboles = [_arbol_lightgbm(info["tree_structure"]) for info in arboles_info]
+    bosque = BosqueCompilado(arboles, volcado["max_feature_idx"] + 1, estricto=False, float32=False, cero=float(np.float32(1e-35)))
+    sesgo = _calibrar_sesgo(bosque, lambda X: modelo.predict(X, raw_score=True))
+    columnas = modelo.feature_name_
+    if hasattr(modelo, "predict_proba"):
+        if objetivo[0] != "binary":
+            raise ValueError(f"Objetivo '{objetivo[0]}' no soportado para clasificación")
+        escala = float(objetivo[1].split(":")[1]) if len(objetivo) > 1 else 1.0
+        if escala != 1.0:
+            raise ValueError("Solo se soporta sigmoid:1")
+        return ClasificadorCompilado(modelo, bosque, columnas, sesgo=sesgo)
+    if objetivo[0] not in ("regression", "regression_l1", "huber", "fair", "quantile"):
+        raise ValueError(f"Objetivo '{objetivo[0]}' no soportado para regresión")
+    return RegresorCompilado(modelo, bosque, columnas, sesgo=sesgo)
+
+
+def _como_original(modelo, X: np.ndarray):
+    """Entrada en el formato que espera el modelo original (DataFrame si se entrenó con nombres)"""
+    columnas = getattr(modelo, "feature_names_in_", None)
+    return X if columnas is None else pd.DataFrame(X, columns=columnas)
+
+
+def compilar(modelo) -> EvaluadorCompilado:
+    """
+    Compila un ensamble de árboles a arreglos planos de NumPy.
+
+    Raises:
+        ValueError: Si el tipo de modelo u objetivo no está soportado.
+    """
+    nombre = type(modelo).__name__
+    modulo = type(modelo).__module__
+    if modulo.startswith("xgboost"):
+        return _compilar_xgboost(modelo)
+    if modulo.startswith("lightgbm"):
+        return _compilar_lightgbm(modelo)
+    if nombre == "IsolationForest":
+        return _compilar_isolation_forest(modelo)
+    if nombre in ("GradientBoostingClassifier", "GradientBoostingRegressor"):
+        return _compilar_gradient_boosting(modelo)
+    if nombre in ("RandomForestClassifier", "RandomForestRegressor", "ExtraTreesClassifier",
+                  "ExtraTreesRegressor", "DecisionTreeClassifier", "DecisionTreeRegressor"):
+        return _compilar_bosque_sklearn(modelo)
+    raise ValueError(f"Tipo de modelo no soportado: {nombre}")
+
+
+def _cerca(a, b) -> np.ndarray:
+    return np.abs(a - b) <= TOLERANCIA_ABSOLUTA + TOLERANCIA_RELATIVA * np.abs(b)
+
+
+def _en_trozos(metodo, X: np.ndarray, tamano: int) -> np.ndarray:
+    """Evalúa X en trozos de `tamano` filas para ejercitar el recorrido compilado y no la delegación"""
+    tamano = max(tamano, 1)
+    return np.concatenate([
+        np.asarray(metodo(X[inicio:inicio + tamano]), dtype=np.float64)
+        for inicio in range(0, len(X), tamano)
+    ])
+
+
+def verificar_paridad(original, compilado: EvaluadorCompilado, X=None) -> float:
+    """
+    Compara el evaluador compilado con el modelo original sobre filas sintéticas
+    alrededor de los umbrales y devuelve la máxima diferencia absoluta observada.
+
+    Raises:
+        ParidadError: Si alguna salida se aleja más de la tolerancia.
+    """
+    if X is None:
+        X = compilado.bosque.filas_de_prueba()
+    entrada = _como_original(original, X)
+    maxima = 0.0
+    for metodo in ("predict_proba", "decision_function", "score_samples", "predict"):
+        if not (hasattr(original, metodo) and hasattr(compilado, metodo)):
+            continue
+        esperado = np.asarray(getattr(original, metodo)(entrada), dtype=np.float64)
+        obtenido = _en_trozos(getattr(compilado, metodo), X, compilado.filas_max)
+        if esperado.shape != obtenido.shape:
+            raise ParidadError(f"{metodo}: forma {obtenido.shape} distinta de {esperado.shape}")
+        if metodo == "predict" and isinstance(compilado, ClasificadorCompilado):
+            # Las etiquetas solo pueden diferir donde la probabilidad está en el empate
+            p = _en_trozos(compilado.predict_proba, X, compilado.filas_max)[:, 1]
+            distintas = (esperado != obtenido) & ~_cerca(p, 0.5)
+            if distintas.any():
+                raise ParidadError(f"predict: {int(distintas.sum())} etiquetas distintas")
+            continue
+        if not _cerca(obtenido, esperado).all():
+            raise ParidadError(f"{metodo}: diferencia máxima {np.abs(obtenido - esperado).max():.3e}")
+        maxima = max(maxima, float(np.abs(obtenido - esperado).max()))
+    return maxima
+
+
+def compilar_si_corresponde(nombre: str, modelo):
+    """
+    Devuelve el evaluador compilado si BANKMIND_ARBOLES_COMPILADOS(_<MODELO>) está
+    activo y supera la verificación de paridad; en cualquier otro caso el modelo original.
+
+    La verificación al cargar cuesta ~15-30 ms por ensamble; con
+    BANKMIND_ARBOLES_VERIFICAR(_<MODELO>)=0 se omite (los artefactos versionados
+    ya se verifican en tests/test_arboles.py).
+    """
+    if not obtener_bool("ARBOLES_COMPILADOS", False, modelo=nombre):
+        return modelo
+    try:
+        compilado = compilar(modelo)
+        compilado.filas_max = obtener_entero("ARBOLES_FILAS_MAX", FILAS_MAX_DEFECTO, modelo=nombre)
+        diferencia = None
+        if obtener_bool("ARBOLES_VERIFICAR", True, modelo=nombre):
+            diferencia = verificar_paridad(modelo, compilado)
+    except Exception as e:
+        print(f"[WARN] No se pudo compilar {type(modelo).__name__} de '{nombre}', se usa el original: {e}")
+        return modelo
+    detalle = compilado.describir()
+    paridad = "sin verificar" if diferencia is None else f"diferencia máxima {diferencia:.2e}"
+    print(f"[OK] {detalle['modelo']} de '{nombre}' compilado: {detalle['arboles']} árboles, "
+          f"profundidad {detalle['profundidad']}, hasta {detalle['filas_max']} filas, {paridad}")
+    return compilado
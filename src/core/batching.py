@@ -0,0 +1,163 @@
+# src/core/batching.py
+import asyncio
+import time
+from collections import deque
+from typing import Any, Callable, Dict, List
+
+from core.config import obtener_entero, obtener_flotante
+from core.ejecutor import ColaLlenaError, obtener_ejecutor
+from core.metricas import Histograma
+from core.registro import ModeloNoDisponibleError
+
+# Valores por defecto, configurables por modelo con
+# BANKMIND_BATCH_MAX_<MODELO> y BANKMIND_BATCH_ESPERA_MS_<MODELO>
+BATCH_MAX_DEFECTO = 32
+BATCH_ESPERA_MS_DEFECTO = 2.0
+
+LIMITES_TAMANO = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+LIMITES_ESPERA_MS = (0.1, 0.5, 1, 2, 5, 10, 25, 50, 100, 250)
+
+
+class MicroBatcher:
+    """
+    Agrupa las requests concurrentes de un modelo en lotes de hasta `max_lote`
+    filas o `max_espera_ms` milisegundos (lo que ocurra primero), ejecuta una
+    sola llamada vectorizada por lote y devuelve a cada llamador su resultado.
+
+    `funcion_lote` recibe la lista de entradas y debe devolver una lista de
+    resultados del mismo largo y en el mismo orden.
+    """
+
+    def __init__(self, nombre: str, funcion_lote: Callable[[List[Any]], List[Any]],
+                 max_lote: int = None, max_espera_ms: float = None):
+        self.nombre = nombre
+        self.funcion_lote = funcion_lote
+        self.max_lote = max_lote if max_lote is not None else obtener_entero("BATCH_MAX", BATCH_MAX_DEFECTO, modelo=nombre)
+        if max_espera_ms is None:
+            max_espera_ms = obtener_flotante("BATCH_ESPERA_MS", BATCH_ESPERA_MS_DEFECTO, modelo=nombre)
+        if self.max_lote < 1 or max_espera_ms < 0:
+            raise ValueError(f"Configuración de batching inválida para '{nombre}'")
+        self.max_espera = max_espera_ms / 1000
+        self.hist_tamano_lote = Histograma(LIMITES_TAMANO)
+        self.hist_espera_ms = Histograma(LIMITES_ESPERA_MS)
+        self._loop = None
+        self._tarea = None
+        self._pendientes = deque()
+        self._hay_pendientes = None
+        self._en_curso = set()
+
+    def _asegurar_tarea(self, loop) -> None:
+        # El bucle se crea dentro del event loop activo (y se recrea si el loop cambió)
+        if self._loop is not loop or self._tarea is None or self._tarea.done():
+            self._loop = loop
+            self._pendientes = deque()
+            self._hay_pendientes = asyncio.Event()
+            self._tarea = loop.create_task(self._bucle())
+
+    async def enviar(self, entrada: Any) -> Any:
+        """Encola una entrada y espera el resultado de su lote"""
+        loop = asyncio.get_running_loop()
+        self._asegurar_tarea(loop)
+        futuro = loop.create_future()
+        self._pendientes.append((entrada, futuro, time.perf_counter()))
+        self._hay_pendientes.set()
+        return await futuro
+
+    async def _bucle(self) -> None:
+        while True:
+            await self._hay_pendientes.wait()
+            if not self._pendientes:
+                self._hay_pendientes.clear()
+                continue
+            # La ventana de espera se cuenta desde la llegada de la primera entrada del lote
+            limite = self._pendientes[0][2] + self.max_espera
+            while len(self._pendientes) < self.max_lote:
+                restante = limite - time.perf_counter()
+                if restante <= 0:
+                    break
+                self._hay_pendientes.clear()
+                try:
+                    await asyncio.wait_for(self._hay_pendientes.wait(), restante)
+                except asyncio.TimeoutError:
+                    break
+
+            lote = [self._pendientes.popleft() for _ in range(min(self.max_lote, len(self._pendientes)))]
+            if self._pendientes:
+                self._hay_pendientes.set()
+            else:
+                self._hay_pendientes.clear()
+
+            # El lote se procesa en segundo plano para seguir acumulando el siguiente
+            tarea = self._loop.create_task(self._procesar(lote))
+            self._en_curso.add(tarea)
+            tarea.add_done_callback(self._en_curso.discard)
+
+    async def _ejecutar(self, entradas: List[Any]) -> List[Any]:
+        # La inferencia corre en el pool acotado del modelo, fuera del event loop
+        return await obtener_ejecutor(self.nombre).ejecutar(self.funcion_lote, entradas)
+
+    async def _procesar(self, lote) -> None:
+        ahora = time.perf_counter()
+        self.hist_tamano_lote.observar(len(lote))
+        for _, _, llegada in lote:
+            self.hist_espera_ms.observar((ahora - llegada) * 1000)
+
+        entradas = [entrada for entrada, _, _ in lote]
+        try:
+            resultados = await self._ejecutar(entradas)
+            if len(resultados) != len(entradas):
+                raise RuntimeError(f"El lote de '{self.nombre}' devolvió {len(resultados)} resultados para {len(entradas)} entradas")
+        except Exception as e:
+            # Con la cola saturada o sin modelo cargado, reintentar fila a fila repetiría el mismo error
+            if len(lote) == 1 or isinstance(e, (ColaLlenaError, ModeloNoDisponibleError)):
+                for _, futuro, _ in lote:
+                    self._resolver(futuro, error=e)
+                return
+            # Una fila inválida no debe hacer fallar al resto: se reintenta fila a fila
+            for entrada, futuro, _ in lote:
+                try:
+                    resultado = (await self._ejecutar([entrada]))[0]
+                except Exception as error_fila:
+                    self._resolver(futuro, error=error_fila)
+                else:
+                    self._resolver(futuro, resultado=resultado)
+            return
+
+        for (_, futuro, _), resultado in zip(lote, resultados):
+            self._resolver(futuro, resultado=resultado)
+
+    @staticmethod
+    def _resolver(futuro, resultado=None, error: Exception = None) -> None:
+        # El llamador pudo haber cancelado (cliente desconectado)
+        if futuro.done():
+            return
+        if error is not None:
+            futuro.set_exception(error)
+        else:
+            futuro.set_result(resultado)
+
+    def estadisticas(self) -> Dict:
+        return {
+            "max_lote": self.max_lote,
+            "max_espera_ms": self.max_espera * 1000,
+            "tamano_lote": self.hist_tamano_lote.instantanea(),
+            "espera_cola_ms": self.hist_espera_ms.instantanea(),
+        }
+
+
+_batchers: Dict[str, MicroBatcher] = {}
+
+
+def registrar_batcher(nombre: str, funcion_lote: Callable[[List[Any]], List[Any]], **opciones) -> MicroBatcher:
+    """Crea (o reemplaza) el micro-batcher de un modelo"""
+    batcher = MicroBatcher(nombre, funcion_lote, **opciones)
+    _batchers[nombre] = batcher
+    return batcher
+
+
+def obtener_batcher(nombre: str) -> MicroBatcher:
+    return _batchers[nombre]
+
+
+def estadisticas_batching() -> Dict[str, Dict]:
+    return {nombre: batcher.estadisticas() for nombre, batcher in _batchers.items()}
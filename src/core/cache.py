@@ -0,0 +1,158 @@
+# src/core/cache.py
+import asyncio
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from core.config import obtener_bool, obtener_entero, obtener_flotante
+from core.registro import registro
+
+# Valores por defecto, configurables por modelo con BANKMIND_CACHE_<MODELO>,
+# BANKMIND_CACHE_MAX_ENTRADAS_<MODELO> y BANKMIND_CACHE_TTL_S_<MODELO>
+CACHE_MAX_ENTRADAS_DEFECTO = 10000
+CACHE_TTL_S_DEFECTO = 300.0
+
+
+def clave_canonica(entrada: Any) -> str:
+    """
+    Hash estable de una entrada ya validada: el mismo payload produce la misma
+    clave sin importar el orden de los campos ni cómo venían escritos los números.
+    """
+    if hasattr(entrada, "model_dump"):
+        entrada = entrada.model_dump(mode="json")
+    texto = json.dumps(entrada, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.blake2b(texto.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class CachePredicciones:
+    """
+    Caché LRU con expiración (TTL) de las predicciones de un modelo.
+
+    La clave incluye la versión activa del modelo en el registro, así que una
+    recarga o un rollback dejan de servir las predicciones de la versión previa.
+    Las requests idénticas que llegan mientras la primera sigue calculándose
+    esperan ese mismo resultado (single-flight) en lugar de ejecutar el modelo otra vez.
+    """
+
+    def __init__(self, nombre: str, max_entradas: int = None, ttl_s: float = None, activa: bool = None):
+        self.nombre = nombre
+        self.activa = activa if activa is not None else obtener_bool("CACHE", False, modelo=nombre)
+        self.max_entradas = max_entradas if max_entradas is not None else obtener_entero(
+            "CACHE_MAX_ENTRADAS", CACHE_MAX_ENTRADAS_DEFECTO, modelo=nombre)
+        self.ttl_s = ttl_s if ttl_s is not None else obtener_flotante("CACHE_TTL_S", CACHE_TTL_S_DEFECTO, modelo=nombre)
+        if self.max_entradas < 1 or self.ttl_s <= 0:
+            raise ValueError(f"Configuración de caché inválida para '{nombre}'")
+        self._entradas: "OrderedDict[str, tuple]" = OrderedDict()
+        self._en_vuelo: Dict[str, asyncio.Future] = {}
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+        self.coalescidas = 0
+        self.expulsiones = 0
+        self.expiradas = 0
+
+    def _clave(self, entrada: Any) -> str:
+        version = registro.version(self.nombre) if registro.registrado(self.nombre) else None
+        return f"{version.version if version else '-'}:{clave_canonica(entrada)}"
+
+    def _buscar(self, clave: str):
+        with self._lock:
+            encontrada = self._entradas.get(clave)
+            if encontrada is None:
+                return False, None
+            expira, valor = encontrada
+            if expira <= time.monotonic():
+                del self._entradas[clave]
+                self.expiradas += 1
+                return False, None
+            self._entradas.move_to_end(clave)
+            self.aciertos += 1
+            return True, valor
+
+    def _guardar(self, clave: str, valor: Any) -> None:
+        with self._lock:
+            self._entradas[clave] = (time.monotonic() + self.ttl_s, valor)
+            self._entradas.move_to_end(clave)
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+                self.expulsiones += 1
+
+    async def obtener(self, entrada: Any, calcular: Callable[[], Awaitable[Any]],
+                      cacheable: Optional[Callable[[Any], bool]] = None) -> Any:
+        """
+        Devuelve la predicción cacheada para `entrada` o la calcula con `calcular()`.
+
+        Los errores no se cachean: se propagan a todos los que esperaban ese cálculo.
+        `cacheable` permite descartar resultados que no deben guardarse.
+        """
+        if not self.activa:
+            return await calcular()
+
+        clave = self._clave(entrada)
+        encontrado, valor = self._buscar(clave)
+        if encontrado:
+            return valor
+
+        loop = asyncio.get_running_loop()
+        tarea = self._en_vuelo.get(clave)
+        if tarea is not None and tarea.get_loop() is loop and not tarea.done():
+            self.coalescidas += 1
+        else:
+            self.fallos += 1
+            tarea = loop.create_task(calcular())
+            self._en_vuelo[clave] = tarea
+            tarea.add_done_callback(lambda t: self._terminar(clave, t, cacheable))
+        # shield: si un cliente se desconecta no se cancela el cálculo de los demás
+        return await asyncio.shield(tarea)
+
+    def _terminar(self, clave: str, tarea: asyncio.Future, cacheable) -> None:
+        if self._en_vuelo.get(clave) is tarea:
+            del self._en_vuelo[clave]
+        if tarea.cancelled() or tarea.exception() is not None:
+            return
+        resultado = tarea.result()
+        if cacheable is None or cacheable(resultado):
+            self._guardar(clave, resultado)
+
+    def limpiar(self) -> None:
+        with self._lock:
+            self._entradas.clear()
+
+    def estadisticas(self) -> Dict:
+        with self._lock:
+            entradas = len(self._entradas)
+        consultas = self.aciertos + self.fallos + self.coalescidas
+        return {
+            "activa": self.activa,
+            "max_entradas": self.max_entradas,
+            "ttl_s": self.ttl_s,
+            "entradas": entradas,
+            "en_vuelo": len(self._en_vuelo),
+            "aciertos": self.aciertos,
+            "fallos": self.fallos,
+            "coalescidas": self.coalescidas,
+            "expulsiones": self.expulsiones,
+            "expiradas": self.expiradas,
+            "tasa_aciertos": (self.aciertos + self.coalescidas) / consultas if consultas else 0.0,
+        }
+
+
+_caches: Dict[str, CachePredicciones] = {}
+
+
+def registrar_cache(nombre: str, **opciones) -> CachePredicciones:
+    """Crea (o reemplaza) la caché de predicciones de un modelo"""
+    cache = CachePredicciones(nombre, **opciones)
+    _caches[nombre] = cache
+    return cache
+
+
+def obtener_cache(nombre: str) -> CachePredicciones:
+    return _caches[nombre]
+
+
+def estadisticas_cache() -> Dict[str, Dict]:
+    return {nombre: cache.estadisticas() for nombre, cache in _caches.items()}
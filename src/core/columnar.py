@@ -0,0 +1,308 @@
+# src/core/columnar.py
+"""
+Cuerpos columnares binarios para los endpoints de lote: Arrow IPC (stream) y
+MessagePack. Las columnas se decodifican directamente a arreglos de NumPy y
+se validan columna por columna (tipo, rango y categorías permitidas) contra el
+schema de Pydantic del endpoint, sin crear un objeto por fila.
+
+Ambos formatos son dependencias opcionales (`pip install pyarrow msgpack`);
+si la librería no está instalada el endpoint responde 415 para ese tipo de
+contenido y sigue aceptando JSON.
+
+MessagePack: un mapa {columna: valores}, donde los valores son una lista o,
+para columnas numéricas, {"dtype": "<f8", "datos": <bytes>} con el arreglo en
+crudo (se lee sin copiar). La respuesta usa la misma forma.
+"""
+import enum
+from typing import Any, Dict, List, Literal, NamedTuple, Optional, Tuple, Type, Union, get_args, get_origin
+
+import numpy as np
+from fastapi import HTTPException, Request
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import Response
+from pydantic import BaseModel, TypeAdapter, ValidationError
+
+TIPO_ARROW = "application/vnd.apache.arrow.stream"
+TIPO_MSGPACK = "application/msgpack"
+
+# Tipo de contenido -> formato columnar
+FORMATOS = {
+    TIPO_ARROW: "arrow",
+    TIPO_MSGPACK: "msgpack",
+    "application/x-msgpack": "msgpack",
+}
+TIPOS_RESPUESTA = {"arrow": TIPO_ARROW, "msgpack": TIPO_MSGPACK}
+
+# Filas con error que se informan por columna
+MAX_FILAS_ERROR = 10
+
+
+class Columna(NamedTuple):
+    nombre: str
+    tipo: str  # "float", "int", "bool" o "str"
+    minimo: Optional[float] = None
+    maximo: Optional[float] = None
+    minimo_exclusivo: bool = False
+    maximo_exclusivo: bool = False
+    categorias: Optional[Tuple[Any, ...]] = None
+
+
+class LoteColumnar(NamedTuple):
+    formato: str
+    columnas: Dict[str, np.ndarray]
+    filas: int
+
+
+def _columna(nombre: str, campo) -> Columna:
+    anotacion = campo.annotation
+    categorias = None
+    if get_origin(anotacion) is Literal:
+        categorias = tuple(get_args(anotacion))
+        anotacion = type(categorias[0])
+    elif isinstance(anotacion, type) and issubclass(anotacion, enum.Enum):
+        categorias = tuple(miembro.value for miembro in anotacion)
+        anotacion = type(categorias[0])
+    tipos = {float: "float", int: "int", bool: "bool", str: "str"}
+    if anotacion not in tipos:
+        raise TypeError(f"Campo '{nombre}' de tipo {anotacion} no soportado en lotes columnares")
+
+    limites = {}
+    for restriccion in campo.metadata:
+        for atributo, clave, exclusivo in (("ge", "minimo", False), ("gt", "minimo", True),
+                                           ("le", "maximo", False), ("lt", "maximo", True)):
+            valor = getattr(restriccion, atributo, None)
+            if valor is not None:
+                limites[clave] = valor
+                limites[f"{clave}_exclusivo"] = exclusivo
+    return Columna(nombre, tipos[anotacion], categorias=categorias, **limites)
+
+
+_esquemas: Dict[type, List[Columna]] = {}
+
+
+def esquema_columnar(esquema: Type[BaseModel]) -> List[Columna]:
+    """Columnas (tipo, límites ge/gt/le/lt y valores de Literal o Enum) de un schema de Pydantic"""
+    if esquema not in _esquemas:
+        _esquemas[esquema] = [_columna(nombre, campo) for nombre, campo in esquema.model_fields.items()]
+    return _esquemas[esquema]
+
+
+def _importar(formato: str):
+    try:
+        if formato == "arrow":
+            import pyarrow
+            import pyarrow.ipc  # noqa: F401
+            return pyarrow
+        import msgpack
+        return msgpack
+    except ImportError:
+        raise HTTPException(
+            status_code=415,
+            detail=f"El servidor no tiene instalado el soporte para {TIPOS_RESPUESTA[formato]}; envíe JSON"
+        )
+
+
+def leer_columnas(cuerpo: bytes, formato: str) -> Dict[str, np.ndarray]:
+    """
+    Decodifica un cuerpo columnar a {columna: arreglo}. Las columnas numéricas
+    sin nulos se leen sin copiar.
+
+    Raises:
+        ValueError: Si el cuerpo no se puede decodificar.
+    """
+    libreria = _importar(formato)
+    if formato == "arrow":
+        try:
+            tabla = libreria.ipc.open_stream(cuerpo).read_all()
+        except libreria.ArrowException as e:
+            raise ValueError(f"Cuerpo Arrow IPC inválido: {e}")
+        columnas = {}
+        for nombre, columna in zip(tabla.column_names, tabla.columns):
+            columna = columna.combine_chunks() if columna.num_chunks != 1 else columna.chunk(0)
+            if columna.null_count:
+                raise ValueError(f"La columna '{nombre}' tiene valores nulos")
+            columnas[nombre] = columna.to_numpy(zero_copy_only=False)
+        return columnas
+
+    try:
+        datos = libreria.unpackb(cuerpo, raw=False)
+    except Exception as e:
+        raise ValueError(f"Cuerpo MessagePack inválido: {e}")
+    if not isinstance(datos, dict):
+        raise ValueError("El cuerpo MessagePack debe ser un mapa {columna: valores}")
+    columnas = {}
+    for nombre, valores in datos.items():
+        if isinstance(valores, dict):
+            try:
+                columnas[nombre] = np.frombuffer(valores["datos"], dtype=np.dtype(valores["dtype"]))
+            except (KeyError, TypeError, ValueError) as e:
+                raise ValueError(f"Columna '{nombre}': arreglo binario inválido ({e})")
+        elif isinstance(valores, list):
+            arreglo = np.asarray(valores) if valores else np.array([], dtype=float)
+            # Una lista con textos se conserva como objetos: asarray convertiría los números a texto
+            columnas[nombre] = np.array(valores, dtype=object) if arreglo.dtype.kind == "U" else arreglo
+        else:
+            raise ValueError(f"Columna '{nombre}': se esperaba una lista o un arreglo binario")
+    return columnas
+
+
+def _filas(mascara: np.ndarray) -> List[int]:
+    return np.flatnonzero(mascara)[:MAX_FILAS_ERROR].tolist()
+
+
+def _validar_columna(columna: Columna, valores: np.ndarray) -> Tuple[Optional[np.ndarray], Optional[dict]]:
+    def error(mensaje: str, mascara: Optional[np.ndarray] = None):
+        detalle = {"loc": ["body", columna.nombre], "msg": mensaje, "type": "columna_invalida"}
+        if mascara is not None:
+            detalle["filas"] = _filas(mascara)
+        return None, detalle
+
+    tipo = valores.dtype.kind
+    if columna.tipo == "str":
+        if tipo == "U":
+            valores = valores.astype(object)
+        elif tipo != "O":
+            return error("Se esperaba una columna de texto")
+        no_texto = np.fromiter((not isinstance(v, str) for v in valores), dtype=bool, count=len(valores))
+        if no_texto.any():
+            return error("Se esperaban valores de texto", no_texto)
+    elif columna.tipo == "bool":
+        if tipo not in "biu":
+            return error("Se esperaba una columna booleana")
+        if tipo != "b" and ((valores != 0) & (valores != 1)).any():
+            return error("Se esperaban valores 0 o 1", (valores != 0) & (valores != 1))
+        valores = valores.astype(bool)
+    else:
+        if tipo not in "biuf":
+            return error(f"Se esperaba una columna numérica ({columna.tipo})")
+        if tipo == "f":
+            no_finitos = ~np.isfinite(valores)
+            if no_finitos.any():
+                return error("Valores no finitos", no_finitos)
+        if columna.tipo == "int":
+            if tipo == "f":
+                fraccionarios = valores != np.floor(valores)
+                if fraccionarios.any():
+                    return error("Se esperaban valores enteros", fraccionarios)
+            valores = valores.astype(np.int64, copy=False)
+        else:
+            valores = valores.astype(np.float64, copy=False)
+
+        if columna.minimo is not None:
+            fuera = valores <= columna.minimo if columna.minimo_exclusivo else valores < columna.minimo
+            if fuera.any():
+                signo = ">" if columna.minimo_exclusivo else ">="
+                return error(f"Los valores deben ser {signo} {columna.minimo}", fuera)
+        if columna.maximo is not None:
+            fuera = valores >= columna.maximo if columna.maximo_exclusivo else valores > columna.maximo
+            if fuera.any():
+                signo = "<" if columna.maximo_exclusivo else "<="
+                return error(f"Los valores deben ser {signo} {columna.maximo}", fuera)
+
+    if columna.categorias is not None:
+        fuera = ~np.isin(valores, np.array(columna.categorias, dtype=object))
+        if fuera.any():
+            return error(f"Valores permitidos: {', '.join(map(str, columna.categorias))}", fuera)
+    return valores, None
+
+
+def validar_columnas(columnas: Dict[str, np.ndarray], esquema: Type[BaseModel]) -> Dict[str, np.ndarray]:
+    """
+    Valida y convierte cada columna al tipo del schema. Las columnas que el
+    schema no declara se ignoran.
+
+    Raises:
+        RequestValidationError: Con un error por columna inválida o faltante.
+    """
+    validas, errores = {}, []
+    largos = {len(valores) for valores in columnas.values()}
+    if len(largos) > 1:
+        raise RequestValidationError([{
+            "loc": ["body"], "msg": "Todas las columnas deben tener el mismo largo", "type": "columna_invalida"
+        }])
+    for columna in esquema_columnar(esquema):
+        if columna.nombre not in columnas:
+            errores.append({"loc": ["body", columna.nombre], "msg": "Field required", "type": "missing"})
+            continue
+        valores, error = _validar_columna(columna, np.asarray(columnas[columna.nombre]))
+        if error:
+            errores.append(error)
+        else:
+            validas[columna.nombre] = valores
+    if errores:
+        raise RequestValidationError(errores)
+    return validas
+
+
+async def leer_lote(request: Request, esquema: Type[BaseModel]) -> Union[List[BaseModel], LoteColumnar]:
+    """
+    Lee el cuerpo de un endpoint de lote según su Content-Type: JSON (lista de
+    objetos, validada con Pydantic) o un formato columnar (LoteColumnar).
+
+    Raises:
+        HTTPException: 415 si el tipo de contenido no se acepta, 400 si el cuerpo no se puede decodificar.
+        RequestValidationError: Si los datos no cumplen el schema.
+    """
+    tipo = request.headers.get("content-type", "application/json").split(";")[0].strip().lower()
+    cuerpo = await request.body()
+    if tipo in FORMATOS:
+        formato = FORMATOS[tipo]
+        try:
+            columnas = leer_columnas(cuerpo, formato)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        columnas = validar_columnas(columnas, esquema)
+        filas = len(next(iter(columnas.values()))) if columnas else 0
+        return LoteColumnar(formato, columnas, filas)
+    if tipo != "application/json" and not tipo.endswith("+json"):
+        raise HTTPException(
+            status_code=415,
+            detail=f"Tipo de contenido no soportado: {tipo}; use application/json, {TIPO_ARROW} o {TIPO_MSGPACK}"
+        )
+    try:
+        return _adaptador(esquema).validate_json(cuerpo)
+    except ValidationError as e:
+        raise RequestValidationError([{**error, "loc": ("body", *error["loc"])} for error in e.errors()])
+
+
+_adaptadores: Dict[type, TypeAdapter] = {}
+
+
+def _adaptador(esquema: Type[BaseModel]) -> TypeAdapter:
+    if esquema not in _adaptadores:
+        _adaptadores[esquema] = TypeAdapter(List[esquema])
+    return _adaptadores[esquema]
+
+
+def escribir_columnas(columnas: Dict[str, np.ndarray], formato: str) -> bytes:
+    """Codifica {columna: arreglo} en el mismo formato columnar de la request"""
+    libreria = _importar(formato)
+    if formato == "arrow":
+        tabla = libreria.table({nombre: libreria.array(valores) for nombre, valores in columnas.items()})
+        salida = libreria.BufferOutputStream()
+        with libreria.ipc.new_stream(salida, tabla.schema) as escritor:
+            escritor.write_table(tabla)
+        return salida.getvalue().to_pybytes()
+
+    datos = {}
+    for nombre, valores in columnas.items():
+        valores = np.asarray(valores)
+        if valores.dtype.kind in "biuf":
+            datos[nombre] = {"dtype": valores.dtype.str, "datos": np.ascontiguousarray(valores).tobytes()}
+        else:
+            datos[nombre] = valores.tolist()
+    return libreria.packb(datos, use_bin_type=True)
+
+
+def respuesta_columnar(columnas: Dict[str, np.ndarray], formato: str) -> Response:
+    return Response(escribir_columnas(columnas, formato), media_type=TIPOS_RESPUESTA[formato])
+
+
+def cuerpo_openapi(esquema: Type[BaseModel]) -> dict:
+    """`openapi_extra` que documenta los tipos de contenido aceptados por un endpoint de lote"""
+    binario = {"schema": {"type": "string", "format": "binary"}}
+    return {"requestBody": {"required": True, "content": {
+        "application/json": {"schema": {"type": "array", "items": {"$ref": f"#/components/schemas/{esquema.__name__}"}}},
+        TIPO_ARROW: binario,
+        TIPO_MSGPACK: binario,
+    }}}
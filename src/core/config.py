@@ -0,0 +1,78 @@
+# src/core/config.py
+import os
+
+# Todas las opciones del servidor se leen de variables de entorno con este prefijo.
+# Una opción puede definirse por modelo (BANKMIND_<CLAVE>_<MODELO>) o de forma
+# global (BANKMIND_<CLAVE>); la específica del modelo tiene prioridad.
+PREFIJO = "BANKMIND_"
+
+_VERDADEROS = {"1", "true", "si", "sí", "on", "yes"}
+_FALSOS = {"0", "false", "no", "off"}
+
+
+def _leer(clave: str, modelo: str = None):
+    if modelo:
+        valor = os.environ.get(f"{PREFIJO}{clave}_{modelo}".upper())
+        if valor is not None:
+            return valor
+    return os.environ.get(f"{PREFIJO}{clave}".upper())
+
+
+def _nombre(clave: str, modelo: str = None) -> str:
+    return f"{PREFIJO}{clave}_{modelo}".upper() if modelo else f"{PREFIJO}{clave}".upper()
+
+
+def obtener_texto(clave: str, defecto: str = None, modelo: str = None) -> str:
+    """Devuelve la opción como texto, o `defecto` si no está definida."""
+    valor = _leer(clave, modelo)
+    return defecto if valor is None else valor
+
+
+def obtener_entero(clave: str, defecto: int, modelo: str = None) -> int:
+    """
+    Devuelve la opción como entero.
+
+    Raises:
+        ValueError: Si la variable existe pero no es un entero válido.
+    """
+    valor = _leer(clave, modelo)
+    if valor is None:
+        return defecto
+    try:
+        return int(valor)
+    except ValueError:
+        raise ValueError(f"{_nombre(clave, modelo)} debe ser un entero, se recibió '{valor}'")
+
+
+def obtener_flotante(clave: str, defecto: float, modelo: str = None) -> float:
+    """
+    Devuelve la opción como número decimal.
+
+    Raises:
+        ValueError: Si la variable existe pero no es un número válido.
+    """
+    valor = _leer(clave, modelo)
+    if valor is None:
+        return defecto
+    try:
+        return float(valor)
+    except ValueError:
+        raise ValueError(f"{_nombre(clave, modelo)} debe ser un número, se recibió '{valor}'")
+
+
+def obtener_bool(clave: str, defecto: bool, modelo: str = None) -> bool:
+    """
+    Devuelve la opción como booleano (1/0, true/false, si/no, on/off).
+
+    Raises:
+        ValueError: Si la variable existe pero no es un booleano reconocible.
+    """
+    valor = _leer(clave, modelo)
+    if valor is None:
+        return defecto
+    normalizado = valor.strip().lower()
+    if normalizado in _VERDADEROS:
+        return True
+    if normalizado in _FALSOS:
+        return False
+    raise ValueError(f"{_nombre(clave, modelo)} debe ser un booleano, se recibió '{valor}'")
@@ -0,0 +1,646 @@
+# src/core/deriva.py
+import atexit
+import glob
+import json
+import math
+import os
+import tempfile
+import threading
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Mapping, Optional
+
+import numpy as np
+
+from core import prefork
+from core.config import obtener_bool, obtener_flotante, obtener_texto
+from core.registro import registro
+
+# Monitoreo de deriva de entradas y puntajes: cada modelo declara sus variables
+# y el camino de inferencia les pasa los valores de cada lote. Los resúmenes
+# son de tamaño fijo (no crecen con el tráfico), se pueden sumar entre workers
+# y se comparan con un perfil de referencia guardado junto al artefacto.
+#
+# Opciones: BANKMIND_DERIVA[_<MODELO>] (activo por defecto), BANKMIND_DERIVA_DIR
+# (estado compartido entre workers), BANKMIND_DERIVA_VOLCADO_S,
+# BANKMIND_DERIVA_UMBRAL_PSI[_<MODELO>] y BANKMIND_DERIVA_PERFIL_<MODELO>.
+
+# Sketch de cuantiles: buckets logarítmicos con este error relativo. Con 2048
+# buckets por signo cubre magnitudes de MINIMO_INDEXABLE a ~6e11; por debajo
+# cuentan como cero y por encima se acumulan en el último bucket.
+ERROR_RELATIVO = 0.01
+BUCKETS_CUANTILES = 2048
+MINIMO_INDEXABLE = 1e-6
+
+# Histograma de puntajes en [0, 1] con bins de igual ancho
+BINS_PUNTAJE = 100
+
+# Categorías distintas que sigue el contador de frecuencias (Space-Saving)
+CATEGORIAS_MAXIMAS = 64
+
+# Bins del PSI: deciles de la referencia
+BINS_PSI = 10
+
+# PSI a partir del cual una variable se marca con deriva (0.1-0.2 moderada, > 0.2 significativa)
+UMBRAL_PSI_DEFECTO = 0.2
+
+# Cada cuánto (segundos) un worker vuelca su estado para que lo lean los demás
+VOLCADO_DEFECTO_S = 15.0
+
+# Proporción mínima por bin en el PSI, para que un bin vacío no lo haga infinito
+_PISO_PSI = 1e-4
+
+_GAMMA = (1 + ERROR_RELATIVO) / (1 - ERROR_RELATIVO)
+_LOG_GAMMA = math.log(_GAMMA)
+_DESPLAZAMIENTO = math.ceil(math.log(MINIMO_INDEXABLE) / _LOG_GAMMA)
+
+
+class _Resumen(ABC):
+    """
+    Conteo, suma, suma de cuadrados, mínimo y máximo de los valores finitos;
+    cada subclase define sus buckets (`_contar`, `_contar_uno`, `conteos`, `_valor_bucket`).
+    """
+
+    tipo = ""
+
+    def __init__(self):
+        self.total = 0
+        self.invalidos = 0
+        self.suma = 0.0
+        self.suma_cuadrados = 0.0
+        self.minimo = math.inf
+        self.maximo = -math.inf
+
+    def agregar(self, valores) -> None:
+        valores = np.asarray(valores, dtype=float).ravel()
+        finitos = np.isfinite(valores)
+        if not finitos.all():
+            self.invalidos += int(valores.size - np.count_nonzero(finitos))
+            valores = valores[finitos]
+        if valores.size == 0:
+            return
+        self.total += int(valores.size)
+        self.suma += float(valores.sum())
+        self.suma_cuadrados += float(np.dot(valores, valores))
+        self.minimo = min(self.minimo, float(valores.min()))
+        self.maximo = max(self.maximo, float(valores.max()))
+        self._contar(valores)
+
+    def agregar_uno(self, valor: float) -> None:
+        valor = float(valor)
+        if not math.isfinite(valor):
+            self.invalidos += 1
+            return
+        self.total += 1
+        self.suma += valor
+        self.suma_cuadrados += valor * valor
+        self.minimo = min(self.minimo, valor)
+        self.maximo = max(self.maximo, valor)
+        self._contar_uno(valor)
+
+    @abstractmethod
+    def _contar(self, valores: np.ndarray) -> None:
+        """Suma al sketch un arreglo de valores finitos"""
+
+    @abstractmethod
+    def _contar_uno(self, valor: float) -> None:
+        """Suma al sketch un valor finito"""
+
+    def combinar(self, otro: "_Resumen") -> None:
+        self.total += otro.total
+        self.invalidos += otro.invalidos
+        self.suma += otro.suma
+        self.suma_cuadrados += otro.suma_cuadrados
+        self.minimo = min(self.minimo, otro.minimo)
+        self.maximo = max(self.maximo, otro.maximo)
+
+    @abstractmethod
+    def conteos(self) -> np.ndarray:
+        """Conteos por bucket en orden creciente de valor; dos resúmenes del mismo tipo comparten la grilla"""
+
+    @abstractmethod
+    def _valor_bucket(self, indice: int) -> float:
+        """Valor representativo del bucket `indice` de `conteos()`"""
+
+    def cuantil(self, q: float) -> Optional[float]:
+        if self.total == 0:
+            return None
+        acumulado = np.cumsum(self.conteos())
+        indice = int(np.searchsorted(acumulado, q * (self.total - 1), side="right"))
+        return min(max(self._valor_bucket(indice), self.minimo), self.maximo)
+
+    def describir(self) -> Dict:
+        if self.total == 0:
+            return {"total": 0, "invalidos": self.invalidos}
+        media = self.suma / self.total
+        varianza = max(self.suma_cuadrados / self.total - media * media, 0.0)
+        return {
+            "total": self.total,
+            "invalidos": self.invalidos,
+            "media": media,
+            "desviacion": math.sqrt(varianza),
+            "minimo": self.minimo,
+            "maximo": self.maximo,
+            **{f"p{int(q * 100):02d}": self.cuantil(q) for q in (0.05, 0.25, 0.5, 0.75, 0.95)},
+        }
+
+    def exportar(self) -> Dict:
+        return {
+            "tipo": self.tipo, "total": self.total, "invalidos": self.invalidos,
+            "suma": self.suma, "suma_cuadrados": self.suma_cuadrados,
+            # JSON no admite infinitos: un resumen vacío se exporta sin mínimo ni máximo
+            "minimo": self.minimo if self.total else None, "maximo": self.maximo if self.total else None,
+        }
+
+    def _importar(self, estado: Dict) -> None:
+        self.total = estado["total"]
+        self.invalidos = estado["invalidos"]
+        self.suma = estado["suma"]
+        self.suma_cuadrados = estado["suma_cuadrados"]
+        self.minimo = math.inf if estado["minimo"] is None else estado["minimo"]
+        self.maximo = -math.inf if estado["maximo"] is None else estado["maximo"]
+
+
+def _disperso(conteos: np.ndarray) -> List[List[int]]:
+    indices = np.flatnonzero(conteos)
+    return [indices.tolist(), conteos[indices].tolist()]
+
+
+def _denso(disperso: List[List[int]], tamano: int) -> np.ndarray:
+    conteos = np.zeros(tamano, dtype=np.int64)
+    conteos[np.asarray(disperso[0], dtype=np.int64)] = disperso[1]
+    return conteos
+
+
+class SketchCuantiles(_Resumen):
+    """
+    Sketch de cuantiles con buckets logarítmicos de tamaño fijo (estilo
+    DDSketch): cada valor cae en el bucket ceil(log_gamma(|x|)) de su signo, así
+    que cualquier cuantil se estima con error relativo ERROR_RELATIVO. Se
+    combina sumando buckets.
+    """
+
+    tipo = "cuantiles"
+
+    def __init__(self):
+        super().__init__()
+        self.positivos = np.zeros(BUCKETS_CUANTILES, dtype=np.int64)
+        self.negativos = np.zeros(BUCKETS_CUANTILES, dtype=np.int64)
+        self.ceros = 0
+
+    @staticmethod
+    def _indices(magnitudes: np.ndarray) -> np.ndarray:
+        indices = np.ceil(np.log(magnitudes) / _LOG_GAMMA).astype(np.int64) - _DESPLAZAMIENTO
+        return np.clip(indices, 0, BUCKETS_CUANTILES - 1)
+
+    def _contar(self, valores: np.ndarray) -> None:
+        magnitudes = np.abs(valores)
+        indexables = magnitudes >= MINIMO_INDEXABLE
+        self.ceros += int(valores.size - np.count_nonzero(indexables))
+        positivos = indexables & (valores > 0)
+        negativos = indexables & (valores < 0)
+        if positivos.any():
+            self.positivos += np.bincount(self._indices(magnitudes[positivos]), minlength=BUCKETS_CUANTILES)
+        if negativos.any():
+            self.negativos += np.bincount(self._indices(magnitudes[negativos]), minlength=BUCKETS_CUANTILES)
+
+    def _contar_uno(self, valor: float) -> None:
+        magnitud = abs(valor)
+        if magnitud < MINIMO_INDEXABLE:
+            self.ceros += 1
+            return
+        indice = min(max(math.ceil(math.log(magnitud) / _LOG_GAMMA) - _DESPLAZAMIENTO, 0), BUCKETS_CUANTILES - 1)
+        (self.positivos if valor > 0 else self.negativos)[indice] += 1
+
+    def combinar(self, otro: "SketchCuantiles") -> None:
+        super().combinar(otro)
+        self.positivos += otro.positivos
+        self.negativos += otro.negativos
+        self.ceros += otro.ceros
+
+    def conteos(self) -> np.ndarray:
+        return np.concatenate([self.negativos[::-1], [self.ceros], self.positivos])
+
+    def _valor_bucket(self, indice: int) -> float:
+        if indice == BUCKETS_CUANTILES:
+            return 0.0
+        if indice > BUCKETS_CUANTILES:
+            signo, bucket = 1.0, indice - BUCKETS_CUANTILES - 1
+        else:
+            signo, bucket = -1.0, BUCKETS_CUANTILES - 1 - indice
+        # Punto del bucket con el mismo error relativo hacia ambos bordes
+        return signo * 2 * _GAMMA ** (bucket + _DESPLAZAMIENTO) / (_GAMMA + 1)
+
+    def exportar(self) -> Dict:
+        return {
+            **super().exportar(), "error_relativo": ERROR_RELATIVO, "buckets": BUCKETS_CUANTILES,
+            "ceros": self.ceros, "positivos": _disperso(self.positivos), "negativos": _disperso(self.negativos),
+        }
+
+    def _importar(self, estado: Dict) -> None:
+        if estado["error_relativo"] != ERROR_RELATIVO or estado["buckets"] != BUCKETS_CUANTILES:
+            raise ValueError("El sketch de cuantiles se generó con otros parámetros")
+        super()._importar(estado)
+        self.ceros = estado["ceros"]
+        self.positivos = _denso(estado["positivos"], BUCKETS_CUANTILES)
+        self.negativos = _denso(estado["negativos"], BUCKETS_CUANTILES)
+
+
+class HistogramaPuntajes(_Resumen):
+    """
+    Histograma de BINS_PUNTAJE bins de igual ancho en [0, 1] para
+    probabilidades; los valores fuera del rango se acumulan en el bin del borde.
+    """
+
+    tipo = "puntajes"
+
+    def __init__(self):
+        super().__init__()
+        self.bins = np.zeros(BINS_PUNTAJE, dtype=np.int64)
+
+    def _contar(self, valores: np.ndarray) -> None:
+        indices = np.clip((valores * BINS_PUNTAJE).astype(np.int64), 0, BINS_PUNTAJE - 1)
+        self.bins += np.bincount(indices, minlength=BINS_PUNTAJE)
+
+    def _contar_uno(self, valor: float) -> None:
+        self.bins[min(max(int(valor * BINS_PUNTAJE), 0), BINS_PUNTAJE - 1)] += 1
+
+    def combinar(self, otro: "HistogramaPuntajes") -> None:
+        super().combinar(otro)
+        self.bins += otro.bins
+
+    def conteos(self) -> np.ndarray:
+        return self.bins
+
+    def _valor_bucket(self, indice: int) -> float:
+        return (indice + 0.5) / BINS_PUNTAJE
+
+    def exportar(self) -> Dict:
+        return {**super().exportar(), "bins": self.bins.tolist()}
+
+    def _importar(self, estado: Dict) -> None:
+        if len(estado["bins"]) != BINS_PUNTAJE:
+            raise ValueError("El histograma de puntajes se generó con otra cantidad de bins")
+        super()._importar(estado)
+        self.bins = np.asarray(estado["bins"], dtype=np.int64)
+
+
+class ContadorCategorias:
+    """
+    Frecuencias de las CATEGORIAS_MAXIMAS categorías más comunes con el
+    algoritmo Space-Saving: una categoría nueva con el contador lleno
+    reemplaza a la de menor conteo y hereda ese conteo como error máximo.
+    """
+
+    tipo = "categorias"
+
+    def __init__(self):
+        self.total = 0
+        self.frecuencias: Dict[str, int] = {}
+        self.errores: Dict[str, int] = {}
+
+    def _sumar(self, categoria: str, conteo: int) -> None:
+        if categoria in self.frecuencias:
+            self.frecuencias[categoria] += conteo
+            return
+        error = 0
+        if len(self.frecuencias) >= CATEGORIAS_MAXIMAS:
+            menor = min(self.frecuencias, key=self.frecuencias.get)
+            error = self.frecuencias.pop(menor)
+            self.errores.pop(menor, None)
+        self.frecuencias[categoria] = conteo + error
+        if error:
+            self.errores[categoria] = error
+
+    def agregar(self, valores) -> None:
+        categorias, conteos = np.unique(np.asarray(valores, dtype=str), return_counts=True)
+        for categoria, conteo in zip(categorias.tolist(), conteos.tolist()):
+            self._sumar(categoria, conteo)
+        self.total += int(conteos.sum())
+
+    def agregar_uno(self, valor: Any) -> None:
+        self._sumar(str(valor), 1)
+        self.total += 1
+
+    def combinar(self, otro: "ContadorCategorias") -> None:
+        self.total += otro.total
+        for categoria, conteo in otro.frecuencias.items():
+            self.frecuencias[categoria] = self.frecuencias.get(categoria, 0) + conteo
+        for categoria, error in otro.errores.items():
+            self.errores[categoria] = self.errores.get(categoria, 0) + error
+        if len(self.frecuencias) > CATEGORIAS_MAXIMAS:
+            conservadas = sorted(self.frecuencias, key=self.frecuencias.get, reverse=True)[:CATEGORIAS_MAXIMAS]
+            self.frecuencias = {categoria: self.frecuencias[categoria] for categoria in conservadas}
+            self.errores = {c: e for c, e in self.errores.items() if c in self.frecuencias}
+
+    def proporciones(self) -> Dict[str, float]:
+        if self.total == 0:
+            return {}
+        return {categoria: conteo / self.total for categoria, conteo in self.frecuencias.items()}
+
+    def describir(self) -> Dict:
+        principales = sorted(self.proporciones().items(), key=lambda par: par[1], reverse=True)[:10]
+        return {"total": self.total, "seguidas": len(self.frecuencias), "principales": dict(principales)}
+
+    def exportar(self) -> Dict:
+        return {"tipo": self.tipo, "total": self.total,
+                "frecuencias": dict(self.frecuencias), "errores": dict(self.errores)}
+
+    def _importar(self, estado: Dict) -> None:
+        self.total = estado["total"]
+        self.frecuencias = dict(estado["frecuencias"])
+        self.errores = dict(estado["errores"])
+
+
+_TIPOS = {clase.tipo: clase for clase in (SketchCuantiles, HistogramaPuntajes, ContadorCategorias)}
+
+
+def importar_sketch(estado: Dict):
+    """Reconstruye un sketch a partir de su `exportar()`"""
+    sketch = _TIPOS[estado["tipo"]]()
+    sketch._importar(estado)
+    return sketch
+
+
+def _psi(referencia: np.ndarray, actual: np.ndarray) -> float:
+    referencia = np.maximum(referencia / referencia.sum(), _PISO_PSI)
+    actual = np.maximum(actual / actual.sum(), _PISO_PSI)
+    return float(np.sum((actual - referencia) * np.log(actual / referencia)))
+
+
+def comparar(referencia, actual) -> Optional[Dict]:
+    """
+    Deriva de `actual` respecto de `referencia` (dos sketches del mismo tipo).
+
+    Para variables numéricas: PSI sobre los deciles de la referencia y
+    estadístico de Kolmogorov-Smirnov sobre la grilla común de buckets. Para
+    categorías: PSI sobre las categorías de la referencia más "otras".
+    """
+    if referencia.total == 0 or actual.total == 0:
+        return None
+    if isinstance(referencia, ContadorCategorias):
+        categorias = list(referencia.frecuencias)
+        ref = np.array([referencia.frecuencias[c] for c in categorias] + [0], dtype=float)
+        act = np.array([actual.frecuencias.get(c, 0) for c in categorias] + [0], dtype=float)
+        ref[-1] = referencia.total - ref[:-1].sum()
+        act[-1] = actual.total - act[:-1].sum()
+        nuevas = {c: n / actual.total for c, n in actual.frecuencias.items() if c not in referencia.frecuencias}
+        principales = sorted(nuevas.items(), key=lambda par: par[1], reverse=True)[:10]
+        return {"psi": _psi(ref, act), "nuevas": dict(principales)}
+
+    ref, act = referencia.conteos(), actual.conteos()
+    acumulada_ref = np.cumsum(ref) / referencia.total
+    acumulada_act = np.cumsum(act) / actual.total
+    # Bins del PSI: buckets agrupados en los deciles de la referencia
+    cortes = np.searchsorted(acumulada_ref, np.arange(1, BINS_PSI) / BINS_PSI, side="right")
+    cortes = np.unique(np.concatenate([[0], cortes[cortes < len(ref)]]))
+    media_ref = referencia.suma / referencia.total
+    return {
+        "psi": _psi(np.add.reduceat(ref, cortes).astype(float), np.add.reduceat(act, cortes).astype(float)),
+        "ks": float(np.max(np.abs(acumulada_ref - acumulada_act))),
+        "media_referencia": media_ref,
+        "variacion_media": actual.suma / actual.total - media_ref,
+    }
+
+
+class MonitorDeriva:
+    """
+    Sketches de un modelo, uno por variable observada.
+
+    `observar` recibe los valores de un lote (arreglos, listas o escalares
+    para una sola fila) y actualiza los sketches en tiempo O(filas) y memoria
+    fija. Bajo el servidor prefork cada worker vuelca su estado en
+    BANKMIND_DERIVA_DIR y `estado_combinado` suma el de todos.
+    """
+
+    def __init__(self, modelo: str, cuantiles: Iterable[str] = (), puntajes: Iterable[str] = (),
+                 categorias: Iterable[str] = ()):
+        self.modelo = modelo
+        self.activo = obtener_bool("DERIVA", True, modelo=modelo)
+        self.umbral_psi = obtener_flotante("DERIVA_UMBRAL_PSI", UMBRAL_PSI_DEFECTO, modelo=modelo)
+        self.tipos: Dict[str, str] = {}
+        for tipo, nombres in (("cuantiles", cuantiles), ("puntajes", puntajes), ("categorias", categorias)):
+            for nombre in nombres:
+                self.tipos[nombre] = tipo
+        self._perfil = (None, None, None)
+        self._reiniciar()
+
+    def _reiniciar(self) -> None:
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+        self._sketches = {nombre: _TIPOS[tipo]() for nombre, tipo in self.tipos.items()}
+        self._cambios = False
+
+    def observar(self, **valores) -> None:
+        if not self.activo:
+            return
+        if self._pid != os.getpid():
+            # Worker recién creado: no hereda las observaciones del proceso padre
+            self._reiniciar()
+        with self._lock:
+            for nombre, valor in valores.items():
+                sketch = self._sketches[nombre]
+                if np.ndim(valor) == 0:
+                    sketch.agregar_uno(valor)
+                elif len(valor) == 1:
+                    sketch.agregar_uno(valor[0])
+                else:
+                    sketch.agregar(valor)
+            self._cambios = True
+        if prefork.MAESTRO is not None:
+            _iniciar_volcado()
+
+    def exportar(self) -> Dict[str, Dict]:
+        with self._lock:
+            return {nombre: sketch.exportar() for nombre, sketch in self._sketches.items()}
+
+    def volcar(self) -> None:
+        """Escribe el estado del worker para que lo combinen los demás"""
+        if not self._cambios or prefork.MAESTRO is None:
+            return
+        self._cambios = False
+        directorio = _directorio_compartido()
+        os.makedirs(directorio, exist_ok=True)
+        escribir_estado(os.path.join(directorio, f"{self.modelo}.{os.getpid()}.json"),
+                        {"modelo": self.modelo, "variables": self.exportar()})
+
+    def estado_combinado(self) -> Dict[str, Any]:
+        """Sketches del proceso sumados a los volcados de los otros workers"""
+        combinados = {nombre: importar_sketch(estado) for nombre, estado in self.exportar().items()}
+        trabajadores = 1
+        if prefork.MAESTRO is not None:
+            propio = f"{self.modelo}.{os.getpid()}.json"
+            for ruta in glob.glob(os.path.join(_directorio_compartido(), f"{self.modelo}.*.json")):
+                if os.path.basename(ruta) == propio:
+                    continue
+                try:
+                    variables = leer_estado(ruta)["variables"]
+                except (OSError, ValueError, KeyError):
+                    continue
+                for nombre, estado in variables.items():
+                    if nombre in combinados:
+                        combinados[nombre].combinar(importar_sketch(estado))
+                trabajadores += 1
+        return {"trabajadores": trabajadores, "sketches": combinados}
+
+    def ruta_perfil(self) -> Optional[str]:
+        """Perfil de referencia: BANKMIND_DERIVA_PERFIL_<MODELO> o <artefacto>.perfil.json"""
+        ruta = obtener_texto("DERIVA_PERFIL", None, modelo=self.modelo)
+        if ruta:
+            return ruta
+        version = registro.version(self.modelo) if registro.registrado(self.modelo) else None
+        if version is None:
+            return None
+        return os.path.splitext(version.ruta)[0] + ".perfil.json"
+
+    def perfil(self) -> Optional[Dict[str, Any]]:
+        """Sketches del perfil de referencia (se vuelve a leer si el archivo cambia)"""
+        ruta = self.ruta_perfil()
+        if ruta is None or not os.path.exists(ruta):
+            return None
+        modificado = os.path.getmtime(ruta)
+        if self._perfil[:2] != (ruta, modificado):
+            variables = leer_estado(ruta)["variables"]
+            self._perfil = (ruta, modificado, {nombre: importar_sketch(estado) for nombre, estado in variables.items()})
+        return self._perfil[2]
+
+    def estadisticas(self) -> Dict:
+        combinado = self.estado_combinado()
+        sketches = combinado["sketches"]
+        try:
+            perfil = self.perfil()
+            error_perfil = None
+        except (OSError, ValueError, KeyError) as e:
+            perfil, error_perfil = None, str(e)
+
+        variables = {}
+        for nombre, sketch in sketches.items():
+            variable = {"tipo": self.tipos[nombre], **sketch.describir()}
+            referencia = perfil.get(nombre) if perfil else None
+            if referencia is not None and referencia.tipo == sketch.tipo:
+                deriva = comparar(referencia, sketch)
+                if deriva is not None:
+                    deriva["alerta"] = deriva["psi"] >= self.umbral_psi
+                    variable["deriva"] = deriva
+            variables[nombre] = variable
+
+        estadisticas = {
+            "activo": self.activo,
+            "trabajadores": combinado["trabajadores"],
+            "perfil": self.ruta_perfil() if perfil else None,
+            "umbral_psi": self.umbral_psi,
+            "variables": variables,
+        }
+        if error_perfil:
+            estadisticas["error_perfil"] = error_perfil
+        return estadisticas
+
+    def guardar_perfil(self, ruta: Optional[str] = None) -> Dict:
+        """
+        Guarda lo observado hasta ahora (todos los workers) como perfil de
+        referencia, p. ej. después de un período validado con el modelo nuevo.
+
+        Raises:
+            ValueError: Si no hay observaciones o no se conoce la ruta del artefacto.
+        """
+        sketches = self.estado_combinado()["sketches"]
+        if not any(sketch.total for sketch in sketches.values()):
+            raise ValueError(f"El modelo '{self.modelo}' todavía no tiene observaciones")
+        ruta = ruta or self.ruta_perfil()
+        if ruta is None:
+            raise ValueError(f"No hay una versión activa de '{self.modelo}' para ubicar el perfil")
+        escribir_perfil(ruta, self.modelo, {nombre: sketch.exportar() for nombre, sketch in sketches.items()})
+        return {"ruta": ruta, "observaciones": {nombre: sketch.total for nombre, sketch in sketches.items()}}
+
+
+def perfil_desde_datos(monitor: MonitorDeriva, columnas: Mapping[str, Any]) -> Dict[str, Dict]:
+    """
+    Variables de un perfil de referencia calculadas sobre datos completos
+    (p. ej. el conjunto de entrenamiento y sus puntajes), con los mismos
+    sketches que usa `monitor`. Se guarda con `escribir_perfil`.
+    """
+    variables = {}
+    for nombre, tipo in monitor.tipos.items():
+        if nombre in columnas:
+            sketch = _TIPOS[tipo]()
+            sketch.agregar(columnas[nombre])
+            variables[nombre] = sketch.exportar()
+    return variables
+
+
+def escribir_perfil(ruta: str, modelo: str, variables: Dict[str, Dict]) -> None:
+    escribir_estado(ruta, {
+        "modelo": modelo,
+        "creado": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "variables": variables,
+    })
+
+
+def escribir_estado(ruta: str, estado: Dict) -> None:
+    # Archivo temporal + rename para que un lector nunca vea un JSON a medio escribir
+    temporal = f"{ruta}.{os.getpid()}.tmp"
+    with open(temporal, "w", encoding="utf-8") as archivo:
+        json.dump(estado, archivo, ensure_ascii=False)
+    os.replace(temporal, ruta)
+
+
+def leer_estado(ruta: str) -> Dict:
+    with open(ruta, encoding="utf-8") as archivo:
+        return json.load(archivo)
+
+
+def _directorio_compartido() -> str:
+    base = obtener_texto("DERIVA_DIR", os.path.join(tempfile.gettempdir(), "bankmind_deriva"))
+    # Un subdirectorio por servidor: los volcados de arranques anteriores no se mezclan
+    return os.path.join(base, str(prefork.MAESTRO))
+
+
+_monitores: Dict[str, MonitorDeriva] = {}
+_volcado = {"pid": None}
+_lock_volcado = threading.Lock()
+
+
+def _volcar_todos() -> None:
+    for monitor in list(_monitores.values()):
+        try:
+            monitor.volcar()
+        except OSError as e:
+            print(f"[WARN] No se pudo volcar la deriva de '{monitor.modelo}': {e}")
+
+
+def _iniciar_volcado() -> None:
+    """Hilo que vuelca periódicamente el estado del worker; uno por proceso"""
+    if _volcado["pid"] == os.getpid():
+        return
+    with _lock_volcado:
+        if _volcado["pid"] == os.getpid():
+            return
+        _volcado["pid"] = os.getpid()
+        intervalo = obtener_flotante("DERIVA_VOLCADO_S", VOLCADO_DEFECTO_S)
+
+        def bucle():
+            while True:
+                time.sleep(intervalo)
+                _volcar_todos()
+
+        threading.Thread(target=bucle, name="bankmind-deriva", daemon=True).start()
+        atexit.register(_volcar_todos)
+
+
+def registrar_deriva(modelo: str, **variables) -> MonitorDeriva:
+    """
+    Crea (o reemplaza) el monitor de deriva de un modelo:
+    `registrar_deriva("fraude", cuantiles=("amt",), puntajes=("xgboost_score",), categorias=("category",))`.
+    """
+    monitor = MonitorDeriva(modelo, **variables)
+    _monitores[modelo] = monitor
+    return monitor
+
+
+def obtener_deriva(modelo: str) -> Optional[MonitorDeriva]:
+    return _monitores.get(modelo)
+
+
+def estadisticas_deriva() -> Dict[str, Dict]:
+    return {modelo: monitor.estadisticas() for modelo, monitor in _monitores.items()}
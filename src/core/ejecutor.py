@@ -0,0 +1,108 @@
+# src/core/ejecutor.py
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+from core.config import obtener_entero
+
+# Se usan hilos y no procesos: XGBoost (vía ctypes), los árboles de sklearn
+# (Cython `nogil`) y NumPy liberan el GIL durante el cálculo pesado, de modo
+# que varios hilos escalan con los núcleos sin copiar los modelos por proceso.
+HILOS_DEFECTO = min(4, os.cpu_count() or 1)
+COLA_DEFECTO = 64
+
+
+class ColaLlenaError(Exception):
+    """La cola de inferencia del modelo alcanzó su capacidad máxima"""
+
+    def __init__(self, nombre: str):
+        super().__init__(f"El modelo '{nombre}' está saturado, intente nuevamente en unos segundos.")
+        self.nombre = nombre
+
+
+class EjecutorInferencia:
+    """
+    Pool de hilos acotado y dedicado a un modelo, para sacar la inferencia
+    (CPU-bound) del event loop. Admite como máximo `max_hilos` tareas en
+    ejecución más `max_cola` en espera; por encima de eso rechaza con
+    ColaLlenaError en lugar de encolar sin límite.
+
+    Configurable con BANKMIND_HILOS_INFERENCIA_<MODELO> y BANKMIND_COLA_INFERENCIA_<MODELO>.
+    """
+
+    def __init__(self, nombre: str, max_hilos: int = None, max_cola: int = None):
+        self.nombre = nombre
+        self.max_hilos = max_hilos if max_hilos is not None else obtener_entero("HILOS_INFERENCIA", HILOS_DEFECTO, modelo=nombre)
+        self.max_cola = max_cola if max_cola is not None else obtener_entero("COLA_INFERENCIA", COLA_DEFECTO, modelo=nombre)
+        if self.max_hilos < 1 or self.max_cola < 0:
+            raise ValueError(f"Configuración de ejecutor inválida para '{nombre}'")
+        self.rechazadas = 0
+        self._ocupados = 0
+        self._lock = threading.Lock()
+        # El pool se crea en el primer uso (p. ej. después de un fork)
+        self._pool = None
+
+    def _obtener_pool(self) -> ThreadPoolExecutor:
+        if self._pool is None:
+            with self._lock:
+                if self._pool is None:
+                    self._pool = ThreadPoolExecutor(max_workers=self.max_hilos, thread_name_prefix=f"inferencia-{self.nombre}")
+        return self._pool
+
+    def _reservar(self) -> None:
+        with self._lock:
+            if self._ocupados >= self.max_hilos + self.max_cola:
+                self.rechazadas += 1
+                raise ColaLlenaError(self.nombre)
+            self._ocupados += 1
+
+    def _liberar(self, _futuro=None) -> None:
+        with self._lock:
+            self._ocupados -= 1
+
+    def enviar(self, funcion: Callable, *args):
+        """Envía una tarea al pool y devuelve su concurrent.futures.Future"""
+        self._reservar()
+        try:
+            futuro = self._obtener_pool().submit(funcion, *args)
+        except Exception:
+            self._liberar()
+            raise
+        # El cupo se libera cuando la tarea termina, aunque el llamador haya cancelado
+        futuro.add_done_callback(self._liberar)
+        return futuro
+
+    async def ejecutar(self, funcion: Callable, *args) -> Any:
+        """Ejecuta `funcion(*args)` en el pool sin bloquear el event loop"""
+        return await asyncio.wrap_future(self.enviar(funcion, *args))
+
+    @property
+    def ocupados(self) -> int:
+        return self._ocupados
+
+    def estadisticas(self) -> Dict:
+        return {
+            "max_hilos": self.max_hilos,
+            "max_cola": self.max_cola,
+            "ocupados": self._ocupados,
+            "rechazadas": self.rechazadas,
+        }
+
+
+_ejecutores: Dict[str, EjecutorInferencia] = {}
+_lock_registro = threading.Lock()
+
+
+def obtener_ejecutor(nombre: str) -> EjecutorInferencia:
+    """Devuelve el ejecutor del modelo, creándolo con su configuración la primera vez"""
+    ejecutor = _ejecutores.get(nombre)
+    if ejecutor is None:
+        with _lock_registro:
+            ejecutor = _ejecutores.setdefault(nombre, EjecutorInferencia(nombre))
+    return ejecutor
+
+
+def estadisticas_ejecutores() -> Dict[str, Dict]:
+    return {nombre: ejecutor.estadisticas() for nombre, ejecutor in _ejecutores.items()}
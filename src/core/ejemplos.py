@@ -0,0 +1,81 @@
+# src/core/ejemplos.py
+"""
+Entradas de ejemplo por modelo (las mismas de la documentación de cada schema).
+Se usan para calentar un modelo recién cargado y en los benchmarks.
+"""
+
+EJEMPLOS = {
+    "fraude": {
+        "transaction_id": "TXN-9834",
+        "id_cliente": "CLI-5502",
+        "trans_date_trans_time": "2026-01-08 03:24:15",
+        "amt": 15420.0,
+        "category": "shopping_net",
+        "gender": "F",
+        "job": "Scientist",
+        "city_pop": 15000,
+        "dob": "1985-01-15",
+        "lat": -12.0463,
+        "long": -77.0427,
+        "merch_lat": -13.1631,
+        "merch_long": -74.2239,
+    },
+    "fuga": {
+        "Age": 40,
+        "Balance": 60000.0,
+        "CreditScore": 600,
+        "EstimatedSalary": 50000.0,
+        "Gender": "Male",
+        "Geography": "France",
+        "HasCrCard": 1,
+        "IsActiveMember": 1,
+        "NumOfProducts": 2,
+        "Tenure": 3,
+    },
+    "morosidad": {
+        "LIMIT_BAL": 200000,
+        "SEX": 2,
+        "EDUCATION": 2,
+        "MARRIAGE": 1,
+        "AGE": 24,
+        "PAY_0": 2,
+        "PAY_2": 2,
+        "PAY_3": -1,
+        "PAY_4": -1,
+        "PAY_5": -2,
+        "PAY_6": -2,
+        "BILL_AMT1": 3913,
+        "BILL_AMT2": 3102,
+        "BILL_AMT3": 689,
+        "BILL_AMT4": 0,
+        "BILL_AMT5": 0,
+        "BILL_AMT6": 0,
+        "PAY_AMT1": 0,
+        "PAY_AMT2": 689,
+        "PAY_AMT3": 0,
+        "PAY_AMT4": 0,
+        "PAY_AMT5": 0,
+        "PAY_AMT6": 0,
+        "UTILIZATION_RATE": 0.02,
+    },
+    "retiro_atm": {
+        "dia_semana": 2,
+        "quincena": 0,
+        "semana_mes": 1,
+        "dia_mes": 8,
+        "lag1": 15200.0,
+        "lag5": 14100.0,
+        "lag7": 16800.0,
+        "lag11": 17300.0,
+        "tendencia_lags": -1600.0,
+        "esFeriado": 0,
+        "caida_reciente": 0,
+        "volatilidad_reciente": 0.21,
+        "media_movil_3d": 15900.0,
+        "retiros_finde_anterior": 14800.0,
+        "lunes_post_finde_bajo": 0,
+        "domingo_bajo": 0,
+        "ubicacion": 1,
+        "ambiente": 1,
+    },
+}
@@ -0,0 +1,123 @@
+# src/core/exportador.py
+import time
+from typing import Dict, List
+
+from core.admision import estadisticas_admision
+from core.batching import estadisticas_batching
+from core.cache import estadisticas_cache
+from core.deriva import estadisticas_deriva
+from core.ejecutor import estadisticas_ejecutores
+from core.metricas import LIMITES_HTTP_S, linea_metrica, lineas_histograma, metricas
+
+# Tipo de contenido del formato de texto de Prometheus
+CONTENT_TYPE_PROMETHEUS = "text/plain; version=0.0.4"
+
+
+def _familia(lineas: List[str], nombre: str, tipo: str, ayuda: str) -> None:
+    lineas.append(f"# HELP {nombre} {ayuda}")
+    lineas.append(f"# TYPE {nombre} {tipo}")
+
+
+def _por_modelo(lineas: List[str], nombre: str, tipo: str, ayuda: str, estadisticas: Dict[str, Dict], clave: str) -> None:
+    if not estadisticas:
+        return
+    _familia(lineas, nombre, tipo, ayuda)
+    for modelo, valores in estadisticas.items():
+        lineas.append(linea_metrica(nombre, {"modelo": modelo}, valores[clave]))
+
+
+def texto_prometheus() -> str:
+    """
+    Todas las métricas del proceso en formato de texto de Prometheus: las
+    registradas en `metricas` (HTTP, etapas y rechazos de admisión) más el
+    estado del micro-batching, de los pools de inferencia, de las colas de
+    admisión, de las cachés de predicciones y la deriva frente a los perfiles
+    de referencia.
+    """
+    lineas = metricas.exportar()
+
+    batching = estadisticas_batching()
+    for nombre, clave, ayuda in (
+        ("bankmind_batch_tamano", "tamano_lote", "Filas por lote de micro-batching"),
+        ("bankmind_batch_espera_cola_ms", "espera_cola_ms", "Espera en cola del micro-batching en milisegundos"),
+    ):
+        if batching:
+            _familia(lineas, nombre, "histogram", ayuda)
+            for modelo, valores in batching.items():
+                lineas.extend(lineas_histograma(nombre, {"modelo": modelo}, valores[clave]))
+
+    ejecutores = estadisticas_ejecutores()
+    _por_modelo(lineas, "bankmind_inferencia_ocupados", "gauge",
+                "Tareas de inferencia en curso o en cola", ejecutores, "ocupados")
+    _por_modelo(lineas, "bankmind_inferencia_rechazadas_total", "counter",
+                "Tareas rechazadas por cola llena", ejecutores, "rechazadas")
+
+    admision = estadisticas_admision()
+    _por_modelo(lineas, "bankmind_admision_en_curso", "gauge",
+                "Requests admitidas en ejecución por endpoint", admision, "en_curso")
+    _por_modelo(lineas, "bankmind_admision_cola", "gauge",
+                "Requests esperando turno en la cola de admisión", admision, "en_cola")
+
+    caches = estadisticas_cache()
+    for clave in ("aciertos", "fallos", "coalescidas", "expulsiones", "expiradas"):
+        _por_modelo(lineas, f"bankmind_cache_{clave}_total", "counter",
+                    f"Caché de predicciones: {clave}", caches, clave)
+    _por_modelo(lineas, "bankmind_cache_entradas", "gauge",
+                "Entradas en la caché de predicciones", caches, "entradas")
+
+    deriva = estadisticas_deriva()
+    for nombre, clave, ayuda in (
+        ("bankmind_deriva_psi", "psi", "PSI de la variable frente al perfil de referencia"),
+        ("bankmind_deriva_ks", "ks", "Estadístico KS de la variable frente al perfil de referencia"),
+    ):
+        series = [
+            linea_metrica(nombre, {"modelo": modelo, "variable": variable}, valores["deriva"][clave])
+            for modelo, estado in deriva.items()
+            for variable, valores in estado["variables"].items()
+            if clave in valores.get("deriva", {})
+        ]
+        if series:
+            _familia(lineas, nombre, "gauge", ayuda)
+            lineas.extend(series)
+
+    return "\n".join(lineas) + "\n"
+
+
+class MiddlewareMetricas:
+    """
+    Middleware ASGI puro (sin BaseHTTPMiddleware, para no sumar una tarea por
+    request) que cuenta las requests y mide su latencia por método, plantilla
+    de ruta y código de estado. Usa la plantilla (/modelos/{nombre}) y no la
+    URL concreta para no multiplicar las series.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        inicio = time.perf_counter()
+        estado = [500]
+
+        async def enviar(mensaje):
+            if mensaje["type"] == "http.response.start":
+                estado[0] = mensaje["status"]
+            await send(mensaje)
+
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            ruta = scope.get("route")
+            plantilla = getattr(ruta, "path", "sin_ruta")
+            metodo = scope["method"]
+            metricas.histograma(
+                "bankmind_http_duracion_segundos", "Latencia de las requests HTTP hasta el fin de la respuesta",
+                LIMITES_HTTP_S, metodo=metodo, ruta=plantilla
+            ).observar(time.perf_counter() - inicio)
+            metricas.contador(
+                "bankmind_http_requests_total", "Requests HTTP atendidas",
+                metodo=metodo, ruta=plantilla, estado=str(estado[0])
+            ).incrementar()
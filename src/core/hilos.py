@@ -0,0 +1,127 @@
+# src/core/hilos.py
+import os
+import threading
+from typing import Any, Dict, List, Optional
+
+from core.config import obtener_entero
+from core.ejecutor import HILOS_DEFECTO
+
+# Profundidad máxima al buscar estimadores dentro de un artefacto (servicio ->
+# evaluador compilado -> modelo original)
+_PROFUNDIDAD_MAXIMA = 3
+_LIBRERIAS = ("xgboost", "sklearn", "lightgbm")
+
+_configurados: Dict[str, Dict] = {}
+_lock = threading.Lock()
+_limite_global: Optional[int] = None
+
+
+def nucleos_disponibles() -> int:
+    """Núcleos que el proceso puede usar (respeta taskset/cgroups vía la afinidad)"""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def hilos_por_defecto(modelo: Optional[str] = None) -> int:
+    """
+    Reparte los núcleos entre los workers (BANKMIND_WORKERS) y las inferencias
+    concurrentes de cada uno (BANKMIND_HILOS_INFERENCIA[_<MODELO>]), de modo
+    que el total de hilos de cálculo no supere el número de núcleos.
+    """
+    workers = max(1, obtener_entero("WORKERS", 1))
+    concurrentes = max(1, obtener_entero("HILOS_INFERENCIA", HILOS_DEFECTO, modelo=modelo))
+    return max(1, nucleos_disponibles() // (workers * concurrentes))
+
+
+def hilos_modelo(modelo: str) -> int:
+    """Hilos por llamada de inferencia del modelo (BANKMIND_HILOS_MODELO[_<MODELO>])"""
+    hilos = obtener_entero("HILOS_MODELO", hilos_por_defecto(modelo), modelo=modelo)
+    if hilos < 1:
+        raise ValueError(f"BANKMIND_HILOS_MODELO debe ser positivo para '{modelo}'")
+    return hilos
+
+
+def limitar_hilos_globales(hilos: Optional[int] = None) -> Optional[int]:
+    """
+    Limita los pools de BLAS y OpenMP de todo el proceso con threadpoolctl
+    (BANKMIND_HILOS_BLAS). Los modelos fijan además su propio número de hilos
+    por llamada; este límite cubre lo que no pasa por ellos (numpy, scipy).
+
+    Returns:
+        El límite aplicado, o None si threadpoolctl no está instalado.
+    """
+    global _limite_global
+    try:
+        from threadpoolctl import threadpool_limits
+    except ImportError:
+        return None
+    hilos = hilos if hilos is not None else obtener_entero("HILOS_BLAS", hilos_por_defecto())
+    threadpool_limits(limits=hilos)
+    _limite_global = hilos
+    return hilos
+
+
+def _configurar(estimador: Any, hilos: int) -> bool:
+    modulo = type(estimador).__module__
+    if modulo.startswith("xgboost"):
+        if hasattr(estimador, "get_booster"):
+            estimador.set_params(n_jobs=hilos)
+            estimador.get_booster().set_param({"nthread": hilos})
+        else:
+            estimador.set_param({"nthread": hilos})
+        return True
+    if hasattr(estimador, "get_params") and "n_jobs" in estimador.get_params(deep=False):
+        # sklearn (n_jobs de joblib) y el wrapper de LightGBM (num_threads en predict)
+        estimador.set_params(n_jobs=hilos)
+        return True
+    return False
+
+
+def _estimadores(objeto: Any, profundidad: int, vistos: set) -> List[Any]:
+    if objeto is None or id(objeto) in vistos or profundidad > _PROFUNDIDAD_MAXIMA:
+        return []
+    vistos.add(id(objeto))
+    if type(objeto).__module__.split(".")[0] in _LIBRERIAS:
+        encontrados = [objeto]
+        # Pipelines de sklearn: también sus pasos
+        for _, paso in getattr(objeto, "steps", None) or []:
+            encontrados += _estimadores(paso, profundidad + 1, vistos)
+        return encontrados
+    if isinstance(objeto, (list, tuple)):
+        hijos = objeto
+    elif isinstance(objeto, dict):
+        hijos = objeto.values()
+    elif hasattr(objeto, "__dict__"):
+        hijos = vars(objeto).values()
+    else:
+        return []
+    encontrados = []
+    for hijo in hijos:
+        encontrados += _estimadores(hijo, profundidad + 1, vistos)
+    return encontrados
+
+
+def aplicar_hilos(modelo: str, artefacto: Any, hilos: Optional[int] = None) -> int:
+    """
+    Fija los hilos por llamada (nthread de XGBoost, n_jobs de sklearn/LightGBM)
+    de todos los estimadores que contiene el artefacto: el servicio, sus
+    evaluadores compilados y los modelos originales. Lo llama el registro al
+    cargar cada versión; también sirve para cambiarlos en caliente.
+
+    Returns:
+        Los hilos aplicados.
+    """
+    hilos = hilos if hilos is not None else hilos_modelo(modelo)
+    if _limite_global is None:
+        limitar_hilos_globales()
+    configurados = [type(e).__name__ for e in _estimadores(artefacto, 0, set()) if _configurar(e, hilos)]
+    with _lock:
+        _configurados[modelo] = {"hilos": hilos, "estimadores": configurados}
+    return hilos
+
+
+def estadisticas_hilos() -> Dict:
+    with _lock:
+        modelos = {nombre: dict(valores) for nombre, valores in _configurados.items()}
+    return {"nucleos": nucleos_disponibles(), "limite_blas_openmp": _limite_global, "modelos": modelos}
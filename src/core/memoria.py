@@ -0,0 +1,86 @@
+# src/core/memoria.py
+import os
+from typing import Dict, List, Optional
+
+from core import prefork
+
+# Campos de /proc/<pid>/smaps_rollup que se informan (en kB en el archivo)
+_CAMPOS = ("Rss", "Pss", "Shared_Clean", "Shared_Dirty", "Private_Clean", "Private_Dirty", "Swap")
+
+
+def _mb(kb: int) -> float:
+    return round(kb / 1024, 1)
+
+
+def uso_memoria(pid: int) -> Optional[Dict]:
+    """
+    Memoria residente de un proceso según /proc/<pid>/smaps_rollup (Linux):
+    `unica_mb` son las páginas privadas del proceso (lo que se libera si
+    termina), `compartida_mb` las que comparte con otros procesos (p. ej. los
+    modelos heredados del maestro) y `pss_mb` reparte cada página compartida
+    entre los procesos que la usan.
+
+    Returns:
+        None si el proceso no existe o el sistema no expone smaps_rollup.
+    """
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as archivo:
+            lineas = archivo.readlines()
+    except OSError:
+        return None
+    valores = dict.fromkeys(_CAMPOS, 0)
+    for linea in lineas:
+        partes = linea.split()
+        if len(partes) >= 2 and partes[0].rstrip(":") in valores:
+            valores[partes[0].rstrip(":")] = int(partes[1])
+    return {
+        "pid": pid,
+        "rss_mb": _mb(valores["Rss"]),
+        "pss_mb": _mb(valores["Pss"]),
+        "unica_mb": _mb(valores["Private_Clean"] + valores["Private_Dirty"]),
+        "compartida_mb": _mb(valores["Shared_Clean"] + valores["Shared_Dirty"]),
+        "swap_mb": _mb(valores["Swap"]),
+    }
+
+
+def _hijos(pid: int) -> List[int]:
+    hijos = []
+    for entrada in os.listdir("/proc"):
+        if not entrada.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entrada}/stat") as archivo:
+                # El nombre del proceso (campo 2) puede tener espacios: el ppid va después del último ')'
+                ppid = int(archivo.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        if ppid == pid:
+            hijos.append(int(entrada))
+    return sorted(hijos)
+
+
+def reporte_memoria() -> Dict:
+    """
+    Memoria del servidor. En modo prefork incluye al maestro y a todos los
+    workers; si no, solo al proceso actual. El total de PSS es la memoria
+    realmente ocupada, sin contar dos veces las páginas compartidas.
+    """
+    if prefork.MAESTRO is not None:
+        procesos = [("maestro", prefork.MAESTRO)] + [("worker", pid) for pid in _hijos(prefork.MAESTRO)]
+    else:
+        procesos = [("proceso", os.getpid())]
+
+    detalle = []
+    for rol, pid in procesos:
+        uso = uso_memoria(pid)
+        if uso is not None:
+            uso["rol"] = rol
+            uso["actual"] = pid == os.getpid()
+            detalle.append(uso)
+    return {
+        "prefork": prefork.MAESTRO is not None,
+        "procesos": detalle,
+        "total_rss_mb": round(sum(p["rss_mb"] for p in detalle), 1),
+        "total_pss_mb": round(sum(p["pss_mb"] for p in detalle), 1),
+        "total_unica_mb": round(sum(p["unica_mb"] for p in detalle), 1),
+    }
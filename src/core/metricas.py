@@ -0,0 +1,209 @@
+# src/core/metricas.py
+import bisect
+import random
+import threading
+import time
+from typing import Dict, Iterable, List, Tuple
+
+from core.config import obtener_bool, obtener_flotante
+
+
+class Histograma:
+    """
+    Histograma de buckets fijos, seguro entre hilos.
+    Cada bucket cuenta las observaciones menores o iguales a su límite
+    (mismo criterio `le` que usa Prometheus).
+    """
+
+    def __init__(self, limites: Iterable[float]):
+        self.limites = tuple(sorted(limites))
+        self._conteos = [0] * (len(self.limites) + 1)
+        self._suma = 0.0
+        self._total = 0
+        self._lock = threading.Lock()
+
+    def observar(self, valor: float) -> None:
+        indice = bisect.bisect_left(self.limites, valor)
+        with self._lock:
+            self._conteos[indice] += 1
+            self._suma += valor
+            self._total += 1
+
+    def instantanea(self) -> Dict:
+        """Conteos acumulados por límite, suma y total de observaciones"""
+        with self._lock:
+            conteos = list(self._conteos)
+            suma, total = self._suma, self._total
+        buckets = {}
+        acumulado = 0
+        for limite, conteo in zip(self.limites, conteos):
+            acumulado += conteo
+            buckets[str(limite)] = acumulado
+        buckets["+Inf"] = total
+        return {"buckets": buckets, "suma": suma, "total": total}
+
+
+class Contador:
+    """Contador monótono seguro entre hilos"""
+
+    def __init__(self):
+        self._valor = 0.0
+        self._lock = threading.Lock()
+
+    def incrementar(self, cantidad: float = 1.0) -> None:
+        with self._lock:
+            self._valor += cantidad
+
+    @property
+    def valor(self) -> float:
+        return self._valor
+
+
+# Límites en segundos, siguiendo la convención de Prometheus
+LIMITES_ETAPA_S = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+LIMITES_HTTP_S = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class RegistroMetricas:
+    """
+    Familias de métricas con etiquetas, exportables en formato de texto de Prometheus.
+    Cada serie se crea la primera vez que se pide y luego se reutiliza.
+    """
+
+    def __init__(self):
+        self._familias: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+
+    def _serie(self, nombre: str, tipo: str, ayuda: str, etiquetas: Tuple[Tuple[str, str], ...], crear):
+        familia = self._familias.get(nombre)
+        if familia is not None:
+            serie = familia["series"].get(etiquetas)
+            if serie is not None:
+                return serie
+        with self._lock:
+            familia = self._familias.setdefault(nombre, {"tipo": tipo, "ayuda": ayuda, "series": {}})
+            return familia["series"].setdefault(etiquetas, crear())
+
+    def histograma(self, nombre: str, ayuda: str, limites: Iterable[float], **etiquetas) -> Histograma:
+        return self._serie(nombre, "histogram", ayuda, tuple(sorted(etiquetas.items())), lambda: Histograma(limites))
+
+    def contador(self, nombre: str, ayuda: str, **etiquetas) -> Contador:
+        return self._serie(nombre, "counter", ayuda, tuple(sorted(etiquetas.items())), Contador)
+
+    def exportar(self) -> List[str]:
+        lineas = []
+        with self._lock:
+            familias = [(nombre, familia, list(familia["series"].items())) for nombre, familia in self._familias.items()]
+        for nombre, familia, series in familias:
+            lineas.append(f"# HELP {nombre} {familia['ayuda']}")
+            lineas.append(f"# TYPE {nombre} {familia['tipo']}")
+            for etiquetas, serie in series:
+                if familia["tipo"] == "histogram":
+                    lineas.extend(lineas_histograma(nombre, dict(etiquetas), serie.instantanea()))
+                else:
+                    lineas.append(f"{nombre}{_etiquetas(dict(etiquetas))} {_numero(serie.valor)}")
+        return lineas
+
+
+def _escapar(valor) -> str:
+    return str(valor).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _etiquetas(etiquetas: Dict) -> str:
+    if not etiquetas:
+        return ""
+    return "{" + ",".join(f'{clave}="{_escapar(valor)}"' for clave, valor in etiquetas.items()) + "}"
+
+
+def _numero(valor: float) -> str:
+    return repr(float(valor)) if isinstance(valor, float) and not float(valor).is_integer() else str(int(valor))
+
+
+def lineas_histograma(nombre: str, etiquetas: Dict, instantanea: Dict) -> List[str]:
+    """Series _bucket/_sum/_count de un histograma a partir de Histograma.instantanea()"""
+    lineas = [
+        f"{nombre}_bucket{_etiquetas({**etiquetas, 'le': limite})} {conteo}"
+        for limite, conteo in instantanea["buckets"].items()
+    ]
+    lineas.append(f"{nombre}_sum{_etiquetas(etiquetas)} {_numero(instantanea['suma'])}")
+    lineas.append(f"{nombre}_count{_etiquetas(etiquetas)} {instantanea['total']}")
+    return lineas
+
+
+def linea_metrica(nombre: str, etiquetas: Dict, valor: float) -> str:
+    return f"{nombre}{_etiquetas(etiquetas)} {_numero(valor)}"
+
+
+# Registro único del proceso
+metricas = RegistroMetricas()
+
+
+# --- Tiempos por etapa de los pipelines -------------------------------------
+
+class _Muestreo:
+    """Interruptor de muestreo de etapas (BANKMIND_METRICAS_ETAPAS / BANKMIND_METRICAS_MUESTREO)"""
+
+    def __init__(self):
+        self.activo = obtener_bool("METRICAS_ETAPAS", True)
+        self.fraccion = obtener_flotante("METRICAS_MUESTREO", 1.0)
+
+
+muestreo = _Muestreo()
+
+
+class _Etapa:
+    __slots__ = ("histograma", "inicio")
+
+    def __init__(self, histograma: Histograma):
+        self.histograma = histograma
+
+    def __enter__(self):
+        self.inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *excepcion):
+        self.histograma.observar(time.perf_counter() - self.inicio)
+        return False
+
+
+class _EtapaNula:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *excepcion):
+        return False
+
+
+_ETAPA_NULA = _EtapaNula()
+_histogramas_etapa: Dict[Tuple[str, str], Histograma] = {}
+
+
+def etapa(modelo: str, nombre: str):
+    """
+    Cronometra un bloque del pipeline de un modelo:
+
+        with etapa("fraude", "encoding"):
+            ...
+
+    Con el muestreo apagado (o fuera de la fracción muestreada) no mide nada.
+    """
+    if not muestreo.activo or (muestreo.fraccion < 1.0 and random.random() >= muestreo.fraccion):
+        return _ETAPA_NULA
+    histograma = _histogramas_etapa.get((modelo, nombre))
+    if histograma is None:
+        histograma = metricas.histograma(
+            "bankmind_etapa_duracion_segundos", "Duración de cada etapa de los pipelines de inferencia",
+            LIMITES_ETAPA_S, modelo=modelo, etapa=nombre
+        )
+        _histogramas_etapa[(modelo, nombre)] = histograma
+    return _Etapa(histograma)
+
+
+def estadisticas_etapas() -> Dict[str, Dict[str, Dict]]:
+    """Instantánea del histograma de cada etapa medida, por modelo"""
+    estadisticas: Dict[str, Dict[str, Dict]] = {}
+    for (modelo, nombre), histograma in list(_histogramas_etapa.items()):
+        estadisticas.setdefault(modelo, {})[nombre] = histograma.instantanea()
+    return estadisticas
@@ -0,0 +1,371 @@
+# src/core/pipeline.py
+import operator
+import threading
+from typing import Any, Callable, Dict, List, Mapping, NamedTuple, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+# Escaladores que se reproducen exactamente como (x - centro) / escala
+ESCALADORES_SOPORTADOS = ('StandardScaler', 'RobustScaler')
+
+
+class Mapeo:
+    """
+    Codificador a partir de un diccionario valor -> código. Los valores fuera
+    del mapa reciben `defecto` (NaN por defecto, igual que `Series.map`).
+    Tiene la misma interfaz que EncodingTable (encode / encode_column).
+    """
+
+    def __init__(self, tabla: Mapping, defecto: float = np.nan):
+        self.tabla = dict(tabla)
+        self.defecto = defecto
+
+    def encode(self, valor) -> float:
+        return self.tabla.get(valor, self.defecto)
+
+    def encode_column(self, valores) -> np.ndarray:
+        tabla, defecto = self.tabla, self.defecto
+        return np.fromiter((tabla.get(valor, defecto) for valor in valores), dtype=float, count=len(valores))
+
+
+class Derivada(NamedTuple):
+    """
+    Columnas calculadas a partir de otras. `funcion` recibe las dependencias
+    en orden y devuelve un valor (o una tupla si `nombres` es una tupla); se
+    usa con arreglos en el camino por lotes y con escalares en el de una fila,
+    salvo que se indique una versión `escalar` propia.
+    """
+    nombres: Union[str, Tuple[str, ...]]
+    funcion: Callable
+    dependencias: Tuple[str, ...]
+    escalar: Optional[Callable] = None
+
+
+class Codificada(NamedTuple):
+    """Columna codificada con un codificador (EncodingTable, Mapeo) a partir de `fuente` (por defecto, la misma columna)"""
+    nombre: str
+    codificador: Any
+    fuente: Optional[str] = None
+
+
+def parametros_escalado(scaler, n: int) -> Tuple[np.ndarray, np.ndarray]:
+    """(centro, escala) tales que transform(x) == (x - centro) / escala"""
+    centro, escala = np.zeros(n), np.ones(n)
+    if type(scaler).__name__ == 'RobustScaler':
+        if scaler.with_centering:
+            centro = np.asarray(scaler.center_, dtype=float)
+        if scaler.with_scaling:
+            escala = np.asarray(scaler.scale_, dtype=float)
+    else:
+        if scaler.with_mean:
+            centro = np.asarray(scaler.mean_, dtype=float)
+        if scaler.with_std:
+            escala = np.asarray(scaler.scale_, dtype=float)
+    return centro, escala
+
+
+class Pipeline:
+    """
+    Declaración de las features de un modelo, en un solo lugar:
+
+    - `entradas`: columnas numéricas que se copian tal cual desde el input.
+    - `textos`: columnas que se leen sin convertir (fechas, categorías).
+    - `derivadas`: columnas calculadas (Derivada), en orden de declaración.
+    - `codificadas`: columnas categóricas codificadas (Codificada).
+    - `escalado`: StandardScaler o RobustScaler sobre `columnas_escaladas`
+      (por defecto las del propio scaler o todas las de `columnas`).
+    - `columnas`: orden final que espera el modelo. Las columnas que el
+      pipeline no produce quedan en 0, como un reindex(fill_value=0).
+
+    Los inputs son objetos con atributos (schemas de Pydantic) o, con
+    `por_clave=True`, diccionarios. `compilar()` resuelve todo por posición
+    una sola vez y devuelve un PipelineCompilado.
+    """
+
+    def __init__(self, modelo: str, columnas: Sequence[str], entradas: Sequence[str] = (),
+                 textos: Sequence[str] = (), derivadas: Sequence[Derivada] = (),
+                 codificadas: Sequence[Codificada] = (), escalado=None,
+                 columnas_escaladas: Optional[Sequence[str]] = None, por_clave: bool = False):
+        self.modelo = modelo
+        self.columnas = list(columnas)
+        self.entradas = list(entradas)
+        self.textos = list(textos)
+        self.derivadas = list(derivadas)
+        self.codificadas = list(codificadas)
+        self.escalado = escalado
+        self.columnas_escaladas = columnas_escaladas
+        self.por_clave = por_clave
+
+    def compilar(self) -> "PipelineCompilado":
+        """
+        Raises:
+            ValueError: Si una dependencia no está declarada o el escalador no se puede reproducir.
+        """
+        return PipelineCompilado(self)
+
+
+class _Paso(NamedTuple):
+    funcion: Callable
+    escalar: Callable
+    dependencias: Tuple[int, ...]
+    salidas: Tuple[int, ...]
+    multiple: bool
+
+
+class PipelineCompilado:
+    """
+    Pipeline resuelto a posiciones: cada columna intermedia ocupa una ranura
+    y cada paso sabe de qué ranuras lee y en cuáles escribe.
+
+    - `lote(filas)`: N filas con operaciones por columna de NumPy.
+    - `fila(fila)`: una fila sin DataFrames ni arreglos intermedios; escribe
+      en un buffer (1, n_columnas) preasignado por hilo que se reutiliza en
+      la siguiente llamada del mismo hilo, así que debe consumirse antes.
+    - `transformar(filas)`: `fila` si hay una sola, `lote` si hay varias.
+    - `lote_columnar(datos)`: como `lote`, con las entradas ya en columnas.
+
+    Ambos caminos aplican las mismas operaciones en el mismo orden, por lo
+    que producen exactamente los mismos valores.
+    """
+
+    def __init__(self, pipeline: Pipeline):
+        self.modelo = pipeline.modelo
+        self.columnas = list(pipeline.columnas)
+        ranuras: Dict[str, int] = {}
+
+        def nueva(nombre: str) -> int:
+            # Una columna redefinida (p. ej. codificada en su lugar) pasa a la ranura nueva
+            ranuras[nombre] = len(self._nombres_ranuras)
+            self._nombres_ranuras.append(nombre)
+            return ranuras[nombre]
+
+        def resolver(nombre: str) -> int:
+            if nombre not in ranuras:
+                raise ValueError(f"Pipeline '{self.modelo}': columna '{nombre}' no declarada")
+            return ranuras[nombre]
+
+        self._nombres_ranuras: List[str] = []
+        self._ranuras_entradas = [nueva(nombre) for nombre in pipeline.entradas]
+        self._ranuras_textos = [nueva(nombre) for nombre in pipeline.textos]
+        self._lector_entradas = self._lector(pipeline.entradas, pipeline.por_clave)
+        self._lector_textos = self._lector(pipeline.textos, pipeline.por_clave)
+
+        self._pasos: List[_Paso] = []
+        for derivada in pipeline.derivadas:
+            dependencias = tuple(resolver(nombre) for nombre in derivada.dependencias)
+            multiple = isinstance(derivada.nombres, tuple)
+            nombres = derivada.nombres if multiple else (derivada.nombres,)
+            self._pasos.append(_Paso(
+                derivada.funcion, derivada.escalar or derivada.funcion,
+                dependencias, tuple(nueva(nombre) for nombre in nombres), multiple
+            ))
+        for codificada in pipeline.codificadas:
+            fuente = resolver(codificada.fuente or codificada.nombre)
+            codificador = codificada.codificador
+            self._pasos.append(_Paso(
+                codificador.encode_column, codificador.encode,
+                (fuente,), (nueva(codificada.nombre),), False
+            ))
+
+        self._ranuras = ranuras
+
+        # Ensamblado: de qué ranura sale cada columna del modelo (las demás quedan en 0)
+        self._destinos = [(j, ranuras[nombre]) for j, nombre in enumerate(self.columnas) if nombre in ranuras]
+        self._vacias = [j for j, nombre in enumerate(self.columnas) if nombre not in ranuras]
+
+        self._indices_escalar = np.array([], dtype=np.intp)
+        self.centro = self.escala = np.array([])
+        if pipeline.escalado is not None:
+            scaler = pipeline.escalado
+            if type(scaler).__name__ not in ESCALADORES_SOPORTADOS:
+                raise ValueError(f"Pipeline '{self.modelo}': escalador no soportado {type(scaler).__name__}")
+            escaladas = getattr(scaler, 'feature_names_in_', None)
+            escaladas = list(escaladas if escaladas is not None else pipeline.columnas_escaladas or self.columnas)
+            posiciones = {nombre: j for j, nombre in enumerate(self.columnas)}
+            faltantes = [nombre for nombre in escaladas if nombre not in posiciones]
+            if faltantes:
+                raise ValueError(f"Pipeline '{self.modelo}': columnas escaladas fuera del modelo: {faltantes}")
+            self._indices_escalar = np.array([posiciones[nombre] for nombre in escaladas], dtype=np.intp)
+            self.centro, self.escala = parametros_escalado(scaler, len(escaladas))
+        # Si se escalan todas las columnas en orden, el escalado se hace en su lugar
+        self._escalado_completo = np.array_equal(self._indices_escalar, np.arange(len(self.columnas)))
+        self._escalado_fila = list(zip(self._indices_escalar.tolist(), self.centro.tolist(), self.escala.tolist()))
+
+        self._local = threading.local()
+
+    @staticmethod
+    def _lector(nombres: Sequence[str], por_clave: bool) -> Callable[[Any], tuple]:
+        if not nombres:
+            return lambda fila: ()
+        obtener = operator.itemgetter(*nombres) if por_clave else operator.attrgetter(*nombres)
+        if len(nombres) == 1:
+            return lambda fila: (obtener(fila),)
+        return obtener
+
+    def _escalar(self, X: np.ndarray) -> None:
+        if not len(self._indices_escalar):
+            return
+        if self._escalado_completo:
+            X -= self.centro
+            X /= self.escala
+            return
+        escalado = X[:, self._indices_escalar]
+        escalado -= self.centro
+        escalado /= self.escala
+        X[:, self._indices_escalar] = escalado
+
+    def _calcular_lote(self, filas: Sequence[Any]) -> Tuple[np.ndarray, List[Any]]:
+        n = len(filas)
+        valores: List[Any] = [None] * len(self._nombres_ranuras)
+
+        if self._ranuras_entradas:
+            numericas = np.array([self._lector_entradas(fila) for fila in filas], dtype=float).reshape(n, -1)
+            for i, ranura in enumerate(self._ranuras_entradas):
+                valores[ranura] = numericas[:, i]
+        if self._ranuras_textos:
+            leidas = [self._lector_textos(fila) for fila in filas]
+            for i, ranura in enumerate(self._ranuras_textos):
+                valores[ranura] = [leida[i] for leida in leidas]
+        return self._completar(valores, n)
+
+    def _calcular_columnas(self, datos: Mapping[str, Any]) -> Tuple[np.ndarray, List[Any]]:
+        valores: List[Any] = [None] * len(self._nombres_ranuras)
+        for ranura in self._ranuras_entradas:
+            valores[ranura] = np.asarray(datos[self._nombres_ranuras[ranura]], dtype=float)
+        for ranura in self._ranuras_textos:
+            valores[ranura] = datos[self._nombres_ranuras[ranura]]
+        n = len(datos[self._nombres_ranuras[0]]) if self._nombres_ranuras else 0
+        return self._completar(valores, n)
+
+    def _completar(self, valores: List[Any], n: int) -> Tuple[np.ndarray, List[Any]]:
+        with np.errstate(divide='ignore', invalid='ignore'):
+            for paso in self._pasos:
+                resultado = paso.funcion(*(valores[d] for d in paso.dependencias))
+                if paso.multiple:
+                    for ranura, columna in zip(paso.salidas, resultado):
+                        valores[ranura] = columna
+                else:
+                    valores[paso.salidas[0]] = resultado
+
+        X = np.zeros((n, len(self.columnas)))
+        for j, ranura in self._destinos:
+            X[:, j] = valores[ranura]
+        self._escalar(X)
+        return X, valores
+
+    def _buffers(self) -> Tuple[np.ndarray, np.ndarray, List[Any]]:
+        local = self._local
+        if not hasattr(local, 'X'):
+            local.X = np.zeros((1, len(self.columnas)))
+            local.entradas = np.zeros(len(self._ranuras_entradas))
+            local.valores = [None] * len(self._nombres_ranuras)
+        return local.X, local.entradas, local.valores
+
+    def _calcular_fila(self, fila: Any) -> Tuple[np.ndarray, List[Any]]:
+        X, entradas, valores = self._buffers()
+
+        if self._ranuras_entradas:
+            entradas[:] = self._lector_entradas(fila)
+            for i, ranura in enumerate(self._ranuras_entradas):
+                valores[ranura] = entradas[i]
+        if self._ranuras_textos:
+            for ranura, valor in zip(self._ranuras_textos, self._lector_textos(fila)):
+                valores[ranura] = valor
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            for paso in self._pasos:
+                resultado = paso.escalar(*(valores[d] for d in paso.dependencias))
+                if paso.multiple:
+                    for ranura, valor in zip(paso.salidas, resultado):
+                        valores[ranura] = valor
+                else:
+                    valores[paso.salidas[0]] = resultado
+
+        x = X[0]
+        for j, ranura in self._destinos:
+            x[j] = valores[ranura]
+        for j in self._vacias:
+            x[j] = 0.0
+        for j, centro, escala in self._escalado_fila:
+            x[j] = (x[j] - centro) / escala
+        return X, valores
+
+    def lote(self, filas: Sequence[Any]) -> np.ndarray:
+        """Matriz (N, n_columnas) ya escalada, en el orden de `columnas`"""
+        return self._calcular_lote(filas)[0]
+
+    def fila(self, fila: Any) -> np.ndarray:
+        """Matriz (1, n_columnas) de una fila, en el buffer del hilo"""
+        return self._calcular_fila(fila)[0]
+
+    def transformar(self, filas: Sequence[Any]) -> np.ndarray:
+        return self.fila(filas[0]) if len(filas) == 1 else self.lote(filas)
+
+    def transformar_conservando(self, filas: Sequence[Any], nombres: Sequence[str]) -> Tuple[np.ndarray, List[Sequence]]:
+        """
+        Como `transformar`, y además devuelve los valores sin escalar de las
+        columnas `nombres` (p. ej. para reglas de negocio), una secuencia por nombre.
+        """
+        ranuras = [self._ranuras[nombre] for nombre in nombres]
+        if len(filas) == 1:
+            X, valores = self._calcular_fila(filas[0])
+            return X, [(valores[ranura],) for ranura in ranuras]
+        X, valores = self._calcular_lote(filas)
+        return X, [valores[ranura] for ranura in ranuras]
+
+    def lote_columnar(self, datos: Mapping[str, Any], conservar: Sequence[str] = ()) -> Tuple[np.ndarray, List[Sequence]]:
+        """
+        Camino por lotes a partir de columnas de entrada ya separadas
+        ({columna: arreglo}, p. ej. un cuerpo Arrow), sin pasar por objetos
+        por fila. Devuelve la matriz y los valores sin escalar de `conservar`.
+        """
+        X, valores = self._calcular_columnas(datos)
+        return X, [valores[self._ranuras[nombre]] for nombre in conservar]
+
+    def matriz(self, columnas: Mapping[str, Any]) -> np.ndarray:
+        """
+        Ensambla y escala columnas ya calculadas (sin escalar), p. ej. un
+        DataFrame con las features finales; las que falten quedan en 0.
+        """
+        n = len(columnas[next(iter(columnas))])
+        X = np.zeros((n, len(self.columnas)))
+        for j, nombre in enumerate(self.columnas):
+            if nombre in columnas:
+                X[:, j] = np.asarray(columnas[nombre], dtype=float)
+        self._escalar(X)
+        return X
+
+
+def filas_infinitas(X: np.ndarray) -> np.ndarray:
+    """
+    Posiciones de las filas de una matriz de features (de `lote`, `fila` o
+    `lote_columnar`) con algún valor infinito, p. ej. una derivada dividida
+    por cero. scaler.transform las rechaza ("Input X contains infinity"), así
+    que no se deben puntuar; los NaN sí pasan, igual que en el scaler.
+    """
+    return np.flatnonzero(np.isinf(X).any(axis=1))
+
+
+def columnas_infinitas(X: np.ndarray, columnas: Sequence[str], fila: int) -> List[str]:
+    """Nombres de las features infinitas de una fila de X, para el mensaje de error"""
+    return [columnas[j] for j in np.flatnonzero(np.isinf(X[fila]))]
+
+
+def diferencia_pipeline(compilado: PipelineCompilado, filas: Sequence[Any],
+                        referencia: Callable[[Sequence[Any]], Any]) -> float:
+    """
+    Mayor diferencia absoluta entre el camino por lotes y `referencia` (la
+    implementación anterior del modelo), y entre el de una fila y el de lotes.
+    Dos NaN en la misma posición cuentan como iguales.
+    """
+    def diferencia(a, b) -> float:
+        a, b = np.asarray(a, dtype=float), np.asarray(b, dtype=float)
+        if a.shape != b.shape:
+            return float('inf')
+        iguales = (a == b) | (np.isnan(a) & np.isnan(b))
+        desvio = np.where(iguales, 0.0, np.abs(a - b))
+        return float(np.max(np.nan_to_num(desvio, nan=np.inf), initial=0.0))
+
+    X = compilado.lote(filas)
+    por_fila = np.vstack([compilado.fila(fila).copy() for fila in filas])
+    return max(diferencia(X, referencia(filas)), diferencia(por_fila, X))
@@ -0,0 +1,149 @@
+# src/core/prefork.py
+import gc
+import os
+import signal
+import socket
+import time
+import traceback
+from typing import Dict, Optional
+
+from fastapi import HTTPException
+
+from core.registro import registro
+
+# Un worker que termina antes de este tiempo se considera caído en el arranque:
+# se espera antes de reemplazarlo para no entrar en un bucle de forks
+VIDA_MINIMA_S = 5.0
+
+# PID del proceso maestro, visible en los workers (None si el servidor no es prefork)
+MAESTRO: Optional[int] = None
+
+# Cantidad de workers del servidor prefork, visible en los workers
+WORKERS = 1
+
+
+def multiples_workers() -> bool:
+    """
+    True en un worker de un servidor prefork con más de un worker. El estado
+    en memoria (historial de cajeros, versión activa de cada modelo, cachés,
+    hilos) es una copia propia de cada worker: cambiarlo en uno no cambia los demás.
+    """
+    return MAESTRO is not None and WORKERS > 1
+
+
+def estado_unico() -> None:
+    """
+    Dependencia de FastAPI de los endpoints que cambian estado en memoria:
+    con varios workers responden 409 en lugar de cambiar solo el worker que
+    atendió la request.
+    """
+    if multiples_workers():
+        raise HTTPException(
+            status_code=409,
+            detail=f"No disponible con {WORKERS} workers: cada worker tiene su propia copia de este estado. "
+                   "Use BANKMIND_WORKERS=1 o reinicie el servidor con la configuración nueva."
+        )
+
+
+class ServidorPrefork:
+    """
+    Servidor multi-proceso que comparte la memoria de los modelos entre workers.
+
+    El maestro carga todos los modelos una sola vez (incluso los diferidos),
+    congela el heap con `gc.freeze()` y recién entonces abre el socket y hace
+    fork de los workers. Las páginas de los modelos quedan compartidas
+    copy-on-write: el GC de los workers no recorre los objetos congelados, así
+    que no les escribe las cabeceras y no fuerza su copia. Los incrementos de
+    refcount al usar un objeto sí copian la página que lo contiene, pero los
+    datos grandes (arreglos de numpy, boosters de XGBoost) viven fuera de los
+    objetos de Python y no se tocan.
+
+    El maestro no atiende requests: reenvía SIGTERM/SIGINT a los workers y
+    reemplaza a los que terminan inesperadamente.
+    """
+
+    def __init__(self, app, host: str, port: int, workers: int, log_level: str = "info"):
+        if workers < 1:
+            raise ValueError("El servidor prefork necesita al menos un worker")
+        self.app = app
+        self.host = host
+        self.port = port
+        self.workers = workers
+        self.log_level = log_level
+        self._hijos: Dict[int, float] = {}
+        self._parar = False
+        self._socket: Optional[socket.socket] = None
+
+    def _abrir_socket(self) -> socket.socket:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((self.host, self.port))
+        sock.listen(2048)
+        sock.set_inheritable(True)
+        return sock
+
+    def _ejecutar_worker(self, maestro: int) -> None:
+        import uvicorn
+
+        global MAESTRO, WORKERS
+        MAESTRO = maestro
+        WORKERS = self.workers
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        gc.enable()
+        # El lifespan del worker no vuelve a cargar nada: los modelos ya están activos
+        config = uvicorn.Config(self.app, log_level=self.log_level, lifespan="on")
+        uvicorn.Server(config).run(sockets=[self._socket])
+
+    def _iniciar_worker(self) -> int:
+        maestro = os.getpid()
+        pid = os.fork()
+        if pid == 0:
+            codigo = 0
+            try:
+                self._ejecutar_worker(maestro)
+            except BaseException:
+                traceback.print_exc()
+                codigo = 1
+            finally:
+                os._exit(codigo)
+        self._hijos[pid] = time.monotonic()
+        print(f"[OK] Worker {pid} iniciado")
+        return pid
+
+    def _detener(self, signum, frame) -> None:
+        self._parar = True
+        for pid in list(self._hijos):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def servir(self) -> None:
+        # Sin GC durante la carga: los objetos liberados dejarían huecos en las
+        # páginas que luego se comparten y el GC los reescribiría tras el fork
+        gc.disable()
+        fallidos = registro.cargar_pendientes(incluir_diferidos=True)
+        if fallidos:
+            print(f"[WARN] Modelos no disponibles en los workers: {', '.join(fallidos)}")
+        gc.collect()
+        gc.freeze()
+
+        self._socket = self._abrir_socket()
+        signal.signal(signal.SIGTERM, self._detener)
+        signal.signal(signal.SIGINT, self._detener)
+        print(f"[OK] Maestro {os.getpid()} escuchando en {self.host}:{self.port} con {self.workers} workers")
+        for _ in range(self.workers):
+            self._iniciar_worker()
+
+        while self._hijos:
+            pid, estado = os.wait()
+            inicio = self._hijos.pop(pid, None)
+            if inicio is None or self._parar:
+                continue
+            print(f"[WARN] Worker {pid} terminó (estado {estado}); se inicia un reemplazo")
+            if time.monotonic() - inicio < VIDA_MINIMA_S:
+                time.sleep(VIDA_MINIMA_S)
+            if not self._parar:
+                self._iniciar_worker()
+        self._socket.close()
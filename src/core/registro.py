@@ -0,0 +1,301 @@
+# src/core/registro.py
+import hashlib
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from core.config import obtener_bool, obtener_texto
+from core.hilos import aplicar_hilos
+
+
+class ModeloNoDisponibleError(RuntimeError):
+    """El modelo pedido no tiene ninguna versión cargada"""
+
+
+class VersionModelo:
+    """Un artefacto cargado en memoria junto con su identificación"""
+
+    def __init__(self, artefacto: Any, version: str, ruta: str, segundos_carga: float):
+        self.artefacto = artefacto
+        self.version = version
+        self.ruta = ruta
+        self.cargado_en = datetime.now().isoformat(timespec="seconds")
+        self.segundos_carga = segundos_carga
+
+    def describir(self) -> Dict:
+        return {
+            "version": self.version,
+            "ruta": self.ruta,
+            "cargado_en": self.cargado_en,
+            "segundos_carga": round(self.segundos_carga, 3),
+        }
+
+
+class _Entrada:
+    def __init__(self, nombre: str, cargador: Callable[[str], Any], ruta: str,
+                 calentar: Optional[Callable[[Any], Any]], diferida: bool):
+        self.nombre = nombre
+        self.cargador = cargador
+        self.ruta = ruta
+        # Carpeta del artefacto registrado: las recargas solo leen artefactos de ahí
+        self.directorio = os.path.dirname(os.path.realpath(ruta))
+        self.calentar = calentar
+        self.diferida = diferida
+        self.activa: Optional[VersionModelo] = None
+        self.anterior: Optional[VersionModelo] = None
+        self.cargando = False
+        self.error: Optional[str] = None
+        self.lock = threading.Lock()
+        # Serializa las cargas del modelo (arranque, primer uso y recargas)
+        self.lock_carga = threading.RLock()
+
+    def describir_estado(self) -> str:
+        if self.activa is not None:
+            return "activo"
+        if self.cargando:
+            return "cargando"
+        if self.error is not None:
+            return "error"
+        return "diferido" if self.diferida else "pendiente"
+
+
+def huella_archivo(ruta: str) -> str:
+    """Versión de un artefacto: primeros 12 caracteres del SHA-256 de su contenido"""
+    sha = hashlib.sha256()
+    with open(ruta, "rb") as archivo:
+        for bloque in iter(lambda: archivo.read(1024 * 1024), b""):
+            sha.update(bloque)
+    return sha.hexdigest()[:12]
+
+
+class RegistroModelos:
+    """
+    Registro central de los modelos del servidor.
+
+    Cada modelo se registra con un `cargador(ruta) -> artefacto` y, opcionalmente,
+    una función `calentar(artefacto)` que ejecuta una inferencia de ejemplo.
+    Antes de calentarlo se fijan los hilos por llamada del modelo (core.hilos).
+    Una versión nueva se carga y se calienta aparte y recién entonces reemplaza a la
+    activa con una sola asignación: las requests en curso terminan con la versión
+    que ya tenían y las siguientes usan la nueva. La versión reemplazada queda
+    residente para poder volver a ella con `rollback`.
+
+    Registrar un modelo no lo carga: `cargar_pendientes` carga en paralelo todos
+    los que no son diferidos (lo llama el lifespan de la aplicación) y los
+    diferidos (BANKMIND_CARGA_DIFERIDA[_<MODELO>]) se cargan en su primer `obtener`.
+    """
+
+    def __init__(self):
+        self._entradas: Dict[str, _Entrada] = {}
+
+    def registrar(self, nombre: str, cargador: Callable[[str], Any], ruta: str,
+                  calentar: Optional[Callable[[Any], Any]] = None, diferida: Optional[bool] = None) -> None:
+        if diferida is None:
+            diferida = obtener_bool("CARGA_DIFERIDA", False, modelo=nombre)
+        self._entradas[nombre] = _Entrada(nombre, cargador, ruta, calentar, diferida)
+
+    def _entrada(self, nombre: str) -> _Entrada:
+        entrada = self._entradas.get(nombre)
+        if entrada is None:
+            raise KeyError(f"Modelo '{nombre}' no registrado")
+        return entrada
+
+    def registrado(self, nombre: str) -> bool:
+        return nombre in self._entradas
+
+    def directorios_permitidos(self, nombre: str) -> List[str]:
+        """
+        Carpetas desde las que se pueden recargar artefactos del modelo: la del
+        artefacto registrado y las de BANKMIND_RUTAS_MODELOS[_<MODELO>]
+        (separadas por os.pathsep).
+        """
+        extra = obtener_texto("RUTAS_MODELOS", "", modelo=nombre)
+        return [self._entrada(nombre).directorio] + [
+            os.path.realpath(directorio) for directorio in extra.split(os.pathsep) if directorio
+        ]
+
+    def resolver_ruta(self, nombre: str, ruta: str) -> str:
+        """
+        Ruta real de un artefacto pedido para recarga. Cargar un artefacto es
+        deserializarlo (pickle), así que solo se aceptan archivos dentro de los
+        directorios permitidos.
+
+        Raises:
+            ValueError: Si la ruta está fuera de los directorios permitidos o no existe.
+        """
+        real = os.path.realpath(ruta)
+        if not any(os.path.commonpath([real, directorio]) == directorio
+                   for directorio in self.directorios_permitidos(nombre)):
+            raise ValueError(f"La ruta '{ruta}' está fuera de los directorios de artefactos de '{nombre}'")
+        if not os.path.isfile(real):
+            raise ValueError(f"No existe el artefacto '{ruta}'")
+        return real
+
+    def cargar(self, nombre: str, ruta: Optional[str] = None) -> VersionModelo:
+        """
+        Carga y calienta una versión del modelo y la activa.
+
+        Args:
+            nombre: Nombre del modelo registrado.
+            ruta: Artefacto a cargar; por defecto, el último usado.
+
+        Returns:
+            La versión activada.
+
+        Raises:
+            Exception: El error del cargador o del calentamiento. La versión
+                activa (si la hay) se conserva.
+        """
+        entrada = self._entrada(nombre)
+        with entrada.lock_carga:
+            ruta = ruta or entrada.ruta
+            entrada.cargando = True
+            inicio = time.perf_counter()
+            try:
+                version = huella_archivo(ruta)
+                artefacto = entrada.cargador(ruta)
+                aplicar_hilos(nombre, artefacto)
+                if entrada.calentar is not None:
+                    entrada.calentar(artefacto)
+            except Exception as e:
+                entrada.error = f"{type(e).__name__}: {e}"
+                raise
+            finally:
+                entrada.cargando = False
+            nueva = VersionModelo(artefacto, version, ruta, time.perf_counter() - inicio)
+
+            with entrada.lock:
+                if entrada.activa is not None:
+                    entrada.anterior = entrada.activa
+                entrada.activa = nueva
+                entrada.ruta = ruta
+                entrada.error = None
+        print(f"[OK] Modelo '{nombre}' versión {version} activo ({nueva.segundos_carga:.2f}s)")
+        return nueva
+
+    def cargar_pendientes(self, max_hilos: Optional[int] = None, incluir_diferidos: bool = False) -> List[str]:
+        """
+        Carga en paralelo, un hilo por modelo, los modelos no diferidos (o todos,
+        con `incluir_diferidos`) que todavía no tienen versión activa. La
+        deserialización de XGBoost y los cálculos de numpy liberan el GIL, así
+        que el arranque tarda cerca de lo que tarda el modelo más pesado y no la
+        suma de todos.
+
+        Returns:
+            Los nombres de los modelos que no se pudieron cargar. El error queda
+            en el estado del modelo; los demás se activan igual.
+        """
+        pendientes = [e.nombre for e in self._entradas.values()
+                      if (incluir_diferidos or not e.diferida) and e.activa is None]
+        if not pendientes:
+            return []
+
+        def tarea(nombre: str) -> Optional[str]:
+            try:
+                self.cargar(nombre)
+                return None
+            except Exception as e:
+                print(f"[WARN] No se pudo cargar el modelo '{nombre}': {e}")
+                return nombre
+
+        with ThreadPoolExecutor(max_workers=max_hilos or len(pendientes), thread_name_prefix="carga") as pool:
+            return [nombre for nombre in pool.map(tarea, pendientes) if nombre is not None]
+
+    def listo(self) -> bool:
+        """True cuando todos los modelos no diferidos tienen una versión activa"""
+        return all(e.activa is not None for e in self._entradas.values() if not e.diferida)
+
+    def recargar_en_segundo_plano(self, nombre: str, ruta: Optional[str] = None) -> bool:
+        """
+        Inicia la carga de una nueva versión en un hilo aparte.
+
+        Returns:
+            False si ya había una recarga en curso para ese modelo.
+
+        Raises:
+            ValueError: Si `ruta` no es un artefacto permitido (ver resolver_ruta).
+        """
+        entrada = self._entrada(nombre)
+        if ruta is not None:
+            ruta = self.resolver_ruta(nombre, ruta)
+        with entrada.lock:
+            if entrada.cargando:
+                return False
+            entrada.cargando = True
+
+        def tarea():
+            try:
+                self.cargar(nombre, ruta)
+            except Exception as e:
+                print(f"[WARN] Falló la recarga del modelo '{nombre}': {e}")
+            finally:
+                entrada.cargando = False
+
+        threading.Thread(target=tarea, name=f"recarga-{nombre}", daemon=True).start()
+        return True
+
+    def rollback(self, nombre: str) -> VersionModelo:
+        """
+        Intercambia la versión activa con la anterior que sigue residente.
+
+        Raises:
+            ValueError: Si no hay versión anterior.
+        """
+        entrada = self._entrada(nombre)
+        with entrada.lock:
+            if entrada.anterior is None:
+                raise ValueError(f"El modelo '{nombre}' no tiene una versión anterior")
+            entrada.activa, entrada.anterior = entrada.anterior, entrada.activa
+            entrada.ruta = entrada.activa.ruta
+            return entrada.activa
+
+    def version(self, nombre: str) -> Optional[VersionModelo]:
+        """Versión activa del modelo, o None si todavía no hay ninguna"""
+        return self._entrada(nombre).activa
+
+    def obtener(self, nombre: str) -> Any:
+        """
+        Devuelve el artefacto activo del modelo.
+
+        Un modelo diferido se carga aquí la primera vez que se pide; las requests
+        que llegan mientras tanto esperan esa misma carga.
+
+        Raises:
+            ModeloNoDisponibleError: Si el modelo no tiene ninguna versión cargada.
+        """
+        entrada = self._entrada(nombre)
+        activa = entrada.activa
+        if activa is None and entrada.diferida:
+            activa = self._cargar_primer_uso(entrada)
+        if activa is None:
+            raise ModeloNoDisponibleError(f"El modelo '{nombre}' no está disponible.")
+        return activa.artefacto
+
+    def _cargar_primer_uso(self, entrada: _Entrada) -> Optional[VersionModelo]:
+        with entrada.lock_carga:
+            if entrada.activa is None:
+                try:
+                    self.cargar(entrada.nombre)
+                except Exception as e:
+                    print(f"[WARN] No se pudo cargar el modelo diferido '{entrada.nombre}': {e}")
+            return entrada.activa
+
+    def estado(self) -> Dict[str, Dict]:
+        resultado = {}
+        for nombre, entrada in self._entradas.items():
+            resultado[nombre] = {
+                "activa": entrada.activa.describir() if entrada.activa else None,
+                "anterior": entrada.anterior.describir() if entrada.anterior else None,
+                "estado": entrada.describir_estado(),
+                "diferida": entrada.diferida,
+                "cargando": entrada.cargando,
+                "error": entrada.error,
+            }
+        return resultado
+
+
+# Registro único del proceso
+registro = RegistroModelos()
@@ -0,0 +1,87 @@
+# src/core/respuestas.py
+import json
+from datetime import date
+from typing import Any, Dict, Iterator, List, Type, TypeVar, Union
+
+from fastapi.responses import Response, StreamingResponse
+from pydantic import BaseModel
+
+from core.config import obtener_bool, obtener_entero
+
+# Listas con al menos este número de elementos se envían en streaming
+# (BANKMIND_RESPUESTA_STREAM_MIN[_<MODELO>])
+RESPUESTA_STREAM_MIN_DEFECTO = 1000
+
+# Elementos serializados por cada trozo del streaming
+ELEMENTOS_POR_TROZO = 256
+
+
+def _por_defecto(valor: Any) -> Any:
+    # Solo se llama para tipos que json no conoce
+    if isinstance(valor, BaseModel):
+        return valor.model_dump(mode="json")
+    if isinstance(valor, date):
+        return valor.isoformat()
+    raise TypeError(f"Tipo no serializable: {type(valor).__name__}")
+
+
+# Mismos parámetros que JSONResponse.render de Starlette: la salida es idéntica byte a byte.
+# No se usa orjson porque formatea los floats distinto (1e-5 frente a 1e-05).
+_codificador = json.JSONEncoder(
+    ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":"), default=_por_defecto
+)
+
+Modelo = TypeVar("Modelo", bound=BaseModel)
+
+_activas: Dict[str, bool] = {}
+
+
+def respuesta_rapida(modelo: str) -> bool:
+    """
+    Indica si el modelo usa el modo de respuesta rápida (BANKMIND_RESPUESTA_RAPIDA[_<MODELO>]):
+    las salidas se arman como dicts planos sin validar y se serializan directamente,
+    sin pasar por la validación de `response_model` ni por `jsonable_encoder`.
+    """
+    activa = _activas.get(modelo)
+    if activa is None:
+        activa = _activas[modelo] = obtener_bool("RESPUESTA_RAPIDA", False, modelo=modelo)
+    return activa
+
+
+def construir(modelo: str, clase: Type[Modelo], **campos) -> Union[Modelo, Dict[str, Any]]:
+    """
+    Instancia una salida del esquema `clase`. En modo rápido devuelve un dict con
+    los campos en el orden del esquema, sin validar: los servicios ya entregan
+    valores con el tipo final (float, str, ...). model_construct no sirve para
+    esto porque en Pydantic v2 es más lento que la validación.
+    """
+    if respuesta_rapida(modelo):
+        return {nombre: campos[nombre] for nombre in clase.model_fields}
+    return clase(**campos)
+
+
+def a_json(contenido: Any) -> bytes:
+    return _codificador.encode(contenido).encode("utf-8")
+
+
+def respuesta_json(contenido: Any) -> Response:
+    """Respuesta JSON ya serializada; FastAPI la devuelve tal cual, sin revalidarla"""
+    return Response(a_json(contenido), media_type="application/json")
+
+
+def _trozos(elementos: List[Any]) -> Iterator[bytes]:
+    yield b"["
+    for inicio in range(0, len(elementos), ELEMENTOS_POR_TROZO):
+        trozo = b",".join(a_json(elemento) for elemento in elementos[inicio:inicio + ELEMENTOS_POR_TROZO])
+        yield trozo if inicio == 0 else b"," + trozo
+    yield b"]"
+
+
+def respuesta_lote(modelo: str, elementos: List[Any]) -> Response:
+    """
+    Respuesta de un lote: los lotes grandes se serializan por trozos mientras se
+    envían, en lugar de armar todo el JSON en memoria. El cuerpo es el mismo.
+    """
+    if len(elementos) >= obtener_entero("RESPUESTA_STREAM_MIN", RESPUESTA_STREAM_MIN_DEFECTO, modelo=modelo):
+        return StreamingResponse(_trozos(elementos), media_type="application/json")
+    return respuesta_json(elementos)
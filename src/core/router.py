@@ -0,0 +1,184 @@
+# src/core/router.py
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+
+from core.admision import estadisticas_admision
+from core.batching import estadisticas_batching
+from core.cache import estadisticas_cache, obtener_cache
+from core.deriva import estadisticas_deriva, obtener_deriva
+from core.ejecutor import estadisticas_ejecutores
+from core.hilos import aplicar_hilos, estadisticas_hilos
+from core.memoria import reporte_memoria
+from core.metricas import muestreo
+from core.prefork import estado_unico
+from core.registro import registro
+
+
+router = APIRouter(
+    prefix="/interno",
+    tags=["Operación"]
+)
+
+
+@router.get("/admision", summary="Estado del control de admisión")
+def admision():
+    """
+    Límites, requests en curso y en cola, tiempo de servicio medido y
+    rechazos (cola llena o plazo) por endpoint.
+    """
+    return estadisticas_admision()
+
+
+@router.get("/batching", summary="Estadísticas del micro-batching")
+def batching():
+    """
+    Histogramas de tamaño de lote y tiempo de espera en cola por modelo.
+    """
+    return estadisticas_batching()
+
+
+@router.get("/cache", summary="Estadísticas de la caché de predicciones")
+def cache():
+    """
+    Aciertos, fallos, requests coalescidas, expulsiones LRU y expiraciones por modelo.
+    """
+    return estadisticas_cache()
+
+
+@router.delete("/cache/{nombre}", summary="Vaciar la caché de un modelo", dependencies=[Depends(estado_unico)])
+def limpiar_cache(nombre: str):
+    """
+    Descarta todas las predicciones cacheadas del modelo.
+    """
+    try:
+        obtener_cache(nombre).limpiar()
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"El modelo '{nombre}' no tiene caché")
+    return {"modelo": nombre, "entradas": 0}
+
+
+@router.get("/deriva", summary="Deriva de entradas y puntajes")
+def deriva():
+    """
+    Resumen de cada variable monitoreada (conteo, media, cuantiles o
+    frecuencias) sumando todos los workers y, si el modelo tiene perfil de
+    referencia, su PSI, KS y alerta de deriva.
+    """
+    return estadisticas_deriva()
+
+
+@router.post("/deriva/{nombre}/perfil", summary="Guardar lo observado como perfil de referencia")
+def guardar_perfil_deriva(nombre: str):
+    """
+    Guarda los sketches actuales como perfil de referencia junto al artefacto
+    activo (o en BANKMIND_DERIVA_PERFIL_<MODELO>), p. ej. al cerrar un período
+    validado después de desplegar un modelo.
+    """
+    monitor = obtener_deriva(nombre)
+    if monitor is None:
+        raise HTTPException(status_code=404, detail=f"El modelo '{nombre}' no tiene monitoreo de deriva")
+    try:
+        return monitor.guardar_perfil()
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+
+@router.put("/metricas/muestreo", summary="Activar o desactivar el muestreo de etapas", dependencies=[Depends(estado_unico)])
+def cambiar_muestreo(
+    activo: bool = Query(..., description="Medir la duración de las etapas de los pipelines"),
+    fraccion: Optional[float] = Query(None, gt=0, le=1, description="Fracción de llamadas a medir")
+):
+    """
+    Cambia en caliente el muestreo de etapas que se publica en /metrics.
+    Los valores iniciales salen de BANKMIND_METRICAS_ETAPAS y BANKMIND_METRICAS_MUESTREO.
+    """
+    muestreo.activo = activo
+    if fraccion is not None:
+        muestreo.fraccion = fraccion
+    return {"activo": muestreo.activo, "fraccion": muestreo.fraccion}
+
+
+@router.get("/ejecutores", summary="Estado de los pools de inferencia")
+def ejecutores():
+    """
+    Hilos, tamaño de cola, tareas en curso y rechazos por modelo.
+    """
+    return estadisticas_ejecutores()
+
+
+@router.get("/hilos", summary="Hilos de cálculo por modelo")
+def hilos():
+    """
+    Núcleos disponibles, límite de BLAS/OpenMP del proceso y, por modelo, los
+    hilos por llamada y los estimadores a los que se aplicaron.
+    """
+    return estadisticas_hilos()
+
+
+@router.put("/hilos/{nombre}", summary="Cambiar los hilos por llamada de un modelo", dependencies=[Depends(estado_unico)])
+def cambiar_hilos(nombre: str, hilos: int = Query(..., ge=1, description="Hilos por llamada de inferencia")):
+    """
+    Aplica el número de hilos a la versión activa del modelo sin recargarlo.
+    Una recarga posterior vuelve al valor de BANKMIND_HILOS_MODELO.
+    """
+    if not registro.registrado(nombre):
+        raise HTTPException(status_code=404, detail=f"Modelo '{nombre}' no registrado")
+    version = registro.version(nombre)
+    if version is None:
+        raise HTTPException(status_code=409, detail=f"El modelo '{nombre}' no tiene una versión cargada")
+    aplicar_hilos(nombre, version.artefacto, hilos)
+    return estadisticas_hilos()["modelos"][nombre]
+
+
+@router.get("/memoria", summary="Memoria residente del servidor")
+def memoria():
+    """
+    RSS, PSS y memoria única frente a compartida del proceso o, en modo
+    prefork, del maestro y de cada worker.
+    """
+    return reporte_memoria()
+
+
+@router.get("/modelos", summary="Versiones de modelos cargadas")
+def modelos():
+    """
+    Versión activa, versión anterior residente y tiempo de carga de cada modelo.
+    """
+    return registro.estado()
+
+
+@router.post("/modelos/{nombre}/recargar", status_code=202, summary="Recargar un modelo en caliente", dependencies=[Depends(estado_unico)])
+def recargar_modelo(
+    nombre: str,
+    ruta: Optional[str] = Query(None, description="Artefacto a cargar; por defecto se relee el actual")
+):
+    """
+    Carga, calienta y activa una nueva versión en segundo plano sin cortar las
+    requests en curso. El resultado se consulta en /interno/modelos.
+
+    `ruta` debe estar en la carpeta del artefacto registrado o en una de
+    BANKMIND_RUTAS_MODELOS[_<MODELO>]; cualquier otra se rechaza con 400.
+    """
+    if not registro.registrado(nombre):
+        raise HTTPException(status_code=404, detail=f"Modelo '{nombre}' no registrado")
+    try:
+        iniciada = registro.recargar_en_segundo_plano(nombre, ruta)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not iniciada:
+        raise HTTPException(status_code=409, detail=f"Ya hay una recarga en curso para '{nombre}'")
+    return {"modelo": nombre, "estado": "cargando"}
+
+
+@router.post("/modelos/{nombre}/rollback", summary="Volver a la versión anterior", dependencies=[Depends(estado_unico)])
+def rollback_modelo(nombre: str):
+    """
+    Reactiva la versión anterior, que sigue residente en memoria.
+    """
+    if not registro.registrado(nombre):
+        raise HTTPException(status_code=404, detail=f"Modelo '{nombre}' no registrado")
+    try:
+        return registro.rollback(nombre).describir()
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
@@ -0,0 +1,363 @@
+# src/core/trabajos.py
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import IO, Callable, Dict, Iterator, List, Optional, Sequence
+
+from core.config import obtener_entero, obtener_flotante, obtener_texto
+
+# Valores por defecto, configurables con BANKMIND_TRABAJOS_CONCURRENTES,
+# BANKMIND_TRABAJOS_COLA, BANKMIND_TRABAJOS_RETENCION_S y BANKMIND_TRABAJOS_DIR
+TRABAJOS_CONCURRENTES_DEFECTO = 1
+TRABAJOS_COLA_DEFECTO = 8
+TRABAJOS_RETENCION_S_DEFECTO = 24 * 3600.0
+
+ESTADOS_ACTIVOS = ("en_cola", "ejecutando")
+ESTADOS_FINALES = ("completado", "fallido", "cancelado")
+
+_EXTENSIONES = {".csv": "csv", ".ndjson": "ndjson", ".jsonl": "ndjson", ".json": "json"}
+_ID_VALIDO = re.compile(r"[0-9a-f]{32}")
+
+# procesar(archivo, formato) -> bloques de texto NDJSON, una línea por fila de entrada
+Procesador = Callable[[IO, str], Iterator[str]]
+
+
+class TrabajosSaturadosError(Exception):
+    """Se alcanzó el máximo de trabajos en ejecución más en cola"""
+
+    def __init__(self, maximo: int):
+        super().__init__(f"Hay {maximo} trabajos pendientes, intente nuevamente más tarde.")
+
+
+class TrabajoNoEncontradoError(KeyError):
+    """El id no corresponde a ningún trabajo (o ya se eliminó)"""
+
+
+class _TipoTrabajo:
+    def __init__(self, modelo: str, procesar: Procesador, formatos: Sequence[str]):
+        self.modelo = modelo
+        self.procesar = procesar
+        self.formatos = tuple(formatos)
+
+
+_tipos: Dict[str, _TipoTrabajo] = {}
+
+
+def registrar_trabajo(modelo: str, procesar: Procesador, formatos: Sequence[str]) -> None:
+    """Habilita los trabajos asíncronos de un modelo con su función de puntuación por bloques"""
+    _tipos[modelo] = _TipoTrabajo(modelo, procesar, formatos)
+
+
+def tipos_trabajo() -> Dict[str, List[str]]:
+    return {modelo: list(tipo.formatos) for modelo, tipo in _tipos.items()}
+
+
+def detectar_formato(nombre_archivo: Optional[str], content_type: Optional[str], formatos: Sequence[str]) -> str:
+    """
+    Deduce el formato del archivo por su extensión o content-type.
+
+    Raises:
+        ValueError: Si no se puede deducir o el modelo no lo acepta.
+    """
+    formato = _EXTENSIONES.get(os.path.splitext(nombre_archivo or "")[1].lower())
+    tipo = (content_type or "").lower()
+    if formato is None:
+        if "csv" in tipo:
+            formato = "csv"
+        elif "ndjson" in tipo or "jsonl" in tipo:
+            formato = "ndjson"
+        elif "json" in tipo:
+            formato = "json"
+    if formato not in formatos:
+        raise ValueError(f"Formato no soportado; use formato={' o formato='.join(formatos)}")
+    return formato
+
+
+def contar_filas(ruta: str, formato: str) -> Optional[int]:
+    """Filas de datos del archivo (sin recorrerlo con el parser), o None si el formato no es por líneas"""
+    if formato not in ("csv", "ndjson"):
+        return None
+    lineas, ultimo = 0, b"\n"
+    with open(ruta, "rb") as archivo:
+        for bloque in iter(lambda: archivo.read(1024 * 1024), b""):
+            lineas += bloque.count(b"\n")
+            ultimo = bloque[-1:]
+    if ultimo != b"\n":
+        lineas += 1
+    return max(lineas - 1, 0) if formato == "csv" else lineas
+
+
+def _ahora() -> str:
+    return datetime.now().isoformat(timespec="seconds")
+
+
+class Trabajo:
+    def __init__(self, modelo: str, formato: str):
+        self.id = uuid.uuid4().hex
+        self.modelo = modelo
+        self.formato = formato
+        self.estado = "en_cola"
+        self.filas_procesadas = 0
+        self.filas_totales: Optional[int] = None
+        self.creado_en = _ahora()
+        self.iniciado_en: Optional[str] = None
+        self.terminado_en: Optional[str] = None
+        self.error: Optional[str] = None
+        self.cancelacion = threading.Event()
+
+    def describir(self) -> Dict:
+        progreso = None
+        if self.estado == "completado":
+            progreso = 1.0
+        elif self.filas_totales:
+            progreso = round(min(self.filas_procesadas / self.filas_totales, 1.0), 4)
+        return {
+            "id": self.id,
+            "modelo": self.modelo,
+            "formato": self.formato,
+            "estado": self.estado,
+            "filas_procesadas": self.filas_procesadas,
+            "filas_totales": self.filas_totales,
+            "progreso": progreso,
+            "creado_en": self.creado_en,
+            "iniciado_en": self.iniciado_en,
+            "terminado_en": self.terminado_en,
+            "error": self.error,
+        }
+
+
+class GestorTrabajos:
+    """
+    Trabajos de puntuación de archivos grandes fuera del ciclo de la request.
+
+    El archivo se guarda en disco y el trabajo se encola; un pool propio y
+    acotado (BANKMIND_TRABAJOS_CONCURRENTES) lo procesa por bloques con la
+    función registrada para el modelo y escribe el resultado como NDJSON.
+    Como el pool es independiente de los de inferencia, los trabajos no le
+    quitan hilos al tráfico interactivo.
+
+    El estado de cada trabajo también se escribe en `<id>.json` dentro del
+    directorio de trabajos, así que en modo prefork cualquier worker puede
+    informarlo, entregar el resultado o pedir la cancelación (con un archivo
+    `<id>.cancelar` que el worker que lo ejecuta revisa entre bloques).
+    """
+
+    def __init__(self, directorio: str = None, max_concurrentes: int = None, max_cola: int = None,
+                 retencion_s: float = None):
+        self.directorio = directorio or obtener_texto(
+            "TRABAJOS_DIR", os.path.join(tempfile.gettempdir(), "bankmind_trabajos"))
+        self.max_concurrentes = max_concurrentes if max_concurrentes is not None else obtener_entero(
+            "TRABAJOS_CONCURRENTES", TRABAJOS_CONCURRENTES_DEFECTO)
+        self.max_cola = max_cola if max_cola is not None else obtener_entero("TRABAJOS_COLA", TRABAJOS_COLA_DEFECTO)
+        self.retencion_s = retencion_s if retencion_s is not None else obtener_flotante(
+            "TRABAJOS_RETENCION_S", TRABAJOS_RETENCION_S_DEFECTO)
+        if self.max_concurrentes < 1 or self.max_cola < 0 or self.retencion_s <= 0:
+            raise ValueError("Configuración de trabajos inválida")
+        self._trabajos: Dict[str, Trabajo] = {}
+        self._lock = threading.Lock()
+        # El pool se crea en el primer uso (p. ej. después de un fork)
+        self._pool: Optional[ThreadPoolExecutor] = None
+
+    def _ruta(self, id_trabajo: str, extension: str) -> str:
+        return os.path.join(self.directorio, f"{id_trabajo}.{extension}")
+
+    def _obtener_pool(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.max_concurrentes, thread_name_prefix="trabajo")
+            return self._pool
+
+    def _guardar_estado(self, trabajo: Trabajo) -> None:
+        ruta = self._ruta(trabajo.id, "json")
+        with open(f"{ruta}.tmp", "w", encoding="utf-8") as archivo:
+            json.dump(trabajo.describir(), archivo, ensure_ascii=False)
+        os.replace(f"{ruta}.tmp", ruta)
+
+    def _eliminar_archivos(self, id_trabajo: str) -> None:
+        for extension in ("entrada", "ndjson.parcial", "ndjson", "cancelar", "json"):
+            try:
+                os.remove(self._ruta(id_trabajo, extension))
+            except FileNotFoundError:
+                pass
+
+    def _purgar(self) -> None:
+        """Elimina los trabajos terminados hace más de `retencion_s`"""
+        limite = time.time() - self.retencion_s
+        for nombre in os.listdir(self.directorio):
+            id_trabajo, extension = os.path.splitext(nombre)
+            if extension != ".json" or not _ID_VALIDO.fullmatch(id_trabajo):
+                continue
+            local = self._trabajos.get(id_trabajo)
+            if local is not None and local.estado in ESTADOS_ACTIVOS:
+                continue
+            try:
+                vencido = os.path.getmtime(os.path.join(self.directorio, nombre)) < limite
+            except FileNotFoundError:
+                continue
+            if vencido:
+                self._trabajos.pop(id_trabajo, None)
+                self._eliminar_archivos(id_trabajo)
+
+    def crear(self, modelo: str, archivo: IO, nombre_archivo: Optional[str] = None,
+              content_type: Optional[str] = None, formato: Optional[str] = None) -> Trabajo:
+        """
+        Guarda el archivo de entrada y registra el trabajo en estado "en_cola".
+        Falta llamar a `encolar(id)` para que empiece a procesarse.
+
+        Raises:
+            KeyError: Si el modelo no admite trabajos.
+            ValueError: Si el formato no es válido para el modelo.
+            TrabajosSaturadosError: Si ya hay demasiados trabajos pendientes.
+        """
+        tipo = _tipos.get(modelo)
+        if tipo is None:
+            raise KeyError(f"El modelo '{modelo}' no admite trabajos")
+        if formato is None:
+            formato = detectar_formato(nombre_archivo, content_type, tipo.formatos)
+        elif formato not in tipo.formatos:
+            raise ValueError(f"Formato no soportado para '{modelo}': {formato}")
+
+        os.makedirs(self.directorio, exist_ok=True)
+        with self._lock:
+            pendientes = sum(1 for t in self._trabajos.values() if t.estado in ESTADOS_ACTIVOS)
+            maximo = self.max_concurrentes + self.max_cola
+            if pendientes >= maximo:
+                raise TrabajosSaturadosError(maximo)
+            trabajo = Trabajo(modelo, formato)
+            self._trabajos[trabajo.id] = trabajo
+            self._purgar()
+
+        try:
+            with open(self._ruta(trabajo.id, "entrada"), "wb") as destino:
+                shutil.copyfileobj(archivo, destino, 1024 * 1024)
+            trabajo.filas_totales = contar_filas(self._ruta(trabajo.id, "entrada"), formato)
+            self._guardar_estado(trabajo)
+        except Exception:
+            with self._lock:
+                self._trabajos.pop(trabajo.id, None)
+            self._eliminar_archivos(trabajo.id)
+            raise
+        return trabajo
+
+    def encolar(self, id_trabajo: str) -> None:
+        self._obtener_pool().submit(self._ejecutar, self._trabajos[id_trabajo])
+
+    def _cancelado(self, trabajo: Trabajo) -> bool:
+        return trabajo.cancelacion.is_set() or os.path.exists(self._ruta(trabajo.id, "cancelar"))
+
+    def _terminar(self, trabajo: Trabajo, estado: str, error: Optional[str] = None) -> None:
+        trabajo.estado = estado
+        trabajo.error = error
+        trabajo.terminado_en = _ahora()
+        self._guardar_estado(trabajo)
+        for extension in ("entrada", "ndjson.parcial", "cancelar"):
+            try:
+                os.remove(self._ruta(trabajo.id, extension))
+            except FileNotFoundError:
+                pass
+
+    def _ejecutar(self, trabajo: Trabajo) -> None:
+        # Bajo el lock: cancelar no puede terminar el trabajo (y borrar su entrada)
+        # entre esta verificación y el paso a "ejecutando"
+        with self._lock:
+            if trabajo.estado != "en_cola":
+                return
+            if self._cancelado(trabajo):
+                self._terminar(trabajo, "cancelado")
+                return
+            trabajo.estado = "ejecutando"
+            trabajo.iniciado_en = _ahora()
+        self._guardar_estado(trabajo)
+
+        parcial = self._ruta(trabajo.id, "ndjson.parcial")
+        try:
+            with open(self._ruta(trabajo.id, "entrada"), "rb") as entrada, \
+                    open(parcial, "w", encoding="utf-8") as salida:
+                bloques = _tipos[trabajo.modelo].procesar(entrada, trabajo.formato)
+                try:
+                    for texto in bloques:
+                        salida.write(texto)
+                        trabajo.filas_procesadas += texto.count("\n")
+                        if self._cancelado(trabajo):
+                            break
+                        self._guardar_estado(trabajo)
+                finally:
+                    cerrar = getattr(bloques, "close", None)
+                    if cerrar is not None:
+                        cerrar()
+            if self._cancelado(trabajo):
+                self._terminar(trabajo, "cancelado")
+                return
+            os.replace(parcial, self._ruta(trabajo.id, "ndjson"))
+            trabajo.filas_totales = trabajo.filas_procesadas
+            self._terminar(trabajo, "completado")
+        except Exception as e:
+            self._terminar(trabajo, "fallido", f"{type(e).__name__}: {e}")
+
+    def obtener(self, id_trabajo: str) -> Dict:
+        """
+        Raises:
+            TrabajoNoEncontradoError: Si el trabajo no existe.
+        """
+        trabajo = self._trabajos.get(id_trabajo)
+        if trabajo is not None:
+            return trabajo.describir()
+        if not _ID_VALIDO.fullmatch(id_trabajo):
+            raise TrabajoNoEncontradoError(id_trabajo)
+        try:
+            with open(self._ruta(id_trabajo, "json"), encoding="utf-8") as archivo:
+                return json.load(archivo)
+        except (FileNotFoundError, json.JSONDecodeError):
+            raise TrabajoNoEncontradoError(id_trabajo)
+
+    def ruta_resultado(self, id_trabajo: str) -> str:
+        """
+        Raises:
+            TrabajoNoEncontradoError: Si el trabajo no existe.
+            ValueError: Si el trabajo todavía no terminó o no se completó.
+        """
+        estado = self.obtener(id_trabajo)["estado"]
+        if estado != "completado":
+            raise ValueError(f"El trabajo está en estado '{estado}'; el resultado no está disponible")
+        return self._ruta(id_trabajo, "ndjson")
+
+    def cancelar(self, id_trabajo: str) -> Dict:
+        """
+        Cancela un trabajo pendiente (el que está en ejecución se detiene al
+        terminar el bloque en curso) o, si ya terminó, elimina sus archivos.
+
+        Raises:
+            TrabajoNoEncontradoError: Si el trabajo no existe.
+        """
+        descripcion = self.obtener(id_trabajo)
+        if descripcion["estado"] in ESTADOS_FINALES:
+            with self._lock:
+                self._trabajos.pop(id_trabajo, None)
+            self._eliminar_archivos(id_trabajo)
+            return {**descripcion, "eliminado": True}
+
+        trabajo = self._trabajos.get(id_trabajo)
+        if trabajo is None:
+            # Lo ejecuta otro worker: se le avisa por archivo
+            open(self._ruta(id_trabajo, "cancelar"), "w").close()
+            return {**descripcion, "cancelacion_solicitada": True}
+        trabajo.cancelacion.set()
+        with self._lock:
+            if trabajo.estado == "en_cola":
+                self._terminar(trabajo, "cancelado")
+        return {**trabajo.describir(), "cancelacion_solicitada": True}
+
+    def listar(self) -> List[Dict]:
+        """Trabajos de este proceso, del más reciente al más antiguo"""
+        return [t.describir() for t in sorted(self._trabajos.values(), key=lambda t: t.creado_en, reverse=True)]
+
+
+# Gestor único del proceso
+gestor_trabajos = GestorTrabajos()
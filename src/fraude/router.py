@@ -1,26 +1,89 @@
-from fastapi import APIRouter, HTTPException
+from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Request
 from fraude.service.fraud_service import FraudService
 from fraude.schema.inputs import FraudInput, FraudOutput
+from fraude.service.streaming_service import FORMATOS, puntuar_stream
+from core.admision import admision
+from core.batching import registrar_batcher
+from core.columnar import LoteColumnar, cuerpo_openapi, leer_lote, respuesta_columnar
+from core.cache import registrar_cache
+from core.ejecutor import ColaLlenaError, obtener_ejecutor
+from core.ejemplos import EJEMPLOS
+from core.registro import ModeloNoDisponibleError, registro
+from core.respuestas import respuesta_json, respuesta_lote, respuesta_rapida
+from core.trabajos import registrar_trabajo
 
 router = APIRouter(
     prefix="/api/v1/fraud",
     tags=["Fraud Detection"]
 )
 
-# Instanciamos el servicio una única vez al cargar el módulo
-try:
-    fraud_service = FraudService()
-except Exception as e:
-    print(f"CRITICAL ERROR: No se pudo inicializar el servicio de fraude: {e}")
-    fraud_service = None
+# Registramos el servicio; se carga en el arranque de la aplicación (lifespan)
+# y las nuevas versiones se activan en caliente desde /interno/modelos
+registro.registrar(
+    "fraude",
+    lambda ruta: FraudService(model_path=ruta),
+    FraudService.MODEL_PATH,
+    calentar=lambda servicio: servicio.predict(FraudInput(**EJEMPLOS["fraude"]))
+)
 
-@router.post("/predict", response_model=FraudOutput)
-async def predict_fraud(input_data: FraudInput):
-    if not fraud_service:
+def obtener_servicio() -> FraudService:
+    try:
+        return registro.obtener("fraude")
+    except ModeloNoDisponibleError:
         raise HTTPException(status_code=503, detail="El servicio de fraude no está disponible. Error de inicialización.")
+
+# Las requests concurrentes a /predict se agrupan en una sola llamada a predict_batch
+fraud_batcher = registrar_batcher("fraude", lambda lote: registro.obtener("fraude").predict_batch(lote))
+# Los reintentos idénticos (mismo payload, mismo transaction_id) se responden desde la caché
+fraud_cache = registrar_cache("fraude")
+# Backfills de transacciones (CSV o NDJSON) como trabajos asíncronos en /trabajos/fraude
+registrar_trabajo("fraude", puntuar_stream, FORMATOS)
+
+@router.post("/predict", response_model=FraudOutput, dependencies=[Depends(admision("fraude"))])
+async def predict_fraud(input_data: FraudInput):
+    obtener_servicio()
     
     try:
-        result = fraud_service.predict(input_data)
-        return result
+        result = await fraud_cache.obtener(input_data, lambda: fraud_batcher.enviar(input_data))
+        return respuesta_json(result) if respuesta_rapida("fraude") else result
+    except ColaLlenaError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error procesando la transacción: {str(e)}")
+
+@router.post("/predict/batch", response_model=List[FraudOutput], dependencies=[Depends(admision("fraude_lote"))],
+             openapi_extra=cuerpo_openapi(FraudInput))
+async def predict_fraud_batch(request: Request):
+    """
+    Evalúa un lote de transacciones en una sola pasada del pipeline.
+    Las respuestas se devuelven en el mismo orden de entrada.
+
+    Además de JSON acepta el lote en columnas (Arrow IPC o MessagePack); en ese
+    caso responde en el mismo formato con una columna por campo de auditoría.
+    """
+    input_data = await leer_lote(request, FraudInput)
+    fraud_service = obtener_servicio()
+
+    try:
+        if isinstance(input_data, LoteColumnar):
+            columnas = await obtener_ejecutor("fraude").ejecutar(fraud_service.predict_columnas, input_data.columnas)
+            return respuesta_columnar(columnas, input_data.formato)
+        results = await obtener_ejecutor("fraude").ejecutar(fraud_service.predict_batch, input_data)
+        return respuesta_lote("fraude", results) if respuesta_rapida("fraude") else results
+    except ColaLlenaError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error procesando el lote de transacciones: {str(e)}")
+
+@router.get("/encoders/desconocidos")
+def unknown_categories():
+    """
+    Conteo de valores categóricos desconocidos (category, gender, job)
+    recibidos desde que se cargó el modelo.
+    """
+    return obtener_servicio().estadisticas_encoding()
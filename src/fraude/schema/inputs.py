@@ -17,6 +17,10 @@ class FraudInput(BaseModel):
     merch_lat: float = Field(..., example=-13.1631)
     merch_long: float = Field(..., example=-74.2239)
 
+    class Config:
+        # "inf"/"nan" se rechazan con 422, igual que en los cuerpos Arrow/MessagePack
+        allow_inf_nan = False
+
 # --- MODELO DE SALIDA (Response) ---
 class RiskFactor(BaseModel):
     factor: str
@@ -0,0 +1,62 @@
+import threading
+from collections import Counter
+from typing import Dict
+
+import numpy as np
+import pandas as pd
+
+# Límite de valores desconocidos distintos que se registran por columna,
+# para que un cliente enviando valores aleatorios no haga crecer la memoria.
+MAX_VALORES_REGISTRADOS = 100
+
+
+class EncodingTable:
+    """
+    Tabla hash valor -> código construida una sola vez a partir de un LabelEncoder.
+    Sustituye la búsqueda lineal en `encoder.classes_` y la llamada a `transform`
+    por request, y funciona tanto para un valor como para una columna completa.
+    """
+
+    def __init__(self, columna: str, encoder, codigo_desconocido: int = None):
+        self.columna = columna
+        codigos = encoder.transform(encoder.classes_)
+        self.tabla: Dict[str, int] = dict(zip((str(c) for c in encoder.classes_), codigos.tolist()))
+        # Por defecto se usa el código de la primera clase conocida, igual que el flujo original
+        self.codigo_desconocido = int(codigos[0]) if codigo_desconocido is None else int(codigo_desconocido)
+        self.total_desconocidos = 0
+        self.valores_desconocidos = Counter()
+        self._lock = threading.Lock()
+
+    def _registrar_desconocidos(self, valores) -> None:
+        with self._lock:
+            for valor in valores:
+                self.total_desconocidos += 1
+                if valor in self.valores_desconocidos or len(self.valores_desconocidos) < MAX_VALORES_REGISTRADOS:
+                    self.valores_desconocidos[valor] += 1
+
+    def encode(self, valor) -> int:
+        """Codifica un único valor; los desconocidos reciben el código de respaldo"""
+        codigo = self.tabla.get(str(valor))
+        if codigo is None:
+            self._registrar_desconocidos([str(valor)])
+            return self.codigo_desconocido
+        return codigo
+
+    def encode_column(self, valores) -> np.ndarray:
+        """Codifica una columna completa con una sola pasada de hash"""
+        serie = pd.Series(valores, copy=False).astype(str)
+        codigos = serie.map(self.tabla)
+        faltantes = codigos.isna()
+        if faltantes.any():
+            self._registrar_desconocidos(serie[faltantes].tolist())
+            codigos = codigos.fillna(self.codigo_desconocido)
+        return codigos.to_numpy(dtype=np.int64)
+
+    def estadisticas(self) -> dict:
+        """Conteo de valores desconocidos recibidos desde que se cargó el modelo"""
+        with self._lock:
+            return {
+                "codigo_desconocido": self.codigo_desconocido,
+                "total_desconocidos": self.total_desconocidos,
+                "valores": dict(self.valores_desconocidos.most_common()),
+            }
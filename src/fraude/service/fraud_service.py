@@ -3,12 +3,48 @@ import numpy as np
 import joblib
 import os
 from datetime import datetime
+from typing import Dict, List, Optional
 from fraude.schema.inputs import FraudInput, FraudOutput, RiskFactor
+from fraude.service.encoding import EncodingTable
+from fraude.service.fusion import COLUMNA_ANOMALIA, PuntuadorFusionado, diferencia_maxima, filas_de_verificacion
+from core.arboles import compilar_si_corresponde
+from core.config import obtener_bool, obtener_entero
+from core.deriva import registrar_deriva
+from core.ejemplos import EJEMPLOS
+from core.metricas import etapa
+from core.pipeline import Codificada, Derivada, Pipeline, PipelineCompilado, columnas_infinitas, diferencia_pipeline, filas_infinitas
+from core.respuestas import construir
+
+# Deriva del monto, la distancia, la categoría y el puntaje del XGBoost
+DERIVA = registrar_deriva("fraude", cuantiles=("amt", "distance_km"), puntajes=("xgboost_score",),
+                          categorias=("category",))
 
 class FraudService:
-    def __init__(self):
-        # Ruta dinámica al modelo
-        self.model_path = os.path.join(os.path.dirname(__file__), '../models_files/fraud_v1.pkl')
+    # Columnas categóricas que se codifican con las tablas precompiladas
+    COLUMNAS_CATEGORICAS = ['category', 'gender', 'job']
+
+    # Columnas que se escalan antes del Isolation Forest y el XGBoost
+    COLUMNAS_ESCALADAS = ['amt', 'city_pop', 'age', 'distance_km', 'hour']
+
+    # Columnas numéricas del input y columnas que se leen como texto
+    COLUMNAS_NUMERICAS = ['amt', 'city_pop', 'lat', 'long', 'merch_lat', 'merch_long']
+    COLUMNAS_FECHAS = ['trans_date_trans_time', 'dob']
+
+    # Diferencia máxima aceptada entre el pipeline compilado y el camino de pandas
+    TOLERANCIA_PIPELINE = 1e-9
+
+    # Diferencia máxima aceptada entre el camino fusionado y el de pandas
+    TOLERANCIA_FUSIONADO = 1e-6
+
+    # Ruta dinámica al modelo
+    MODEL_PATH = os.path.join(os.path.dirname(__file__), '../models_files/fraud_v1.pkl')
+
+    def __init__(self, model_path: Optional[str] = None, codigos_desconocidos: Optional[Dict[str, int]] = None):
+        self.model_path = model_path or self.MODEL_PATH
+        # Código asignado a valores categóricos desconocidos, por columna.
+        # Si no se indica, se toma de BANKMIND_CODIGO_DESCONOCIDO_FRAUDE_<COLUMNA> o,
+        # en su defecto, el código de la primera clase del encoder.
+        self.codigos_desconocidos = codigos_desconocidos or {}
         self._load_model()
 
     def _load_model(self):
@@ -19,114 +55,324 @@ class FraudService:
             self.scaler = model_pack['scaler']
             self.xgb_model = model_pack['model_xgb']
             self.if_model = model_pack['model_if']
+            # Evaluadores de inferencia: los mismos modelos, o su versión compilada
+            # si BANKMIND_ARBOLES_COMPILADOS_FRAUDE está activo
+            self.xgb_predictor = compilar_si_corresponde("fraude", self.xgb_model)
+            self.if_predictor = compilar_si_corresponde("fraude", self.if_model)
             self.encoders = model_pack['encoders']
+            self.encoding_tables = {
+                col: EncodingTable(col, self.encoders[col], self._codigo_desconocido(col))
+                for col in self.COLUMNAS_CATEGORICAS
+            }
+            self.columnas_modelo = self.xgb_model.get_booster().feature_names
+            self.pipeline = self._crear_pipeline()
+            self.puntuador = self._crear_puntuador()
             print("Modelo de Fraude cargado correctamente.")
         except Exception as e:
             print(f"Error cargando el modelo: {e}")
             raise RuntimeError("No se pudo iniciar el servicio de IA de Fraude")
 
+    def _crear_pipeline(self) -> Optional[PipelineCompilado]:
+        """
+        Declara y compila el pipeline de features (fechas, distancia, encoding,
+        escalado y orden de columnas del XGBoost) y lo compara con el camino de
+        pandas sobre transacciones de ejemplo; si no coincide se usa pandas.
+        """
+        ejemplo = EJEMPLOS["fraude"]
+        filas = [
+            FraudInput(**ejemplo),
+            FraudInput(**{**ejemplo, "trans_date_trans_time": "2025-07-19 23:05:00", "dob": "1960-12-31",
+                          "amt": 12.5, "gender": "M", "merch_lat": -12.05, "merch_long": -77.04}),
+            FraudInput(**{**ejemplo, "trans_date_trans_time": "2024-02-29 12:00:00", "dob": "2001-03-01",
+                          "city_pop": 2_500_000, "amt": 980.0}),
+        ]
+        try:
+            pipeline = Pipeline(
+                "fraude", self.columnas_modelo,
+                entradas=self.COLUMNAS_NUMERICAS,
+                textos=self.COLUMNAS_FECHAS + self.COLUMNAS_CATEGORICAS,
+                derivadas=[
+                    Derivada(('age', 'hour'), self._edad_y_hora, tuple(self.COLUMNAS_FECHAS),
+                             escalar=self._edad_y_hora_fila),
+                    Derivada('distance_km', self._haversine, ('long', 'lat', 'merch_long', 'merch_lat')),
+                ],
+                codificadas=[Codificada(col, self.encoding_tables[col]) for col in self.COLUMNAS_CATEGORICAS],
+                escalado=self.scaler,
+                columnas_escaladas=self.COLUMNAS_ESCALADAS,
+            ).compilar()
+            diferencia = diferencia_pipeline(pipeline, filas, self._features_pandas)
+        except Exception as e:
+            print(f"[WARN] Pipeline de fraude no disponible, se usa pandas: {e}")
+            return None
+        if diferencia > self.TOLERANCIA_PIPELINE:
+            print(f"[WARN] El pipeline de fraude difiere en {diferencia:.2e}, se usa pandas")
+            return None
+        return pipeline
+
+    def _crear_puntuador(self) -> Optional[PuntuadorFusionado]:
+        """
+        Arma el camino fusionado (BANKMIND_FUSIONADO_FRAUDE, activo por defecto) y lo
+        compara con el de pandas sobre un lote sintético; si no coincide se descarta.
+        """
+        if not obtener_bool("FUSIONADO", True, modelo="fraude") or self.pipeline is None:
+            return None
+        try:
+            puntuador = PuntuadorFusionado(self.columnas_modelo, self.if_model, self.xgb_predictor)
+            X = self.pipeline.matriz(filas_de_verificacion(puntuador.columnas_base, self.encoders))
+            # En trozos de filas_max (recorrido compilado) y de una vez (delegado en sklearn)
+            tamano = max(puntuador.isolation_forest.filas_max, 1)
+            trozos = [puntuador.puntuar(X[inicio:inicio + tamano].copy()) for inicio in range(0, len(X), tamano)]
+            caminos = [tuple(np.concatenate(r) for r in zip(*trozos)), puntuador.puntuar(X.copy())]
+            probabilidades_pandas, anomalias_pandas = self._puntuar_pandas(X)
+            diferencia = max(
+                max(diferencia_maxima(probabilidades, probabilidades_pandas),
+                    diferencia_maxima(anomalias, anomalias_pandas))
+                for probabilidades, anomalias in caminos
+            )
+        except Exception as e:
+            print(f"[WARN] Camino fusionado de fraude no disponible, se usa pandas: {e}")
+            return None
+        if diferencia > self.TOLERANCIA_FUSIONADO:
+            print(f"[WARN] El camino fusionado de fraude difiere en {diferencia:.2e}, se usa pandas")
+            return None
+        return puntuador
+
+    def _codigo_desconocido(self, columna: str) -> Optional[int]:
+        if columna in self.codigos_desconocidos:
+            return self.codigos_desconocidos[columna]
+        return obtener_entero("CODIGO_DESCONOCIDO", None, modelo=f"fraude_{columna}")
+
+    def estadisticas_encoding(self) -> Dict[str, dict]:
+        """Valores categóricos desconocidos recibidos por columna"""
+        return {col: tabla.estadisticas() for col, tabla in self.encoding_tables.items()}
+
     def _haversine(self, lon1, lat1, lon2, lat2):
         """Calcula distancia en km entre dos puntos geográficos"""
         lon1, lat1, lon2, lat2 = map(np.radians, [lon1, lat1, lon2, lat2])
         d = 2 * 6371 * np.arcsin(np.sqrt(np.sin((lat2-lat1)/2)**2 + np.cos(lat1)*np.cos(lat2)*np.sin((lon2-lon1)/2)**2))
         return d
 
+    def _parse_fechas(self, columna: pd.Series) -> pd.Series:
+        """Convierte una columna de fechas; si el lote mezcla formatos se interpreta fila a fila"""
+        try:
+            return pd.to_datetime(columna)
+        except (ValueError, TypeError):
+            return pd.to_datetime(columna, format="mixed")
+
+    def _edad_y_hora(self, transacciones, nacimientos):
+        """Edad del cliente (años cumplidos) y hora de la transacción de una columna de fechas"""
+        transacciones = self._parse_fechas(pd.Series(transacciones))
+        nacimientos = self._parse_fechas(pd.Series(nacimientos))
+        return ((transacciones - nacimientos).dt.days // 365).to_numpy(), transacciones.dt.hour.to_numpy()
+
+    def _edad_y_hora_fila(self, transaccion, nacimiento):
+        transaccion = pd.to_datetime(transaccion)
+        return (transaccion - pd.to_datetime(nacimiento)).days // 365, transaccion.hour
+
+    def _verificar_finitos(self, X: np.ndarray) -> None:
+        """
+        El RobustScaler del camino pandas rechaza valores infinitos; el
+        pipeline compilado los deja pasar, así que se rechazan acá igual.
+
+        Raises:
+            ValueError: Si alguna fila tiene features infinitas.
+        """
+        invalidas = filas_infinitas(X)
+        if len(invalidas):
+            detalle = "; ".join(
+                f"fila {fila}: {', '.join(columnas_infinitas(X, self.columnas_modelo, fila))}" for fila in invalidas[:10]
+            )
+            raise ValueError(f"Input X contains infinity ({detalle})")
+
     def predict(self, input_data: FraudInput) -> FraudOutput:
+        # Una transacción es un lote de tamaño 1; el pipeline la resuelve por su camino escalar
+        return self.predict_batch([input_data])[0]
+
+    def predict_batch(self, inputs: List[FraudInput]) -> List[FraudOutput]:
+        """
+        Evalúa un lote de transacciones ejecutando el pipeline una sola vez
+        sobre todas las filas (fechas, distancia, encoding, escalado, IF y XGBoost).
+        Las salidas se devuelven en el mismo orden que las entradas.
+        """
+        if not inputs:
+            return []
+
         try:
-            # 1. Convertir Pydantic a DataFrame
-            data_dict = input_data.dict()
-            df = pd.DataFrame([data_dict])
-
-            # 2. Ingeniería de Características (Feature Engineering)
-            # Fechas y Edad
-            df['trans_date_trans_time'] = pd.to_datetime(df['trans_date_trans_time'])
-            df['dob'] = pd.to_datetime(df['dob'])
+            # 1-5. Features: fechas y edad, distancia, encoding y escalado, en el orden del XGBoost
+            if self.pipeline is not None:
+                with etapa("fraude", "features"):
+                    X, (horas, distancias, montos) = self.pipeline.transformar_conservando(
+                        inputs, ('hour', 'distance_km', 'amt'))
+                self._verificar_finitos(X)
+            else:
+                df = self._dataframe_features(self._dataframe(inputs))
+                X = self._matriz_pandas(df)
+                horas, distancias, montos = df['hour'].to_numpy(), df['distance_km'].to_numpy(), df['amt'].to_numpy()
+
+            # 6-7. Isolation Forest y XGBoost (una sola llamada para todo el lote)
+            if self.puntuador is not None:
+                probabilidades, anomalias = self.puntuador.puntuar(X)
+            else:
+                probabilidades, anomalias = self._puntuar_pandas(X)
+
+            with etapa("fraude", "deriva"):
+                DERIVA.observar(amt=montos, distance_km=distancias, xgboost_score=probabilidades,
+                                category=[item.category for item in inputs])
+
+            # 8. Reglas de Negocio (Explicabilidad), fila por fila en el orden de entrada
+            with etapa("fraude", "salida"):
+                return [
+                    self._construir_salida(item, probabilidad, anomalia, hora, dist)
+                    for item, probabilidad, anomalia, hora, dist
+                    in zip(inputs, probabilidades, anomalias, horas, distancias)
+                ]
+
+        except Exception as e:
+            # En producción, logguear el error real
+            print(f"Error en predicción: {e}")
+            raise e
+
+    def predict_columnas(self, columnas: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        """
+        Evalúa un lote que llega en columnas (cuerpo Arrow o MessagePack ya
+        validado) y devuelve la salida también en columnas: mismas
+        probabilidades y reglas de negocio que predict_batch, sin objetos por fila.
+        """
+        if self.pipeline is not None:
+            with etapa("fraude", "features"):
+                X, (horas, distancias) = self.pipeline.lote_columnar(columnas, ('hour', 'distance_km'))
+            self._verificar_finitos(X)
+        else:
+            df = self._dataframe_features(pd.DataFrame(columnas))
+            X = self._matriz_pandas(df)
+            horas, distancias = df['hour'].to_numpy(), df['distance_km'].to_numpy()
+
+        if self.puntuador is not None:
+            probabilidades, anomalias = self.puntuador.puntuar(X)
+        else:
+            probabilidades, anomalias = self._puntuar_pandas(X)
+
+        with etapa("fraude", "deriva"):
+            DERIVA.observar(amt=columnas['amt'], distance_km=distancias, xgboost_score=probabilidades,
+                            category=columnas['category'])
+
+        with etapa("fraude", "salida"):
+            horario = (horas <= 3) | (horas >= 22)
+            distancia = distancias > 100
+            monto = np.asarray(columnas['amt']) > 1000
+            alto_riesgo = probabilidades > 0.5
+            return {
+                "transaction_id": columnas['transaction_id'],
+                "veredicto": np.where(alto_riesgo, "ALTO RIESGO", "LEGÍTIMO"),
+                "xgboost_score": probabilidades,
+                "iforest_score": anomalias,
+                "horario_inusual": horario,
+                "distancia_anomala": distancia,
+                "monto_elevado": monto,
+                "detection_scenario": horario.astype(np.int64) + distancia + monto + 1,
+                "recomendacion": np.where(alto_riesgo, "Bloquear y Notificar", "Aprobar"),
+            }
+
+    def _dataframe(self, inputs: List[FraudInput]) -> pd.DataFrame:
+        # 1. Convertir el lote de Pydantic a un DataFrame columnar
+        with etapa("fraude", "dataframe"):
+            return pd.DataFrame([item.model_dump() for item in inputs])
+
+    def _dataframe_features(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Pasos 2-3 sobre un DataFrame; es el camino de referencia del pipeline"""
+        # 2. Ingeniería de Características (Feature Engineering)
+        # Fechas y Edad
+        with etapa("fraude", "fechas"):
+            df['trans_date_trans_time'] = self._parse_fechas(df['trans_date_trans_time'])
+            df['dob'] = self._parse_fechas(df['dob'])
             df['age'] = (df['trans_date_trans_time'] - df['dob']).dt.days // 365
             df['hour'] = df['trans_date_trans_time'].dt.hour
-            
-            # Distancia
+
+        # Distancia
+        with etapa("fraude", "haversine"):
             df['distance_km'] = self._haversine(df['long'], df['lat'], df['merch_long'], df['merch_lat'])
 
-            # 3. Codificación (Encoding)
-            for col in ['category', 'gender', 'job']:
-                encoder = self.encoders[col]
-                valor_entrada = str(df[col].iloc[0])
-                
-                # Verificamos si el valor que llegó existe en el diccionario del encoder
-                if valor_entrada in encoder.classes_:
-                    df[col] = encoder.transform([valor_entrada])
-                else:
-                    # CASO: Valor desconocido (ej: "Manager")
-                    # Acción: Asignamos el primer valor conocido del encoder para no romper el flujo.
-                    # Esto permite que el modelo evalúe la transacción basándose en los otros factores (monto, hora, etc.)
-                    valor_por_defecto = encoder.classes_[0] 
-                    print(f"Aviso: Valor desconocido '{valor_entrada}' en columna '{col}'. Usando por defecto: '{valor_por_defecto}'")
-                    df[col] = encoder.transform([valor_por_defecto])
-
-            # 4. Alineación de columnas con XGBoost
-            # Obtenemos nombres exactos que espera el modelo
-            cols_entrenamiento = self.xgb_model.get_booster().feature_names
-            cols_base = [c for c in cols_entrenamiento if c != 'anomaly_score']
-            
-            X = df[cols_base].copy().astype(float)
-
-            # 5. Escalado
-            cols_to_scale = ['amt', 'city_pop', 'age', 'distance_km', 'hour']
+        # 3. Codificación (Encoding)
+        # Tablas hash precompiladas en _load_model; los valores desconocidos
+        # reciben el código de respaldo de la columna y quedan contabilizados.
+        with etapa("fraude", "encoding"):
+            for col in self.COLUMNAS_CATEGORICAS:
+                df[col] = self.encoding_tables[col].encode_column(df[col])
+        return df
+
+    def _matriz_pandas(self, df: pd.DataFrame) -> np.ndarray:
+        """Pasos 4-5 sobre DataFrames: columnas del XGBoost (anomaly_score en 0) y escalado"""
+        # 4. Alineación de columnas con XGBoost
+        cols_base = [c for c in self.columnas_modelo if c != COLUMNA_ANOMALIA]
+        X = df[cols_base].copy().astype(float)
+
+        # 5. Escalado
+        with etapa("fraude", "escalado"):
+            cols_to_scale = self.COLUMNAS_ESCALADAS
             X[cols_to_scale] = self.scaler.transform(X[cols_to_scale])
+        X[COLUMNA_ANOMALIA] = 0.0
+        return X[self.columnas_modelo].to_numpy()
 
-            # 6. Isolation Forest (Anomaly Score)
-            X['anomaly_score'] = self.if_model.decision_function(X[cols_base])
-
-            # Reordenar final
-            X_final = X[cols_entrenamiento]
-
-            # 7. Predicción
-            probabilidad = self.xgb_model.predict_proba(X_final)[0][1]
-            
-            # 8. Reglas de Negocio (Explicabilidad)
-            veredicto = "ALTO RIESGO" if probabilidad > 0.5 else "LEGÍTIMO"
-            risk_factors = []
-            
-            # Factor: Horario
-            if df['hour'].iloc[0] <= 3 or df['hour'].iloc[0] >= 22:
-                risk_factors.append(RiskFactor(
-                    factor="Horario Inusual",
-                    puntos="+35pts",
-                    descripcion=f"Transacción realizada a las {df['hour'].iloc[0]}:00 h (Madrugada/Noche)"
-                ))
-            
-            # Factor: Distancia
-            dist = df['distance_km'].iloc[0]
-            if dist > 100:
-                risk_factors.append(RiskFactor(
-                    factor="Distancia Anómala",
-                    puntos="+30pts",
-                    descripcion=f"Ubicación a {dist:.1f} km del domicilio habitual"
-                ))
-            
-            # Factor: Monto (Umbral ejemplo, idealmente dinámico)
-            if data_dict['amt'] > 1000: # Umbral simple de ejemplo
-                risk_factors.append(RiskFactor(
-                    factor="Monto Elevado",
-                    puntos="+22pts",
-                    descripcion=f"Monto superior al promedio estándar"
-                ))
-
-            # Construir Respuesta
-            return FraudOutput(
-                transaction_id=input_data.transaction_id,
-                veredicto=veredicto,
-                score_final=f"{probabilidad*100:.1f}%",
-                detalles_riesgo=risk_factors,
-                datos_auditoria={
-                    "xgboost_score": float(probabilidad),
-                    "iforest_score": float(X['anomaly_score'].iloc[0]),
-                    "detection_scenario": len(risk_factors) + 1
-                },
-                recomendacion="Bloquear y Notificar" if veredicto == "ALTO RIESGO" else "Aprobar"
-            )
+    def _features_pandas(self, inputs: List[FraudInput]) -> np.ndarray:
+        return self._matriz_pandas(self._dataframe_features(self._dataframe(inputs)))
 
-        except Exception as e:
-            # En producción, logguear el error real
-            print(f"Error en predicción: {e}")
-            raise e
\ No newline at end of file
+    def _puntuar_pandas(self, X: np.ndarray):
+        """Pasos 6-7 sobre DataFrames; es el camino de referencia del fusionado"""
+        cols_base = [c for c in self.columnas_modelo if c != COLUMNA_ANOMALIA]
+        X = pd.DataFrame(X, columns=self.columnas_modelo)
+
+        # 6. Isolation Forest (Anomaly Score)
+        with etapa("fraude", "isolation_forest"):
+            X[COLUMNA_ANOMALIA] = self.if_predictor.decision_function(X[cols_base])
+
+        # 7. Predicción
+        with etapa("fraude", "xgboost"):
+            probabilidades = self.xgb_predictor.predict_proba(X)[:, 1]
+        return probabilidades, X[COLUMNA_ANOMALIA].to_numpy()
+
+    def _construir_salida(self, input_data: FraudInput, probabilidad, anomalia, hora, dist) -> FraudOutput:
+        """Aplica las reglas de negocio de una fila y arma su respuesta"""
+        veredicto = "ALTO RIESGO" if probabilidad > 0.5 else "LEGÍTIMO"
+        risk_factors = []
+        
+        # Factor: Horario
+        if hora <= 3 or hora >= 22:
+            risk_factors.append(construir(
+                "fraude", RiskFactor,
+                factor="Horario Inusual",
+                puntos="+35pts",
+                descripcion=f"Transacción realizada a las {hora}:00 h (Madrugada/Noche)"
+            ))
+        
+        # Factor: Distancia
+        if dist > 100:
+            risk_factors.append(construir(
+                "fraude", RiskFactor,
+                factor="Distancia Anómala",
+                puntos="+30pts",
+                descripcion=f"Ubicación a {dist:.1f} km del domicilio habitual"
+            ))
+        
+        # Factor: Monto (Umbral ejemplo, idealmente dinámico)
+        if input_data.amt > 1000: # Umbral simple de ejemplo
+            risk_factors.append(construir(
+                "fraude", RiskFactor,
+                factor="Monto Elevado",
+                puntos="+22pts",
+                descripcion=f"Monto superior al promedio estándar"
+            ))
+
+        # Construir Respuesta
+        return construir(
+            "fraude", FraudOutput,
+            transaction_id=input_data.transaction_id,
+            veredicto=veredicto,
+            score_final=f"{probabilidad*100:.1f}%",
+            detalles_riesgo=risk_factors,
+            datos_auditoria={
+                "xgboost_score": float(probabilidad),
+                "iforest_score": float(anomalia),
+                "detection_scenario": len(risk_factors) + 1
+            },
+            recomendacion="Bloquear y Notificar" if veredicto == "ALTO RIESGO" else "Aprobar"
+        )
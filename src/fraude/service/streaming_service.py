@@ -0,0 +1,77 @@
+# src/fraude/service/streaming_service.py
+import csv
+import io
+import itertools
+from typing import IO, Any, Dict, Iterator, List, Optional
+
+from pydantic import ValidationError
+
+from core.config import obtener_entero
+from core.registro import registro
+from core.respuestas import a_json
+from fraude.schema.inputs import FraudInput
+
+# Transacciones por bloque; cada bloque es una sola pasada de predict_batch
+TAMANO_BLOQUE_DEFECTO = 5000
+
+FORMATOS = ("csv", "ndjson")
+
+
+def tamano_bloque() -> int:
+    """Filas por bloque, configurable con BANKMIND_STREAM_BLOQUE_FRAUDE."""
+    return obtener_entero("STREAM_BLOQUE", TAMANO_BLOQUE_DEFECTO, modelo="fraude")
+
+
+def _leer_filas(archivo: IO, formato: str) -> Iterator[Any]:
+    texto = io.TextIOWrapper(archivo, encoding="utf-8", newline="")
+    if formato == "csv":
+        return csv.DictReader(texto)
+    if formato == "ndjson":
+        return (linea for linea in texto if linea.strip())
+    raise ValueError(f"Formato no soportado: {formato}")
+
+
+def _validar(fila: Any, formato: str) -> FraudInput:
+    if formato == "ndjson":
+        return FraudInput.model_validate_json(fila)
+    return FraudInput(**fila)
+
+
+def _describir_error(error: Exception) -> str:
+    if isinstance(error, ValidationError):
+        return "; ".join(f"{'.'.join(map(str, e['loc'])) or 'fila'}: {e['msg']}" for e in error.errors())
+    return str(error)
+
+
+def puntuar_stream(archivo: IO, formato: str, tamano: Optional[int] = None) -> Iterator[str]:
+    """
+    Puntúa un archivo de transacciones por bloques y produce líneas NDJSON en
+    el orden de entrada: {"fila", "resultado"} si la fila es válida o
+    {"fila", "error"} si no lo es. Cada bloque se evalúa con una sola llamada
+    vectorizada a predict_batch.
+
+    Raises:
+        ModeloNoDisponibleError: Si el modelo de fraude no está cargado.
+    """
+    servicio = registro.obtener("fraude")
+    filas = _leer_filas(archivo, formato)
+    tamano = tamano or tamano_bloque()
+    fila_inicial = 0
+    while True:
+        bloque = list(itertools.islice(filas, tamano))
+        if not bloque:
+            return
+        salidas: List[Optional[Dict]] = [None] * len(bloque)
+        posiciones, entradas = [], []
+        for posicion, fila in enumerate(bloque):
+            try:
+                entradas.append(_validar(fila, formato))
+                posiciones.append(posicion)
+            except (ValidationError, ValueError, TypeError) as e:
+                salidas[posicion] = {"fila": fila_inicial + posicion, "error": _describir_error(e)}
+
+        for posicion, resultado in zip(posiciones, servicio.predict_batch(entradas)):
+            salidas[posicion] = {"fila": fila_inicial + posicion, "resultado": resultado}
+
+        fila_inicial += len(bloque)
+        yield "\n".join(a_json(salida).decode("utf-8") for salida in salidas) + "\n"
@@ -1,4 +1,7 @@
-from pydantic import BaseModel, Field
+from typing import Dict, List, Union
+
+import numpy as np
+from pydantic import BaseModel, Field, ValidationError, model_validator
 
 class ChurnInput(BaseModel):
     CreditScore: int = Field(..., description="Puntaje crediticio", example=600)
@@ -13,6 +16,8 @@ class ChurnInput(BaseModel):
     EstimatedSalary: float = Field(..., description="Salario estimado", example=50000.0)
 
     class Config:
+        # "inf"/"nan" se rechazan con 422, igual que en los cuerpos Arrow/MessagePack
+        allow_inf_nan = False
         json_schema_extra = {
             "example": {
                 "Age": 40,
@@ -26,4 +31,83 @@ class ChurnInput(BaseModel):
                 "NumOfProducts": 2,
                 "Tenure": 3
             }
-        }
\ No newline at end of file
+        }
+
+
+# Campos sobre los que puede actuar una campaña de retención y su dominio
+# válido (mínimo, máximo, mínimo excluido). Edad, género y país no se simulan.
+ACTIONABLE_FIELDS = {
+    "CreditScore": (0, None, True),
+    "Tenure": (0, None, False),
+    "Balance": (0, None, False),
+    "NumOfProducts": (1, None, False),
+    "HasCrCard": (0, 1, False),
+    "IsActiveMember": (0, 1, False),
+    "EstimatedSalary": (0, None, True),
+}
+
+
+class PerturbationRange(BaseModel):
+    start: float = Field(..., description="Primer valor del rango")
+    stop: float = Field(..., description="Último valor del rango (incluido)")
+    steps: int = Field(..., ge=2, le=1000, description="Cantidad de valores equiespaciados")
+
+
+class ChurnWhatIfInput(BaseModel):
+    """
+    Cliente base y grilla de perturbaciones: cada campo de `perturbations` es
+    una lista de valores o un rango, y se evalúan todas sus combinaciones.
+    """
+    customer: ChurnInput
+    perturbations: Dict[str, Union[List[Union[int, float, str]], PerturbationRange]] = Field(
+        ..., description="Valores a probar por campo accionable de ChurnInput"
+    )
+    costs: Dict[str, float] = Field(
+        default_factory=dict, description="Costo de cambiar cada campo (por defecto 1)"
+    )
+
+    @model_validator(mode="after")
+    def validate_perturbations(self):
+        """Expande los rangos y valida cada valor con el tipo del campo en ChurnInput y su dominio"""
+        if not self.perturbations:
+            raise ValueError("perturbations debe tener al menos un campo")
+        fields = ChurnInput.model_fields
+        base = self.customer.model_dump()
+        for name, values in self.perturbations.items():
+            if name not in ACTIONABLE_FIELDS:
+                raise ValueError(f"'{name}' no se puede simular; use uno de: {', '.join(ACTIONABLE_FIELDS)}")
+            if isinstance(values, PerturbationRange):
+                values = np.linspace(values.start, values.stop, values.steps)
+                if fields[name].annotation is int:
+                    values = np.unique(np.round(values))
+                values = values.tolist()
+            if not values:
+                raise ValueError(f"'{name}' no tiene valores")
+            try:
+                self.perturbations[name] = [
+                    getattr(ChurnInput.model_validate({**base, name: value}), name) for value in values
+                ]
+            except ValidationError as e:
+                raise ValueError(f"Valor inválido para '{name}': {e.errors()[0]['msg']}")
+            minimum, maximum, exclusive = ACTIONABLE_FIELDS[name]
+            for value in self.perturbations[name]:
+                if (value < minimum or (exclusive and value == minimum)
+                        or (maximum is not None and value > maximum) or not np.isfinite(value)):
+                    raise ValueError(f"Valor fuera de dominio para '{name}': {value}")
+        for name, cost in self.costs.items():
+            if name not in ACTIONABLE_FIELDS or cost < 0:
+                raise ValueError(f"Costo inválido para '{name}'")
+        return self
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "customer": ChurnInput.Config.json_schema_extra["example"],
+                "perturbations": {
+                    "NumOfProducts": [1, 2, 3],
+                    "IsActiveMember": [0, 1],
+                    "Balance": {"start": 0, "stop": 150000, "steps": 16},
+                },
+                "costs": {"NumOfProducts": 2.0},
+            }
+        }
@@ -1,19 +1,51 @@
+import math
+
 import joblib
 import pandas as pd
 import numpy as np
 import os
 
+from fuga.service.feature_builder import churn_pipeline
+from core.arboles import compilar_si_corresponde
+from core.config import obtener_entero
+from core.deriva import registrar_deriva
+from core.ejemplos import EJEMPLOS
+from core.metricas import etapa
+from core.pipeline import columnas_infinitas, diferencia_pipeline, filas_infinitas
+from core.registro import registro
+
 # Rutas dinámicas
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 MODEL_PATH = os.path.join(BASE_DIR, "models_files", "best_model_churn.pkl")
 SCALER_PATH = os.path.join(BASE_DIR, "models_files", "scaler.pkl")
 FEATURES_PATH = os.path.join(BASE_DIR, "models_files", "feature_names.pkl")
 
+# Umbral de probabilidad a partir del cual el cliente se considera en riesgo de fuga
+CHURN_THRESHOLD = 0.45
+
+# Error de las filas con features infinitas (p. ej. TenureByAge con Age en 0), como el de scaler.transform
+NON_FINITE_ERROR = "Input X contains infinity"
+
+# Diferencia máxima aceptada entre el pipeline compilado y preprocess_batch
+PIPELINE_TOLERANCE = 1e-9
+
+# Escenarios máximos de una simulación what-if (BANKMIND_SIMULACION_MAX_FUGA)
+MAX_SCENARIOS = 100_000
+
+# Deriva de la probabilidad de fuga
+DRIFT = registrar_deriva("fuga", puntajes=("churn_probability",))
+
 class ChurnService:
-    def __init__(self):
-        self.model = self._load_file(MODEL_PATH)
-        self.scaler = self._load_file(SCALER_PATH)
-        self.feature_names = self._load_file(FEATURES_PATH)
+    def __init__(self, model_path: str = MODEL_PATH):
+        # El scaler y feature_names se leen de la misma carpeta que el modelo
+        models_dir = os.path.dirname(model_path)
+        self.model = self._load_file(model_path)
+        self.scaler = self._load_file(os.path.join(models_dir, os.path.basename(SCALER_PATH)))
+        self.feature_names = self._load_file(os.path.join(models_dir, os.path.basename(FEATURES_PATH)))
+        # Pipeline de features compilado; si no se puede armar se usa preprocess_batch
+        self.pipeline = self._build_pipeline() if self.feature_names else None
+        # Versión compilada del ensamble si BANKMIND_ARBOLES_COMPILADOS_FUGA está activo
+        self.predictor = compilar_si_corresponde("fuga", self.model) if self.model else None
 
     def _load_file(self, path):
         try:
@@ -27,13 +59,39 @@ class ChurnService:
             print(f"❌ Error cargando {path}: {e}")
             return None
 
+    def _build_pipeline(self):
+        """Compila el pipeline y lo compara con preprocess_batch; si no coincide se descarta"""
+        ejemplo = EJEMPLOS["fuga"]
+        rows = [
+            ejemplo,
+            {**ejemplo, "Gender": "Female", "Geography": "Germany"},
+            {**ejemplo, "Gender": "Mujer", "Geography": "Spain", "Balance": 0.0},
+            {**ejemplo, "Gender": "Otro", "Geography": "Italy", "Tenure": 0},
+        ]
+        try:
+            pipeline = churn_pipeline(self.feature_names, self.scaler).compilar()
+            difference = diferencia_pipeline(pipeline, rows, self.preprocess_batch)
+        except Exception as e:
+            print(f"[WARN] Pipeline de fuga no disponible, se usa preprocess_batch: {e}")
+            return None
+        if difference > PIPELINE_TOLERANCE:
+            print(f"[WARN] El pipeline de fuga difiere en {difference:.2e}, se usa preprocess_batch")
+            return None
+        return pipeline
+
     def preprocess_data(self, input_dict: dict):
         """
         Aquí replicamos EXACTAMENTE la lógica de tu función load_and_preprocess
         del Colab.
         """
-        # 1. Convertir dict a DataFrame
-        df = pd.DataFrame([input_dict])
+        return self.preprocess_batch([input_dict])
+
+    def preprocess_batch(self, input_dicts: list):
+        """
+        Misma lógica que preprocess_data pero sobre N clientes a la vez.
+        """
+        # 1. Convertir la lista de dicts a DataFrame
+        df = pd.DataFrame(input_dicts)
 
         # ---------------------------------------------------------
         # A. INGENIERÍA DE CARACTERÍSTICAS (Tus fórmulas matemáticas)
@@ -55,10 +113,10 @@ class ChurnService:
         # 2. Geography: get_dummies(drop_first=True)
         # Como drop_first=True eliminó la primera columna (alfabéticamente France),
         # solo necesitamos crear las columnas Germany y Spain.
-        input_geo = input_dict['Geography']
+        input_geo = df['Geography']
         
-        df['Geography_Germany'] = 1 if input_geo == 'Germany' else 0
-        df['Geography_Spain'] = 1 if input_geo == 'Spain' else 0
+        df['Geography_Germany'] = (input_geo == 'Germany').astype(int)
+        df['Geography_Spain'] = (input_geo == 'Spain').astype(int)
         
         # Eliminamos la columna original de texto 'Geography' ya que ya la procesamos
         if 'Geography' in df.columns:
@@ -81,31 +139,229 @@ class ChurnService:
         
         return df
 
+    def _non_finite_error(self, X_processed, rows, numbered: bool = True) -> str:
+        """Mensaje que nombra las features infinitas de cada fila (las diez primeras)"""
+        columns = self.pipeline.columnas
+        if not numbered:
+            return f"{NON_FINITE_ERROR}: {', '.join(columnas_infinitas(X_processed, columns, rows[0]))}"
+        detail = "; ".join(
+            f"fila {row}: {', '.join(columnas_infinitas(X_processed, columns, row))}" for row in rows[:10]
+        )
+        return f"{NON_FINITE_ERROR} ({detail})"
+
     def predict(self, input_data: dict):
+        return self.predict_batch([input_data])[0]
+
+    def predict_batch(self, input_list: list, raise_errors: bool = False):
+        """
+        Predice N clientes con una sola llamada al modelo.
+        Devuelve un resultado por cliente, en el mismo orden de entrada.
+
+        Si el lote falla, todos los clientes reciben el error y las filas con
+        features infinitas reciben el suyo; con `raise_errors` se lanza la
+        excepción (ValueError para las features infinitas), para que el
+        micro-batcher reintente fila a fila y solo falle la request culpable.
+        """
         if not self.model:
-            return {"error": "El modelo no está cargado."}
+            return [{"error": "El modelo no está cargado."} for _ in input_list]
+        if not input_list:
+            return []
         
         try:
             # Procesamos los datos (Fórmulas + Encoding + Scaling)
-            X_processed = self.preprocess_data(input_data)
+            with etapa("fuga", "features"):
+                if self.pipeline:
+                    # Una sola fila va por el camino escalar del pipeline
+                    X_processed = self.pipeline.transformar(input_list)
+                else:
+                    X_processed = self.preprocess_batch(input_list)
             
-            # Predicción
-            prediction = self.model.predict(X_processed)
-            probability = self.model.predict_proba(X_processed)
+            # Las filas con features infinitas llevan su propio error; el resto se puntúa
+            invalid = filas_infinitas(X_processed) if self.pipeline else []
+            errors = [self._non_finite_error(X_processed, [row], numbered=False) for row in invalid]
+            if len(invalid) and raise_errors:
+                raise ValueError(self._non_finite_error(X_processed, invalid, numbered=len(input_list) > 1))
+            if len(invalid):
+                valid = np.ones(len(input_list), dtype=bool)
+                valid[invalid] = False
+                X_processed = X_processed[valid]
             
-            result = int(prediction[0]) 
-            prob_churn = float(probability[0][1])
+            # Predicción: una sola pasada del modelo; la etiqueta sale del umbral
+            probabilities = np.empty(0)
+            if len(X_processed):
+                with etapa("fuga", "modelo"):
+                    probabilities = self.predictor.predict_proba(X_processed)[:, 1]
             
-            return {
-                "prediction": "Abandona (Churn)" if result == 1 else "Se Queda",
-                "churn_probability": round(prob_churn, 4),
-                "risk_level": "Alto" if prob_churn > 0.45 else "Bajo", # Usando tu umbral de 0.45
-                "is_churn": result
-            }
+                with etapa("fuga", "deriva"):
+                    DRIFT.observar(churn_probability=probabilities)
+            
+            results = []
+            with etapa("fuga", "salida"):
+                for probability in probabilities:
+                    prob_churn = float(probability)
+                    result = 1 if prob_churn > CHURN_THRESHOLD else 0
+                    
+                    results.append({
+                        "prediction": "Abandona (Churn)" if result == 1 else "Se Queda",
+                        "churn_probability": round(prob_churn, 4),
+                        "risk_level": "Alto" if result == 1 else "Bajo", # Usando tu umbral de 0.45
+                        "is_churn": result
+                    })
+            for position, error in zip(invalid, errors):
+                results.insert(position, {"error": error})
+            return results
             
         except Exception as e:
+            if raise_errors:
+                raise
             import traceback
             traceback.print_exc() # Esto te imprimirá el error exacto en la terminal
-            return {"error": str(e)}
+            return [{"error": str(e)} for _ in input_list]
+
+    def predict_columns(self, columns: dict) -> dict:
+        """
+        Predice un lote que llega en columnas (cuerpo Arrow o MessagePack ya
+        validado) y devuelve la salida también en columnas, con los mismos
+        valores que predict_batch.
+
+        Raises:
+            ValueError: Si alguna fila tiene features infinitas.
+            RuntimeError: Si el modelo no está cargado.
+        """
+        if not self.model:
+            raise RuntimeError("El modelo no está cargado.")
+
+        with etapa("fuga", "features"):
+            if self.pipeline:
+                X_processed = self.pipeline.lote_columnar(columns)[0]
+                invalid = filas_infinitas(X_processed)
+                if len(invalid):
+                    raise ValueError(self._non_finite_error(X_processed, invalid))
+            else:
+                X_processed = self.preprocess_batch(columns)
+
+        with etapa("fuga", "modelo"):
+            probabilities = self.predictor.predict_proba(X_processed)[:, 1]
+
+        with etapa("fuga", "deriva"):
+            DRIFT.observar(churn_probability=probabilities)
+
+        with etapa("fuga", "salida"):
+            is_churn = (probabilities > CHURN_THRESHOLD).astype(np.int64)
+            return {
+                "prediction": np.where(is_churn == 1, "Abandona (Churn)", "Se Queda"),
+                # round() de Python, igual que predict_batch (np.round redondea distinto algunos valores)
+                "churn_probability": np.fromiter(
+                    (round(p, 4) for p in probabilities.tolist()), dtype=float, count=len(probabilities)
+                ),
+                "risk_level": np.where(is_churn == 1, "Alto", "Bajo"),
+                "is_churn": is_churn,
+            }
+
+    def what_if(self, customer: dict, perturbations: dict, costs: dict = None) -> dict:
+        """
+        Superficie de probabilidad de fuga sobre todas las combinaciones de
+        `perturbations` ({campo: valores}) aplicadas a `customer`.
+
+        Las columnas de la grilla se arman con índices de numpy y pasan por el
+        pipeline por columnas, así que el cliente base y todos los escenarios
+        se puntúan en una sola llamada a predict_proba. El escenario más barato
+        es el de menor costo (suma de `costs` de los campos que cambian, 1 por
+        defecto) que queda en "Se Queda"; los empates se resuelven por el menor
+        cambio relativo y luego por la menor probabilidad.
+
+        Los escenarios con features infinitas no se puntúan: quedan en null en
+        la superficie y no compiten por el más barato.
+
+        Raises:
+            ValueError: Si la grilla supera BANKMIND_SIMULACION_MAX_FUGA escenarios
+                o el cliente base tiene features infinitas.
+            RuntimeError: Si el modelo no está cargado.
+        """
+        if not self.model:
+            raise RuntimeError("El modelo no está cargado.")
+        costs = costs or {}
+        fields = list(perturbations)
+        values = [np.asarray(perturbations[field]) for field in fields]
+        shape = tuple(len(v) for v in values)
+        # Enteros de Python: np.prod desborda int64 con grillas enormes
+        n = math.prod(shape)
+        max_scenarios = obtener_entero("SIMULACION_MAX", MAX_SCENARIOS, modelo="fuga")
+        if n > max_scenarios:
+            raise ValueError(f"La grilla tiene {n} escenarios; el máximo es {max_scenarios}")
+
+        with etapa("fuga", "simulacion"):
+            # Fila 0: cliente sin cambios; fila 1 + i: escenario i de la grilla (orden C)
+            grid = np.indices(shape).reshape(len(fields), n)
+            columns = {name: np.full(n + 1, value) for name, value in customer.items()}
+            for field, field_values, index in zip(fields, values, grid):
+                columns[field] = np.concatenate([[customer[field]], field_values[index]])
+
+        with etapa("fuga", "features"):
+            if self.pipeline:
+                X_processed = self.pipeline.lote_columnar(columns)[0]
+            else:
+                X_processed = self.preprocess_batch(columns)
+
+        valid = np.ones(n + 1, dtype=bool)
+        invalid = filas_infinitas(X_processed)
+        valid[invalid] = False
+        if not valid[0]:
+            raise ValueError(self._non_finite_error(X_processed, [0], numbered=False))
+
+        # Los escenarios son hipotéticos: no se registran en la deriva
+        with etapa("fuga", "modelo"):
+            probabilities = np.full(n + 1, np.nan)
+            probabilities[valid] = self.predictor.predict_proba(X_processed[valid])[:, 1]
+
+        with etapa("fuga", "salida"):
+            base_probability, scenarios = float(probabilities[0]), probabilities[1:]
+            # round() de Python, igual que predict_batch
+            surface = np.array(
+                [None if math.isnan(p) else round(p, 4) for p in scenarios.tolist()], dtype=object
+            ).reshape(shape).tolist()
+            cheapest = None
+            if base_probability > CHURN_THRESHOLD:
+                cost = np.zeros(n)
+                change = np.zeros(n)
+                for field, field_values, index in zip(fields, values, grid):
+                    base = customer[field]
+                    scenario = field_values[index]
+                    changed = scenario != base
+                    cost += costs.get(field, 1.0) * changed
+                    if field_values.dtype.kind in "if":
+                        change += np.abs(scenario - base) / max(abs(base), 1)
+                    else:
+                        change += changed
+                candidates = np.flatnonzero(scenarios <= CHURN_THRESHOLD)
+                if len(candidates):
+                    best = candidates[np.lexsort(
+                        (scenarios[candidates], change[candidates], cost[candidates])
+                    )[0]]
+                    cheapest = {
+                        "changes": {
+                            field: field_values[index[best]].item()
+                            for field, field_values, index in zip(fields, values, grid)
+                            if field_values[index[best]] != customer[field]
+                        },
+                        "churn_probability": round(float(scenarios[best]), 4),
+                        "cost": float(cost[best]),
+                    }
+            return {
+                "base_churn_probability": round(base_probability, 4),
+                "threshold": CHURN_THRESHOLD,
+                "fields": fields,
+                "values": {field: v.tolist() for field, v in zip(fields, values)},
+                "scenarios": n,
+                "churn_probability": surface,
+                "cheapest": cheapest,
+            }
+
+def warm_up(service: ChurnService):
+    """Inferencia de ejemplo antes de activar una versión nueva"""
+    result = service.predict(EJEMPLOS["fuga"])
+    if "error" in result:
+        raise RuntimeError(result["error"])
 
-churn_service = ChurnService()
\ No newline at end of file
+# El servicio activo se obtiene con registro.obtener("fuga"); se carga en el arranque de la aplicación
+registro.registrar("fuga", ChurnService, MODEL_PATH, calentar=warm_up)
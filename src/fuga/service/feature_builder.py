@@ -0,0 +1,40 @@
+import operator
+
+from core.pipeline import Codificada, Derivada, Mapeo, Pipeline
+
+# Mismo mapeo de género que preprocess_data; valores fuera del mapa quedan como NaN
+GENDER_MAP = {'Male': 1, 'Female': 0, 'Hombre': 1, 'Mujer': 0}
+
+# Columnas numéricas que se copian tal cual desde el input
+RAW_COLUMNS = [
+    'CreditScore', 'Age', 'Tenure', 'Balance', 'NumOfProducts',
+    'HasCrCard', 'IsActiveMember', 'EstimatedSalary'
+]
+
+
+def churn_pipeline(feature_names, scaler=None) -> Pipeline:
+    """
+    Declaración de ChurnService.preprocess_data: fórmulas, encoding, orden de
+    feature_names.pkl y StandardScaler. Las columnas que no sabemos calcular
+    quedan en 0, igual que el reindex(fill_value=0) del preprocesamiento original.
+    """
+    return Pipeline(
+        "fuga", feature_names,
+        entradas=RAW_COLUMNS,
+        textos=['Gender', 'Geography'],
+        # A. Ingeniería de características
+        derivadas=[
+            Derivada('TenureByAge', operator.truediv, ('Tenure', 'Age')),
+            Derivada('BalanceSalaryRatio', operator.truediv, ('Balance', 'EstimatedSalary')),
+            Derivada('CreditScoreGivenAge', operator.truediv, ('CreditScore', 'Age')),
+        ],
+        # B. Codificación: LabelEncoder de Gender y get_dummies(drop_first=True) de Geography
+        codificadas=[
+            Codificada('Gender', Mapeo(GENDER_MAP)),
+            Codificada('Geography_Germany', Mapeo({'Germany': 1}, defecto=0), fuente='Geography'),
+            Codificada('Geography_Spain', Mapeo({'Spain': 1}, defecto=0), fuente='Geography'),
+        ],
+        # C. Escalado
+        escalado=scaler,
+        por_clave=True,
+    )
@@ -1,33 +1,54 @@
 # src/morosidad/models_files/loader.py
 import os
+import threading
 import joblib
+import pandas as pd
+
+from core.arboles import compilar_si_corresponde
+from core.ejemplos import EJEMPLOS
+from core.registro import ModeloNoDisponibleError, registro
 
 # Ruta al archivo del modelo
 _MODELO_PATH = os.path.join(os.path.dirname(__file__), "model.pkl")
 
-# Variable global para el modelo (singleton)
-_modelo = None
+
+def _calentar(modelo) -> None:
+    """Inferencia de ejemplo antes de activar una versión nueva del modelo."""
+    modelo.predict_proba(pd.DataFrame([EJEMPLOS["morosidad"]]))
+
+
+def _cargar(ruta: str):
+    """Carga el .pkl y, si BANKMIND_ARBOLES_COMPILADOS_MOROSIDAD está activo, lo compila."""
+    return compilar_si_corresponde("morosidad", joblib.load(ruta))
+
+
+# El modelo vive en el registro central, que permite recargarlo en caliente
+registro.registrar("morosidad", _cargar, _MODELO_PATH, calentar=_calentar)
+
+# Evita cargas duplicadas si llegan varias requests antes de la primera carga
+_lock_carga = threading.Lock()
 
 
 def cargar_modelo():
     """
     Carga el modelo de morosidad desde el archivo .pkl.
-    El modelo se carga una sola vez (singleton pattern).
+    El modelo se carga una sola vez; las versiones siguientes se
+    activan desde el registro de modelos.
     
     Returns:
         El modelo cargado, o None si no existe el archivo.
     """
-    global _modelo
-    
-    if _modelo is None:
-        if os.path.exists(_MODELO_PATH):
-            _modelo = joblib.load(_MODELO_PATH)
-            print(f"[OK] Modelo de morosidad cargado desde: {_MODELO_PATH}")
-        else:
-            print(f"[WARN] Archivo de modelo no encontrado: {_MODELO_PATH}")
-            print("   Por favor, agrega tu archivo .pkl en la carpeta models_files/")
+    with _lock_carga:
+        if registro.version("morosidad") is None:
+            if os.path.exists(_MODELO_PATH):
+                registro.cargar("morosidad")
+                print(f"[OK] Modelo de morosidad cargado desde: {_MODELO_PATH}")
+            else:
+                print(f"[WARN] Archivo de modelo no encontrado: {_MODELO_PATH}")
+                print("   Por favor, agrega tu archivo .pkl en la carpeta models_files/")
+                return None
     
-    return _modelo
+    return registro.obtener("morosidad")
 
 
 def obtener_modelo():
@@ -41,6 +62,10 @@ def obtener_modelo():
     Raises:
         RuntimeError: Si el modelo no está disponible.
     """
+    try:
+        return registro.obtener("morosidad")
+    except ModeloNoDisponibleError:
+        pass
     modelo = cargar_modelo()
     if modelo is None:
         raise RuntimeError(
@@ -1,8 +1,24 @@
 # src/morosidad/router.py
-from fastapi import APIRouter, HTTPException
+import json
+import shutil
+import tempfile
+from typing import Iterator, List, Optional
+
+from fastapi import APIRouter, Depends, File, HTTPException, Query, Request, UploadFile
+from fastapi.responses import StreamingResponse
 
 from morosidad.schema import MorosidadRequest, MorosidadResponse
-from morosidad.service import predecir_morosidad
+from morosidad.service import (
+    FORMATOS, detectar_formato, predecir_morosidad_columnas, predecir_morosidad_lote, puntuar_stream,
+    puntuar_stream_incremental,
+)
+from core.admision import admision
+from core.batching import registrar_batcher
+from core.cache import registrar_cache
+from core.columnar import LoteColumnar, cuerpo_openapi, leer_lote, respuesta_columnar
+from core.ejecutor import ColaLlenaError, obtener_ejecutor
+from core.respuestas import respuesta_json, respuesta_lote, respuesta_rapida
+from core.trabajos import registrar_trabajo
 
 
 router = APIRouter(
@@ -10,14 +26,23 @@ router = APIRouter(
     tags=["Morosidad"]
 )
 
+# Las requests concurrentes se agrupan en una sola llamada al modelo
+morosidad_batcher = registrar_batcher("morosidad", predecir_morosidad_lote)
+morosidad_cache = registrar_cache("morosidad")
+# Carteras completas como trabajos asíncronos (/trabajos/morosidad), con el mismo puntuado por bloques
+registrar_trabajo("morosidad", puntuar_stream, FORMATOS)
+# Re-puntuado diario: solo los clientes nuevos o con features distintas a la corrida anterior
+registrar_trabajo("morosidad_incremental", puntuar_stream_incremental, FORMATOS)
+
 
 @router.post(
     "/predict",
     response_model=MorosidadResponse,
     summary="Predecir morosidad",
-    description="Predice la probabilidad de incumplimiento de pago de tarjeta de crédito."
+    description="Predice la probabilidad de incumplimiento de pago de tarjeta de crédito.",
+    dependencies=[Depends(admision("morosidad"))]
 )
-def predict(request: MorosidadRequest) -> MorosidadResponse:
+async def predict(request: MorosidadRequest) -> MorosidadResponse:
     """
     Realiza una predicción de morosidad basada en los datos del cliente.
     
@@ -25,8 +50,86 @@ def predict(request: MorosidadRequest) -> MorosidadResponse:
     - **probabilidad_default**: Probabilidad de incumplimiento (0.0 - 1.0)
     """
     try:
-        return predecir_morosidad(request)
-    except RuntimeError as e:
+        resultado = await morosidad_cache.obtener(request, lambda: morosidad_batcher.enviar(request))
+        return respuesta_json(resultado) if respuesta_rapida("morosidad") else resultado
+    except (RuntimeError, ColaLlenaError) as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error en la predicción: {str(e)}")
+
+
+@router.post(
+    "/predict/lote",
+    response_model=List[MorosidadResponse],
+    summary="Predecir morosidad de un lote",
+    description="Predice N clientes con una sola llamada al modelo. Acepta JSON o columnas en Arrow IPC / MessagePack.",
+    dependencies=[Depends(admision("morosidad_lote"))],
+    openapi_extra=cuerpo_openapi(MorosidadRequest)
+)
+async def predict_lote(request: Request):
+    """
+    Predice un lote de clientes; los resultados se devuelven en el mismo orden de entrada.
+    
+    Si el lote llega en columnas (Arrow IPC o MessagePack) la respuesta usa el
+    mismo formato, con las columnas **default** y **probabilidad_default**.
+    """
+    lote = await leer_lote(request, MorosidadRequest)
+    try:
+        if isinstance(lote, LoteColumnar):
+            columnas = await obtener_ejecutor("morosidad").ejecutar(predecir_morosidad_columnas, lote.columnas)
+            return respuesta_columnar(columnas, lote.formato)
+        resultados = await obtener_ejecutor("morosidad").ejecutar(predecir_morosidad_lote, lote)
+        return respuesta_lote("morosidad", resultados) if respuesta_rapida("morosidad") else resultados
+    except (RuntimeError, ColaLlenaError) as e:
         raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error en la predicción: {str(e)}")
+
+
+def _cerrar_al_terminar(lineas: Iterator[str], archivo) -> Iterator[str]:
+    try:
+        yield from lineas
+    except Exception as e:
+        # El 200 ya se envió: el error va como última línea en lugar de cortar la respuesta
+        print(f"[WARN] Streaming de morosidad interrumpido: {type(e).__name__}: {e}")
+        yield json.dumps({"error": f"Procesamiento interrumpido: {type(e).__name__}: {e}"}, ensure_ascii=False) + "\n"
+    finally:
+        archivo.close()
+
+
+@router.post(
+    "/predict/stream",
+    summary="Puntuar cartera completa en streaming",
+    description="Puntúa un archivo CSV o NDJSON de clientes por bloques y devuelve los resultados como NDJSON.",
+    response_class=StreamingResponse
+)
+def predict_stream(
+    archivo: UploadFile = File(..., description="Archivo CSV o NDJSON con las 24 features por fila"),
+    formato: Optional[str] = Query(None, description="csv o ndjson; por defecto se deduce del archivo"),
+    columna_id: Optional[str] = Query(None, description="Columna a devolver como identificador de cada fila"),
+    incremental: bool = Query(False, description="Puntuar solo los clientes nuevos o con cambios (requiere columna_id)")
+):
+    """
+    Puntúa una cartera completa sin cargarla en memoria.
+    
+    Cada línea de la respuesta corresponde a una fila del archivo, en el mismo orden:
+    - **fila**: Posición de la fila (desde 0)
+    - **default** y **probabilidad_default**: Resultado si la fila es válida
+    - **error**: Columnas con valores inválidos si la fila no lo es
+    - **recalculada**: En modo incremental, False si se reutilizó el puntaje anterior
+    """
+    try:
+        formato = formato or detectar_formato(archivo.filename, archivo.content_type)
+        if formato not in FORMATOS:
+            raise ValueError(f"Formato no soportado: {formato}")
+        # FastAPI cierra el UploadFile al terminar el endpoint, antes de que se
+        # consuma el stream: trabajamos sobre una copia propia (en disco si es grande)
+        copia = tempfile.SpooledTemporaryFile(max_size=1024 * 1024)
+        shutil.copyfileobj(archivo.file, copia)
+        copia.seek(0)
+        resultados = _cerrar_al_terminar(puntuar_stream(copia, formato, columna_id, incremental=incremental), copia)
+    except RuntimeError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    return StreamingResponse(resultados, media_type="application/x-ndjson")
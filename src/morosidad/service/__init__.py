@@ -1,4 +1,5 @@
 # src/morosidad/service/__init__.py
-from .morosidad_service import predecir_morosidad
+from .morosidad_service import predecir_morosidad, predecir_morosidad_columnas, predecir_morosidad_lote
+from .streaming_service import FORMATOS, detectar_formato, puntuar_stream, puntuar_stream_incremental
 
-__all__ = ["predecir_morosidad"]
+__all__ = ["predecir_morosidad", "predecir_morosidad_lote", "predecir_morosidad_columnas", "FORMATOS", "detectar_formato", "puntuar_stream", "puntuar_stream_incremental"]
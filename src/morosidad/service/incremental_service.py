@@ -0,0 +1,219 @@
+# src/morosidad/service/incremental_service.py
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from core.config import obtener_texto
+from core.metricas import metricas
+from morosidad.service.morosidad_service import COLUMNAS_MODELO
+
+VERSION_INDICE = 1
+
+# Sin fcntl (Windows) el lock es un archivo creado en exclusiva; uno más viejo
+# que esto se considera abandonado por un proceso que terminó sin borrarlo
+LOCK_ABANDONADO_S = 300.0
+
+# Huella del orden de columnas: si cambia, las huellas guardadas dejan de ser comparables
+ESQUEMA = int(pd.util.hash_pandas_object(pd.Series(["|".join(COLUMNAS_MODELO)]), index=False).iloc[0])
+
+
+def ruta_indice() -> str:
+    """Índice incremental en disco, configurable con BANKMIND_INCREMENTAL_INDICE_MOROSIDAD."""
+    return obtener_texto(
+        "INCREMENTAL_INDICE",
+        os.path.join(os.path.dirname(os.path.dirname(__file__)), "models_files", "indice_incremental.npz"),
+        modelo="morosidad",
+    )
+
+
+def hash_ids(ids) -> np.ndarray:
+    """
+    Hash de 64 bits de cada id de cliente. Se hashea como texto para que
+    "123" (CSV) y 123 (NDJSON) sean el mismo cliente.
+    """
+    return pd.util.hash_pandas_object(pd.Series(ids).astype(str), index=False).to_numpy()
+
+
+def huellas_filas(X: pd.DataFrame) -> np.ndarray:
+    """Hash de 64 bits de cada fila de features (en el orden de COLUMNAS_MODELO)"""
+    return pd.util.hash_pandas_object(X.astype(float), index=False).to_numpy()
+
+
+@contextmanager
+def _lock_archivo(ruta: str) -> Iterator[None]:
+    """Lock exclusivo entre procesos sobre `ruta`: flock si hay fcntl, si no un archivo O_EXCL"""
+    try:
+        import fcntl
+    except ImportError:
+        fcntl = None
+    if fcntl is not None:
+        with open(ruta, "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+        return
+
+    while True:
+        try:
+            descriptor = os.open(ruta, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            break
+        except FileExistsError:
+            try:
+                if time.time() - os.path.getmtime(ruta) > LOCK_ABANDONADO_S:
+                    os.remove(ruta)
+                    continue
+            except OSError:
+                continue
+            time.sleep(0.05)
+    try:
+        yield
+    finally:
+        os.close(descriptor)
+        os.remove(ruta)
+
+
+class IndiceIncremental:
+    """
+    Índice id de cliente → (huella de sus features, último puntaje) de una
+    versión del modelo.
+
+    Se guarda en cuatro arreglos ordenados por hash de id (~25 bytes por
+    cliente), así que buscar un bloque completo es un `searchsorted`. Un
+    índice de otra versión del modelo (o de otro orden de columnas) se
+    descarta al cargarlo: todos los clientes se vuelven a puntuar.
+    """
+
+    def __init__(self, version: str):
+        self.version = version
+        self.ids = np.empty(0, dtype=np.uint64)
+        self.huellas = np.empty(0, dtype=np.uint64)
+        self.probabilidades = np.empty(0, dtype=float)
+        self.defaults = np.empty(0, dtype=bool)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def buscar(self, ids: np.ndarray, huellas: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Returns:
+            Tupla (vigentes, defaults, probabilidades): máscara de las filas
+            cuyo id está en el índice con la misma huella y, para ellas, el
+            puntaje guardado (las demás posiciones no se usan).
+        """
+        if len(self.ids) == 0:
+            return np.zeros(len(ids), dtype=bool), np.zeros(len(ids), dtype=bool), np.zeros(len(ids))
+        posiciones = np.minimum(np.searchsorted(self.ids, ids), len(self.ids) - 1)
+        vigentes = (self.ids[posiciones] == ids) & (self.huellas[posiciones] == huellas)
+        return vigentes, self.defaults[posiciones], self.probabilidades[posiciones]
+
+    def actualizar(self, ids: np.ndarray, huellas: np.ndarray, defaults: np.ndarray,
+                   probabilidades: np.ndarray) -> None:
+        """Agrega o reemplaza filas; con ids repetidos queda la última aparición"""
+        if len(ids) == 0:
+            return
+        todos = np.concatenate([self.ids, ids])
+        orden = np.argsort(todos, kind="stable")
+        ordenados = todos[orden]
+        ultimos = np.append(ordenados[1:] != ordenados[:-1], True)
+        seleccion = orden[ultimos]
+        self.ids = ordenados[ultimos]
+        self.huellas = np.concatenate([self.huellas, huellas])[seleccion]
+        self.defaults = np.concatenate([self.defaults, defaults])[seleccion]
+        self.probabilidades = np.concatenate([self.probabilidades, probabilidades])[seleccion]
+
+    def guardar(self, ruta: str) -> None:
+        """Escribe el índice de forma atómica (archivo temporal + rename)"""
+        os.makedirs(os.path.dirname(os.path.abspath(ruta)), exist_ok=True)
+        temporal = f"{ruta}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temporal, "wb") as archivo:
+            np.savez(
+                archivo,
+                formato=np.array(VERSION_INDICE),
+                esquema=np.array(ESQUEMA, dtype=np.uint64),
+                version=np.array(self.version),
+                ids=self.ids,
+                huellas=self.huellas,
+                defaults=self.defaults,
+                probabilidades=self.probabilidades,
+            )
+        os.replace(temporal, ruta)
+
+    @classmethod
+    def cargar(cls, ruta: str, version: str) -> "IndiceIncremental":
+        """Índice guardado para `version`, o uno vacío si no existe o es de otra versión"""
+        indice = cls(version)
+        if not os.path.exists(ruta):
+            return indice
+        try:
+            with np.load(ruta) as datos:
+                if (int(datos["formato"]) != VERSION_INDICE or int(datos["esquema"]) != ESQUEMA
+                        or str(datos["version"]) != version):
+                    return indice
+                indice.ids = datos["ids"]
+                indice.huellas = datos["huellas"]
+                indice.defaults = datos["defaults"]
+                indice.probabilidades = datos["probabilidades"]
+        except Exception as e:
+            print(f"[WARN] No se pudo leer el índice incremental {ruta}: {e}. Se puntúa todo.")
+        return indice
+
+
+class EjecucionIncremental:
+    """
+    Una corrida incremental: consulta el índice tal como estaba al empezar y
+    acumula los puntajes nuevos. `guardar` los fusiona con el índice en disco
+    bajo un lock de archivo, así que corridas simultáneas (hilos, workers o
+    procesos) no se pisan.
+    """
+
+    def __init__(self, version: str, ruta: Optional[str] = None):
+        self.version = version
+        self.ruta = ruta or ruta_indice()
+        self.indice = IndiceIncremental.cargar(self.ruta, version)
+        # Puntajes nuevos por bloque; se ordenan una sola vez al guardar
+        self._nuevos = []
+        self.reutilizadas = 0
+        self.recalculadas = 0
+
+    def buscar(self, ids, X: pd.DataFrame, validas: np.ndarray):
+        """
+        Returns:
+            Tupla (ids, huellas, vigentes, defaults, probabilidades) del bloque;
+            `vigentes` solo marca filas válidas.
+        """
+        ids, huellas = hash_ids(ids), huellas_filas(X)
+        vigentes, defaults, probabilidades = self.indice.buscar(ids, huellas)
+        vigentes &= validas
+        return ids, huellas, vigentes, defaults, probabilidades
+
+    def registrar(self, ids: np.ndarray, huellas: np.ndarray, defaults: np.ndarray,
+                  probabilidades: np.ndarray, reutilizadas: int) -> None:
+        """Anota los puntajes recalculados del bloque y cuántas filas se reutilizaron"""
+        if len(ids):
+            self._nuevos.append((ids, huellas, defaults, probabilidades))
+        self.reutilizadas += reutilizadas
+        self.recalculadas += len(ids)
+
+    def guardar(self) -> None:
+        for resultado, cantidad in (("reutilizada", self.reutilizadas), ("recalculada", self.recalculadas)):
+            metricas.contador(
+                "bankmind_incremental_filas_total", "Filas de corridas incrementales por resultado",
+                modelo="morosidad", resultado=resultado
+            ).incrementar(cantidad)
+        if not self._nuevos:
+            return
+        nuevos = [np.concatenate(arreglos) for arreglos in zip(*self._nuevos)]
+        self._nuevos = []
+        os.makedirs(os.path.dirname(os.path.abspath(self.ruta)), exist_ok=True)
+        with _lock_archivo(f"{self.ruta}.lock"):
+            # Se relee por si otra corrida guardó mientras tanto
+            indice = IndiceIncremental.cargar(self.ruta, self.version)
+            indice.actualizar(*nuevos)
+            indice.guardar(self.ruta)
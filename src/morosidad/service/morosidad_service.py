@@ -1,6 +1,13 @@
 # src/morosidad/service/morosidad_service.py
+from typing import Dict, List, Tuple
+
+import numpy as np
 import pandas as pd
 
+from core.deriva import registrar_deriva
+from core.metricas import etapa
+from core.pipeline import Pipeline
+from core.respuestas import construir
 from morosidad.models_files import obtener_modelo
 from morosidad.schema import MorosidadRequest, MorosidadResponse
 
@@ -14,6 +21,12 @@ COLUMNAS_MODELO = [
     'UTILIZATION_RATE'
 ]
 
+# Las 24 features llegan ya calculadas: el pipeline solo fija su orden
+PIPELINE = Pipeline("morosidad", COLUMNAS_MODELO, entradas=COLUMNAS_MODELO).compilar()
+
+# Deriva de la probabilidad de default (lotes, columnas y archivos pasan por `puntuar`)
+DERIVA = registrar_deriva("morosidad", puntajes=("probabilidad_default",))
+
 
 def predecir_morosidad(request: MorosidadRequest) -> MorosidadResponse:
     """
@@ -25,21 +38,84 @@ def predecir_morosidad(request: MorosidadRequest) -> MorosidadResponse:
     Returns:
         MorosidadResponse con el resultado de la predicción.
     """
+    return predecir_morosidad_lote([request])[0]
+
+
+def predecir_morosidad_lote(requests: List[MorosidadRequest]) -> List[MorosidadResponse]:
+    """
+    Realiza la predicción de morosidad de varios clientes con una sola
+    llamada al modelo.
+    
+    Args:
+        requests: Lista de datos de entrada con las 24 features.
+    
+    Returns:
+        Lista de MorosidadResponse, en el mismo orden de entrada.
+    """
     # Obtener el modelo
     modelo = obtener_modelo()
     
-    # Convertir request a diccionario y luego a DataFrame
-    datos = request.model_dump()
-    df = pd.DataFrame([datos], columns=COLUMNAS_MODELO)
+    if not requests:
+        return []
+    
+    # Matriz de features en el orden del modelo; una sola request va por el camino escalar.
+    # El DataFrame solo envuelve la matriz para conservar los nombres de columna.
+    with etapa("morosidad", "features"):
+        df = pd.DataFrame(PIPELINE.transformar(requests), columns=COLUMNAS_MODELO, copy=False)
     
     # Realizar predicción
-    prediccion = modelo.predict(df)[0]
-    probabilidades = modelo.predict_proba(df)[0]
+    defaults, probabilidades = puntuar(modelo, df)
     
-    # La probabilidad de default es la probabilidad de clase 1
-    probabilidad_default = float(probabilidades[1])
+    with etapa("morosidad", "salida"):
+        return [
+            construir(
+                "morosidad", MorosidadResponse,
+                default=bool(default),
+                probabilidad_default=float(probabilidad)
+            )
+            for default, probabilidad in zip(defaults, probabilidades)
+        ]
+
+
+def predecir_morosidad_columnas(columnas: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """
+    Predice un lote que llega en columnas (cuerpo Arrow o MessagePack ya validado).
     
-    return MorosidadResponse(
-        default=bool(prediccion == 1),
-        probabilidad_default=probabilidad_default
-    )
+    Args:
+        columnas: Arreglo por cada una de las 24 features.
+    
+    Returns:
+        Columnas `default` y `probabilidad_default`, en el orden de entrada.
+    """
+    modelo = obtener_modelo()
+    
+    with etapa("morosidad", "features"):
+        X, _ = PIPELINE.lote_columnar(columnas)
+        df = pd.DataFrame(X, columns=COLUMNAS_MODELO, copy=False)
+    
+    defaults, probabilidades = puntuar(modelo, df)
+    return {"default": defaults, "probabilidad_default": probabilidades}
+
+
+def puntuar(modelo, X) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Puntúa un bloque de clientes con una sola llamada a predict_proba.
+    
+    Args:
+        modelo: Clasificador binario de morosidad.
+        X: Features en el orden de COLUMNAS_MODELO.
+    
+    Returns:
+        Tupla (default, probabilidad_default). `default` coincide con
+        `modelo.predict`: la clase 1 gana cuando su probabilidad supera a la de la clase 0.
+    """
+    with etapa("morosidad", "modelo"):
+        probabilidades = modelo.predict_proba(X)
+    clases = list(getattr(modelo, "classes_", [0, 1]))
+    # La probabilidad de default es la probabilidad de clase 1
+    indice_default = clases.index(1) if 1 in clases else 1
+    probabilidad_default = probabilidades[:, indice_default]
+    probabilidad_resto = probabilidades[:, 1 - indice_default]
+    with etapa("morosidad", "deriva"):
+        DERIVA.observar(probabilidad_default=probabilidad_default)
+    return probabilidad_default > probabilidad_resto, probabilidad_default
@@ -0,0 +1,286 @@
+# src/morosidad/service/streaming_service.py
+import csv
+import io
+import itertools
+import json
+from typing import IO, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from core.config import obtener_entero, obtener_texto
+from core.registro import registro
+from morosidad.models_files import obtener_modelo
+from morosidad.schema import MorosidadRequest
+from morosidad.service.incremental_service import EjecucionIncremental
+from morosidad.service.morosidad_service import COLUMNAS_MODELO, puntuar
+
+
+# Filas por bloque; acota la memoria sin importar el tamaño del archivo
+TAMANO_BLOQUE_DEFECTO = 5000
+
+FORMATOS = ("csv", "ndjson")
+
+# Columna de id de cliente de los trabajos incrementales
+COLUMNA_ID_INCREMENTAL_DEFECTO = "id_cliente"
+
+# Columnas que el schema declara como enteras
+COLUMNAS_ENTERAS = [
+    nombre for nombre, campo in MorosidadRequest.model_fields.items()
+    if campo.annotation is int
+]
+
+
+def tamano_bloque() -> int:
+    """Filas por bloque, configurable con BANKMIND_STREAM_BLOQUE_MOROSIDAD."""
+    return obtener_entero("STREAM_BLOQUE", TAMANO_BLOQUE_DEFECTO, modelo="morosidad")
+
+
+def columna_id_incremental() -> str:
+    """Columna de id de los trabajos incrementales, configurable con BANKMIND_INCREMENTAL_ID_MOROSIDAD."""
+    return obtener_texto("INCREMENTAL_ID", COLUMNA_ID_INCREMENTAL_DEFECTO, modelo="morosidad")
+
+
+def detectar_formato(nombre_archivo: Optional[str], content_type: Optional[str]) -> str:
+    """
+    Deduce el formato del archivo subido a partir de su extensión o content-type.
+    
+    Raises:
+        ValueError: Si no se puede determinar el formato.
+    """
+    nombre = (nombre_archivo or "").lower()
+    tipo = (content_type or "").lower()
+    if nombre.endswith(".csv") or "csv" in tipo:
+        return "csv"
+    if nombre.endswith((".ndjson", ".jsonl")) or "ndjson" in tipo or "jsonl" in tipo:
+        return "ndjson"
+    raise ValueError("No se pudo determinar el formato del archivo; indique formato=csv o formato=ndjson")
+
+
+def _bloques_csv(archivo: IO, tamano: int) -> Iterator[Tuple[pd.DataFrame, Dict[int, str]]]:
+    texto = archivo if isinstance(archivo, io.TextIOBase) else io.TextIOWrapper(archivo, encoding="utf-8-sig", newline="")
+    try:
+        lector = csv.reader(texto)
+        encabezado = next(lector, None)
+        if encabezado is None:
+            return
+        # Columnas repetidas como en pandas.read_csv: A, A.1, A.2...
+        vistos: Dict[str, int] = {}
+        for i, nombre in enumerate(encabezado):
+            if nombre in vistos:
+                vistos[nombre] += 1
+                encabezado[i] = f"{nombre}.{vistos[nombre]}"
+            else:
+                vistos[nombre] = 0
+        filas: List[List[str]] = []
+        errores: Dict[int, str] = {}
+        for campos in lector:
+            if not campos:
+                continue
+            if len(campos) != len(encabezado):
+                # La fila se conserva vacía para no correr la numeración
+                errores[len(filas)] = f"Se esperaban {len(encabezado)} campos y la línea tiene {len(campos)}"
+                campos = [""] * len(encabezado)
+            filas.append(campos)
+            if len(filas) == tamano:
+                yield pd.DataFrame(filas, columns=encabezado), errores
+                filas, errores = [], {}
+        if filas:
+            yield pd.DataFrame(filas, columns=encabezado), errores
+    finally:
+        # Sin cerrar el archivo de origen, que es de quien llamó
+        if texto is not archivo:
+            texto.detach()
+
+
+def _bloques_ndjson(archivo: IO, tamano: int) -> Iterator[Tuple[pd.DataFrame, Dict[int, str]]]:
+    filas: List[dict] = []
+    errores: Dict[int, str] = {}
+    for linea in archivo:
+        if not linea.strip():
+            continue
+        try:
+            fila = json.loads(linea)
+            if not isinstance(fila, dict):
+                raise ValueError("la línea no es un objeto JSON")
+        except ValueError as e:
+            errores[len(filas)] = f"Línea NDJSON inválida: {e}"
+            fila = {}
+        filas.append(fila)
+        if len(filas) == tamano:
+            yield pd.DataFrame(filas, index=range(len(filas)), dtype=object), errores
+            filas, errores = [], {}
+    if filas:
+        yield pd.DataFrame(filas, index=range(len(filas)), dtype=object), errores
+
+
+def leer_bloques(archivo: IO, formato: str, tamano: int) -> Iterator[Tuple[pd.DataFrame, Dict[int, str]]]:
+    """
+    Lee el archivo en bloques de `tamano` filas sin cargarlo completo en memoria.
+    Los valores se leen como texto (CSV) o tal cual vienen (NDJSON) y se validan
+    luego columna por columna.
+
+    Returns:
+        Iterador de tuplas (bloque, errores): las líneas que no se pudieron leer
+        (JSON inválido, CSV con otra cantidad de campos) quedan como filas vacías
+        del bloque y su mensaje en `errores`, por posición dentro del bloque.
+    """
+    if formato == "csv":
+        return _bloques_csv(archivo, tamano)
+    if formato == "ndjson":
+        return _bloques_ndjson(archivo, tamano)
+    raise ValueError(f"Formato no soportado: {formato}")
+
+
+def verificar_columnas(bloque: pd.DataFrame, columna_id: Optional[str] = None) -> None:
+    """
+    Raises:
+        ValueError: Si faltan columnas requeridas por el modelo.
+    """
+    requeridas = COLUMNAS_MODELO + ([columna_id] if columna_id and columna_id not in COLUMNAS_MODELO else [])
+    faltantes = [columna for columna in requeridas if columna not in bloque.columns]
+    if faltantes:
+        raise ValueError(f"Faltan columnas requeridas: {', '.join(faltantes)}")
+
+
+def validar_bloque(bloque: pd.DataFrame):
+    """
+    Valida un bloque columna por columna contra el schema de MorosidadRequest.
+    
+    Returns:
+        Tupla (X, validas, errores): X con las features en orden de COLUMNAS_MODELO,
+        máscara de filas válidas y, por fila inválida, las columnas con error.
+    """
+    X = pd.DataFrame(index=bloque.index)
+    invalidas = {}
+    for columna in COLUMNAS_MODELO:
+        valores = pd.to_numeric(bloque[columna], errors="coerce")
+        error = valores.isna() | ~np.isfinite(valores.astype(float))
+        if columna in COLUMNAS_ENTERAS:
+            error |= valores.notna() & (valores != np.floor(valores))
+        if error.any():
+            invalidas[columna] = error.to_numpy()
+        X[columna] = valores.astype(float)
+
+    validas = np.ones(len(bloque), dtype=bool)
+    for error in invalidas.values():
+        validas &= ~error
+
+    errores: Dict[int, list] = {}
+    if not validas.all():
+        for posicion in np.flatnonzero(~validas):
+            errores[int(posicion)] = [columna for columna, error in invalidas.items() if error[posicion]]
+    return X[COLUMNAS_MODELO], validas, errores
+
+
+def _ids(bloque: pd.DataFrame, columna_id: Optional[str]) -> Optional[list]:
+    if not columna_id or columna_id not in bloque.columns:
+        return None
+    ids = bloque[columna_id].astype(object)
+    return ids.where(ids.notna(), None).tolist()
+
+
+def _generar(bloques: Iterator[Tuple[pd.DataFrame, Dict[int, str]]], columna_id: Optional[str],
+             incremental: bool = False) -> Iterator[str]:
+    modelo = obtener_modelo()
+    ejecucion = None
+    if incremental:
+        # Modelo y versión de la misma carga, aunque haya una recarga durante la corrida
+        activa = registro.version("morosidad")
+        modelo = activa.artefacto
+        ejecucion = EjecucionIncremental(activa.version)
+    fila_inicial = 0
+    try:
+        for bloque, errores_lectura in bloques:
+            ids_fila = _ids(bloque, columna_id)
+            try:
+                verificar_columnas(bloque, columna_id)
+            except ValueError as e:
+                # Un bloque NDJSON posterior sin alguna columna: error en cada fila, sin cortar el stream
+                lineas = []
+                for posicion in range(len(bloque)):
+                    resultado = {"fila": fila_inicial + posicion}
+                    if ids_fila is not None:
+                        resultado["id"] = ids_fila[posicion]
+                    resultado["error"] = errores_lectura.get(posicion, str(e))
+                    lineas.append(json.dumps(resultado, ensure_ascii=False))
+                fila_inicial += len(bloque)
+                yield "\n".join(lineas) + "\n"
+                continue
+
+            X, validas, errores = validar_bloque(bloque)
+
+            defaults = np.zeros(len(bloque), dtype=bool)
+            probabilidades = np.zeros(len(bloque))
+            a_puntuar = validas
+            if ejecucion is not None:
+                # Clientes con las mismas features que en la corrida anterior: se reutiliza el puntaje
+                ids, huellas, vigentes, defaults_previos, probabilidades_previas = ejecucion.buscar(
+                    bloque[columna_id], X, validas)
+                defaults[vigentes] = defaults_previos[vigentes]
+                probabilidades[vigentes] = probabilidades_previas[vigentes]
+                a_puntuar = validas & ~vigentes
+            if a_puntuar.any():
+                # Una sola llamada vectorizada por bloque
+                defaults[a_puntuar], probabilidades[a_puntuar] = puntuar(modelo, X[a_puntuar])
+            if ejecucion is not None:
+                ejecucion.registrar(ids[a_puntuar], huellas[a_puntuar], defaults[a_puntuar],
+                                    probabilidades[a_puntuar], int(vigentes.sum()))
+
+            lineas = []
+            for posicion in range(len(bloque)):
+                resultado = {"fila": fila_inicial + posicion}
+                if ids_fila is not None:
+                    resultado["id"] = ids_fila[posicion]
+                if posicion in errores_lectura:
+                    resultado["error"] = errores_lectura[posicion]
+                elif validas[posicion]:
+                    resultado["default"] = bool(defaults[posicion])
+                    resultado["probabilidad_default"] = float(probabilidades[posicion])
+                    if ejecucion is not None:
+                        resultado["recalculada"] = bool(a_puntuar[posicion])
+                else:
+                    resultado["error"] = f"Valores inválidos en: {', '.join(errores[posicion])}"
+                lineas.append(json.dumps(resultado, ensure_ascii=False))
+            fila_inicial += len(bloque)
+            yield "\n".join(lineas) + "\n"
+    finally:
+        # También si la corrida se corta: lo puntuado hasta ahí queda en el índice
+        if ejecucion is not None:
+            ejecucion.guardar()
+
+
+def puntuar_stream(archivo: IO, formato: str, columna_id: Optional[str] = None,
+                   tamano: Optional[int] = None, incremental: bool = False) -> Iterator[str]:
+    """
+    Prepara la puntuación en streaming de una cartera completa.
+    
+    El primer bloque se lee de inmediato para rechazar archivos sin las columnas
+    requeridas antes de empezar a responder; el resto se procesa a medida que
+    se consume el iterador, que produce líneas NDJSON en el orden de entrada.
+    Las líneas ilegibles y los bloques posteriores sin alguna columna dan una
+    línea de error por fila, sin cortar el stream.
+    
+    Con `incremental` solo se puntúan los clientes (por `columna_id`) nuevos o
+    cuyas features cambiaron desde la última corrida con la misma versión del
+    modelo; el resto reutiliza el puntaje guardado en el índice incremental.
+    
+    Raises:
+        ValueError: Si el formato no es válido, faltan columnas o el modo
+            incremental no trae columna_id.
+        RuntimeError: Si el modelo no está disponible.
+    """
+    if incremental and not columna_id:
+        raise ValueError("El modo incremental requiere columna_id para identificar a cada cliente")
+    obtener_modelo()
+    bloques = leer_bloques(archivo, formato, tamano or tamano_bloque())
+    primero = next(iter(bloques), None)
+    if primero is None:
+        return iter(())
+    verificar_columnas(primero[0], columna_id)
+    return _generar(itertools.chain([primero], bloques), columna_id, incremental)
+
+
+def puntuar_stream_incremental(archivo: IO, formato: str) -> Iterator[str]:
+    """Puntuación incremental para trabajos asíncronos, con la columna de id de columna_id_incremental()"""
+    return puntuar_stream(archivo, formato, columna_id_incremental(), incremental=True)
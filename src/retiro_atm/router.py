@@ -0,0 +1,128 @@
+import os
+from typing import List
+
+from fastapi import APIRouter, Depends, HTTPException, Request
+
+from src.retiro_atm.schema import InputPronosticoRetiroAtm, OutputPronosticoRetiroAtm
+from src.retiro_atm.schema import InputDataRetiroAtm, InputPrediccionCajero, OutputDataRetiroAtm
+from src.retiro_atm.schema import RegistroRetiroAtm, ResultadoRegistroRetiroAtm
+from src.retiro_atm.service.service_prediction_retiro_atm import ServicioPredicticionRetiroAtm
+from src.retiro_atm.service.feature_store import AlmacenFeaturesAtm
+from src.retiro_atm.service.streaming_retiro_atm import FORMATOS, pronosticar_stream
+from core.admision import admision
+from core.columnar import LoteColumnar, cuerpo_openapi, leer_lote, respuesta_columnar
+from core.config import obtener_texto
+from core.ejecutor import ColaLlenaError, obtener_ejecutor
+from core.ejemplos import EJEMPLOS
+from core.prefork import estado_unico
+from core.registro import registro
+from core.respuestas import construir, respuesta_json, respuesta_lote, respuesta_rapida
+from core.trabajos import registrar_trabajo
+
+router = APIRouter(
+    prefix="/retiro_atm",
+    tags=["Predicción del Retiro de Efectivo en ATM"]
+)
+
+#Registramos el servicio (se carga en el arranque de la aplicación); se obtiene con registro.obtener("retiro_atm")
+registro.registrar(
+    "retiro_atm",
+    ServicioPredicticionRetiroAtm,
+    ServicioPredicticionRetiroAtm.PATH_MODEL,
+    calentar=lambda servicio: servicio.predecir_retiro(InputDataRetiroAtm(**EJEMPLOS["retiro_atm"]))
+)
+
+#Pronósticos de flotas completas como trabajos asíncronos en /trabajos/retiro_atm
+registrar_trabajo("retiro_atm", pronosticar_stream, FORMATOS)
+
+#Historial de retiros por cajero mantenido en el servidor (BANKMIND_ATM_SNAPSHOT)
+RUTA_SNAPSHOT = obtener_texto(
+    "ATM_SNAPSHOT",
+    os.path.join(os.path.dirname(__file__), "models_files", "almacen_features.npz")
+)
+almacenFeatures = AlmacenFeaturesAtm.cargar_o_crear(RUTA_SNAPSHOT)
+
+#Lo llama el lifespan de la aplicación al apagarse
+def guardar_almacen():
+    almacenFeatures.guardar(RUTA_SNAPSHOT)
+
+@router.post("/pronosticar", dependencies=[Depends(admision("retiro_atm_lote"))])
+async def pronosticar_retiros(input_data: InputPronosticoRetiroAtm) -> OutputPronosticoRetiroAtm:
+    """
+    Pronostica los retiros diarios de varios ATM para los próximos `horizonte` días
+    a partir de su historial reciente (mínimo 14 días por cajero).
+    """
+    try:
+        servicio = registro.obtener("retiro_atm")
+        resultado = await obtener_ejecutor("retiro_atm").ejecutar(servicio.pronosticar_flota, input_data)
+        return respuesta_json(resultado) if respuesta_rapida("retiro_atm") else resultado
+    except ColaLlenaError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail="Error interno del servidor")
+
+@router.post("/predecir/lote", dependencies=[Depends(admision("retiro_atm_lote"))],
+             openapi_extra=cuerpo_openapi(InputDataRetiroAtm))
+async def predecir_retiros_lote(request: Request) -> List[OutputDataRetiroAtm]:
+    """
+    Predice el retiro de N cajeros (features ya calculadas) con una sola llamada al modelo.
+    Acepta JSON o columnas en Arrow IPC / MessagePack y responde en el mismo formato.
+    """
+    lote = await leer_lote(request, InputDataRetiroAtm)
+    try:
+        servicio = registro.obtener("retiro_atm")
+        if isinstance(lote, LoteColumnar):
+            columnas = await obtener_ejecutor("retiro_atm").ejecutar(servicio.predecir_retiro_columnas, lote.columnas)
+            return respuesta_columnar(columnas, lote.formato)
+        resultado = await obtener_ejecutor("retiro_atm").ejecutar(servicio.predecir_retiro_lote, lote)
+        return respuesta_lote("retiro_atm", resultado) if respuesta_rapida("retiro_atm") else resultado
+    except ColaLlenaError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail="Error interno del servidor")
+
+@router.post("/historial", dependencies=[Depends(estado_unico)])
+def registrar_historial(registros: List[RegistroRetiroAtm]) -> ResultadoRegistroRetiroAtm:
+    """
+    Registra los totales diarios de retiros por cajero en el almacén del servidor.
+    Los registros inválidos se informan en `errores` sin detener el resto.
+    Con BANKMIND_WORKERS > 1 responde 409: el historial de cada worker es propio.
+    """
+    errores = []
+    for registro in registros:
+        try:
+            almacenFeatures.registrar(registro.id_cajero, registro.fecha, registro.retiro,
+                                      registro.ubicacion, registro.ambiente)
+        except ValueError as e:
+            errores.append(f"{registro.id_cajero} {registro.fecha}: {e}")
+    return ResultadoRegistroRetiroAtm(registrados=len(registros) - len(errores), errores=errores)
+
+@router.post("/historial/snapshot")
+def guardar_snapshot():
+    """
+    Guarda en disco el historial de todos los cajeros para acelerar el reinicio.
+    """
+    almacenFeatures.guardar(RUTA_SNAPSHOT)
+    return {"cajeros": len(almacenFeatures), "ruta": RUTA_SNAPSHOT}
+
+def _predecir_cajero(input_data: InputPrediccionCajero) -> OutputDataRetiroAtm:
+    x = almacenFeatures.features([input_data.id_cajero], input_data.fecha, input_data.esFeriado)
+    return construir("retiro_atm", OutputDataRetiroAtm, retiro=float(registro.obtener("retiro_atm").predecir_features(x)[0]))
+
+@router.post("/predecir/cajero", dependencies=[Depends(admision("retiro_atm"))])
+async def predecir_cajero(input_data: InputPrediccionCajero) -> OutputDataRetiroAtm:
+    """
+    Predice el retiro de un cajero para una fecha usando el historial registrado
+    en el servidor; `fecha` debe ser el día siguiente al último registrado.
+    """
+    try:
+        resultado = await obtener_ejecutor("retiro_atm").ejecutar(_predecir_cajero, input_data)
+        return respuesta_json(resultado) if respuesta_rapida("retiro_atm") else resultado
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Cajero '{input_data.id_cajero}' sin historial registrado")
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ColaLlenaError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail="Error interno del servidor")
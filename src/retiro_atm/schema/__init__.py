@@ -1,4 +1,18 @@
 from src.retiro_atm.schema.input_retiro_atm import InputDataRetiroAtm
 from src.retiro_atm.schema.output_retiro_atm  import OutputDataRetiroAtm
+from src.retiro_atm.schema.almacen_retiro_atm import (
+    InputPrediccionCajero,
+    RegistroRetiroAtm,
+    ResultadoRegistroRetiroAtm,
+)
+from src.retiro_atm.schema.pronostico_retiro_atm import (
+    HistorialCajero,
+    InputPronosticoRetiroAtm,
+    OutputPronosticoRetiroAtm,
+    PrediccionDiaRetiroAtm,
+    PronosticoCajero,
+)
 
-__all__ = ["InputDataRetiroAtm","OutputDataRetiroAtm"]
\ No newline at end of file
+__all__ = ["InputDataRetiroAtm","OutputDataRetiroAtm","HistorialCajero","InputPronosticoRetiroAtm",
+           "OutputPronosticoRetiroAtm","PrediccionDiaRetiroAtm","PronosticoCajero",
+           "InputPrediccionCajero","RegistroRetiroAtm","ResultadoRegistroRetiroAtm"]
@@ -0,0 +1,21 @@
+from datetime import date
+from typing import List, Optional
+
+from pydantic import BaseModel, Field
+
+class RegistroRetiroAtm(BaseModel):
+    id_cajero : str
+    fecha : date
+    retiro : float = Field(..., ge=0)
+    # Obligatorios solo la primera vez que se registra el cajero
+    ubicacion : Optional[int] = None
+    ambiente : Optional[int] = None
+
+class ResultadoRegistroRetiroAtm(BaseModel):
+    registrados : int
+    errores : List[str]
+
+class InputPrediccionCajero(BaseModel):
+    id_cajero : str
+    fecha : date
+    esFeriado : int = 0
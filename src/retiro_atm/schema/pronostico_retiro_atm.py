@@ -0,0 +1,30 @@
+from datetime import date
+from typing import Annotated, List
+
+from pydantic import BaseModel, Field
+
+from src.retiro_atm.service.features_retiro_atm import VENTANA_HISTORIAL
+
+class HistorialCajero(BaseModel):
+    id_cajero : str
+    ubicacion : int
+    ambiente : int
+    # Retiros diarios en orden cronológico; el último es el día anterior a fecha_inicio
+    retiros : List[Annotated[float, Field(ge=0)]] = Field(..., min_length=VENTANA_HISTORIAL)
+
+class InputPronosticoRetiroAtm(BaseModel):
+    fecha_inicio : date
+    horizonte : int = Field(7, ge=1, le=31)
+    feriados : List[date] = []
+    cajeros : List[HistorialCajero] = Field(..., min_length=1)
+
+class PrediccionDiaRetiroAtm(BaseModel):
+    fecha : date
+    retiro : float
+
+class PronosticoCajero(BaseModel):
+    id_cajero : str
+    predicciones : List[PrediccionDiaRetiroAtm]
+
+class OutputPronosticoRetiroAtm(BaseModel):
+    cajeros : List[PronosticoCajero]
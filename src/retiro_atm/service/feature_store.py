@@ -0,0 +1,261 @@
+import os
+import threading
+from datetime import date
+from typing import Dict, List, Optional
+
+import numpy
+
+from src.retiro_atm.service.features_retiro_atm import (
+    COLUMNAS_MODELO,
+    UMBRAL_BAJO,
+    UMBRAL_CAIDA,
+    VENTANA_HISTORIAL,
+    features_calendario,
+    indices_fin_de_semana,
+)
+
+CAPACIDAD_INICIAL = 1024
+VERSION_SNAPSHOT = 1
+
+
+class AlmacenFeaturesAtm:
+    """
+    Almacén en memoria del historial diario de retiros por cajero.
+
+    Cada cajero ocupa una fila de arreglos de tamaño fijo: un buffer circular
+    con los últimos VENTANA_HISTORIAL días y sumas acumuladas de 3 y 7 días
+    (y de cuadrados de 7 días), de modo que registrar un día y calcular sus
+    features cuesta O(1) sin importar cuántos días se hayan registrado.
+    La memoria crece de forma predecible (~160 bytes por cajero).
+    """
+
+    def __init__(self, capacidad: int = CAPACIDAD_INICIAL):
+        self._lock = threading.Lock()
+        self._indices: Dict[str, int] = {}
+        self._ids: List[str] = []
+        self._reservar(max(1, capacidad))
+
+    def _reservar(self, capacidad: int) -> None:
+        anterior = len(self._ids)
+        def crecer(arreglo, forma, dtype):
+            nuevo = numpy.zeros(forma, dtype=dtype)
+            if arreglo is not None:
+                nuevo[:anterior] = arreglo[:anterior]
+            return nuevo
+        self._retiros = crecer(getattr(self, "_retiros", None), (capacidad, VENTANA_HISTORIAL), numpy.float64)
+        self._posicion = crecer(getattr(self, "_posicion", None), capacidad, numpy.int16)
+        self._dias = crecer(getattr(self, "_dias", None), capacidad, numpy.int32)
+        self._ultima_fecha = crecer(getattr(self, "_ultima_fecha", None), capacidad, numpy.int32)
+        self._ubicacion = crecer(getattr(self, "_ubicacion", None), capacidad, numpy.int32)
+        self._ambiente = crecer(getattr(self, "_ambiente", None), capacidad, numpy.int32)
+        self._suma_3d = crecer(getattr(self, "_suma_3d", None), capacidad, numpy.float64)
+        self._suma_7d = crecer(getattr(self, "_suma_7d", None), capacidad, numpy.float64)
+        self._suma_cuadrados_7d = crecer(getattr(self, "_suma_cuadrados_7d", None), capacidad, numpy.float64)
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def _fila(self, id_cajero: str, ubicacion: Optional[int], ambiente: Optional[int]) -> int:
+        fila = self._indices.get(id_cajero)
+        if fila is None:
+            if ubicacion is None or ambiente is None:
+                raise ValueError(f"El cajero '{id_cajero}' es nuevo: se requieren ubicacion y ambiente")
+            fila = len(self._ids)
+            if fila == self._retiros.shape[0]:
+                self._reservar(2 * fila)
+            self._indices[id_cajero] = fila
+            self._ids.append(id_cajero)
+        if ubicacion is not None:
+            self._ubicacion[fila] = ubicacion
+        if ambiente is not None:
+            self._ambiente[fila] = ambiente
+        return fila
+
+    def _agregar(self, fila: int, valor: float) -> None:
+        posicion = int(self._posicion[fila])
+        buffer = self._retiros[fila]
+        # Valores que salen de las ventanas de 3 y 7 días al entrar el nuevo
+        sale_3d = buffer[(posicion - 3) % VENTANA_HISTORIAL]
+        sale_7d = buffer[(posicion - 7) % VENTANA_HISTORIAL]
+        buffer[posicion] = valor
+        self._suma_3d[fila] += valor - sale_3d
+        self._suma_7d[fila] += valor - sale_7d
+        self._suma_cuadrados_7d[fila] += valor * valor - sale_7d * sale_7d
+        self._posicion[fila] = (posicion + 1) % VENTANA_HISTORIAL
+        self._dias[fila] += 1
+
+    def _corregir_ultimo(self, fila: int, valor: float) -> None:
+        ultima = (int(self._posicion[fila]) - 1) % VENTANA_HISTORIAL
+        anterior = self._retiros[fila, ultima]
+        self._retiros[fila, ultima] = valor
+        self._suma_3d[fila] += valor - anterior
+        self._suma_7d[fila] += valor - anterior
+        self._suma_cuadrados_7d[fila] += valor * valor - anterior * anterior
+
+    def _reiniciar(self, fila: int) -> None:
+        self._retiros[fila] = 0.0
+        self._posicion[fila] = 0
+        self._dias[fila] = 0
+        self._suma_3d[fila] = self._suma_7d[fila] = self._suma_cuadrados_7d[fila] = 0.0
+
+    def registrar(self, id_cajero: str, fecha: date, retiro: float,
+                  ubicacion: Optional[int] = None, ambiente: Optional[int] = None) -> None:
+        """
+        Registra el total de retiros de un día para un cajero.
+
+        Volver a registrar el último día corrige su valor; los días faltantes
+        entre el último registrado y `fecha` se completan con 0.
+
+        Raises:
+            ValueError: Si la fecha es anterior al último día registrado o
+                el cajero es nuevo y no trae ubicacion/ambiente.
+        """
+        if retiro < 0:
+            raise ValueError("El retiro no puede ser negativo")
+        dia = fecha.toordinal()
+        with self._lock:
+            fila = self._fila(id_cajero, ubicacion, ambiente)
+            if self._dias[fila] == 0:
+                self._agregar(fila, retiro)
+            else:
+                ultima = int(self._ultima_fecha[fila])
+                if dia < ultima:
+                    raise ValueError(f"El cajero '{id_cajero}' ya tiene registrado el día {date.fromordinal(ultima)}")
+                if dia == ultima:
+                    self._corregir_ultimo(fila, retiro)
+                else:
+                    faltantes = dia - ultima - 1
+                    if faltantes >= VENTANA_HISTORIAL:
+                        self._reiniciar(fila)
+                    else:
+                        for _ in range(faltantes):
+                            self._agregar(fila, 0.0)
+                    self._agregar(fila, retiro)
+            self._ultima_fecha[fila] = dia
+
+    def features(self, ids_cajeros: List[str], fecha: date, es_feriado: int = 0) -> numpy.ndarray:
+        """
+        Devuelve la matriz de features (N, 18) para predecir `fecha` en los cajeros indicados.
+        `fecha` debe ser el día siguiente al último registrado de cada cajero.
+
+        Raises:
+            KeyError: Si algún cajero no existe.
+            ValueError: Si el historial no alcanza o no termina el día anterior a `fecha`.
+        """
+        dia = fecha.toordinal()
+        with self._lock:
+            filas = numpy.array([self._indices[id_cajero] for id_cajero in ids_cajeros], dtype=numpy.int64)
+            for id_cajero, fila in zip(ids_cajeros, filas):
+                if self._dias[fila] < VENTANA_HISTORIAL:
+                    raise ValueError(f"El cajero '{id_cajero}' tiene menos de {VENTANA_HISTORIAL} días de historial")
+                if self._ultima_fecha[fila] != dia - 1:
+                    raise ValueError(
+                        f"El último día registrado del cajero '{id_cajero}' es "
+                        f"{date.fromordinal(int(self._ultima_fecha[fila]))}; solo se puede predecir el día siguiente"
+                    )
+
+            buffers = self._retiros[filas]
+            posiciones = self._posicion[filas].astype(numpy.int64)
+            # Con el buffer lleno, `posicion` apunta al día más antiguo de la ventana
+            def retiro_hace(dias):
+                return buffers[numpy.arange(len(filas)), (posiciones - dias) % VENTANA_HISTORIAL]
+            lag1, lag5, lag7, lag11 = retiro_hace(1), retiro_hace(5), retiro_hace(7), retiro_hace(11)
+            media_3d = self._suma_3d[filas] / 3
+            suma_7d = self._suma_7d[filas]
+            media_7d = suma_7d / 7
+            varianza = numpy.maximum((self._suma_cuadrados_7d[filas] - suma_7d * suma_7d / 7) / 6, 0.0)
+            finde_posiciones = (posiciones[:, None] + indices_fin_de_semana(fecha)[None, :]) % VENTANA_HISTORIAL
+            finde = numpy.take_along_axis(buffers, finde_posiciones, axis=1).mean(axis=1)
+            ubicacion = self._ubicacion[filas]
+            ambiente = self._ambiente[filas]
+
+        dia_semana, quincena, semana_mes, dia_mes = features_calendario(fecha)
+        with numpy.errstate(divide="ignore", invalid="ignore"):
+            volatilidad = numpy.where(media_7d > 0, numpy.sqrt(varianza) / media_7d, 0.0)
+
+        X = numpy.empty((len(filas), len(COLUMNAS_MODELO)))
+        X[:, 0] = dia_semana
+        X[:, 1] = quincena
+        X[:, 2] = semana_mes
+        X[:, 3] = dia_mes
+        X[:, 4] = lag1
+        X[:, 5] = lag5
+        X[:, 6] = lag7
+        X[:, 7] = lag11
+        X[:, 8] = lag1 - lag7
+        X[:, 9] = es_feriado
+        X[:, 10] = lag1 < UMBRAL_CAIDA * media_7d
+        X[:, 11] = volatilidad
+        X[:, 12] = media_3d
+        X[:, 13] = finde
+        X[:, 14] = (dia_semana == 0) & (finde < UMBRAL_BAJO * media_7d)
+        X[:, 15] = (dia_semana == 6) & (lag7 < UMBRAL_BAJO * media_7d)
+        X[:, 16] = ubicacion
+        X[:, 17] = ambiente
+        return X
+
+    def guardar(self, ruta: str) -> None:
+        """Escribe un snapshot compacto de forma atómica (archivo temporal + rename)"""
+        with self._lock:
+            n = len(self._ids)
+            arreglos = dict(
+                version=numpy.array(VERSION_SNAPSHOT),
+                ids=numpy.array(self._ids, dtype=str),
+                retiros=self._retiros[:n],
+                posicion=self._posicion[:n],
+                dias=self._dias[:n],
+                ultima_fecha=self._ultima_fecha[:n],
+                ubicacion=self._ubicacion[:n],
+                ambiente=self._ambiente[:n],
+            )
+            directorio = os.path.dirname(os.path.abspath(ruta))
+            os.makedirs(directorio, exist_ok=True)
+            # Temporal por proceso: en modo prefork cada worker guarda su propio historial
+            temporal = f"{ruta}.{os.getpid()}.tmp"
+            with open(temporal, "wb") as archivo:
+                numpy.savez(archivo, **arreglos)
+        os.replace(temporal, ruta)
+
+    @classmethod
+    def cargar(cls, ruta: str) -> "AlmacenFeaturesAtm":
+        """
+        Reconstruye el almacén desde un snapshot; las sumas acumuladas se
+        recalculan desde los buffers para no arrastrar error de redondeo.
+        """
+        with numpy.load(ruta) as datos:
+            if int(datos["version"]) != VERSION_SNAPSHOT:
+                raise ValueError(f"Versión de snapshot no soportada: {int(datos['version'])}")
+            ids = datos["ids"].tolist()
+            almacen = cls(capacidad=max(CAPACIDAD_INICIAL, 2 * len(ids)))
+            n = len(ids)
+            almacen._ids = list(ids)
+            almacen._indices = {id_cajero: fila for fila, id_cajero in enumerate(ids)}
+            almacen._retiros[:n] = datos["retiros"]
+            almacen._posicion[:n] = datos["posicion"]
+            almacen._dias[:n] = datos["dias"]
+            almacen._ultima_fecha[:n] = datos["ultima_fecha"]
+            almacen._ubicacion[:n] = datos["ubicacion"]
+            almacen._ambiente[:n] = datos["ambiente"]
+
+        # Días más recientes primero: la columna k es el retiro de hace k+1 días
+        posiciones = almacen._posicion[:n].astype(numpy.int64)
+        recientes = numpy.take_along_axis(
+            almacen._retiros[:n],
+            (posiciones[:, None] - numpy.arange(1, VENTANA_HISTORIAL + 1)[None, :]) % VENTANA_HISTORIAL,
+            axis=1,
+        )
+        almacen._suma_3d[:n] = recientes[:, :3].sum(axis=1)
+        almacen._suma_7d[:n] = recientes[:, :7].sum(axis=1)
+        almacen._suma_cuadrados_7d[:n] = (recientes[:, :7] ** 2).sum(axis=1)
+        return almacen
+
+    @classmethod
+    def cargar_o_crear(cls, ruta: str) -> "AlmacenFeaturesAtm":
+        if os.path.exists(ruta):
+            try:
+                almacen = cls.cargar(ruta)
+                print(f"[OK] Historial de {len(almacen)} cajeros cargado desde: {ruta}")
+                return almacen
+            except Exception as e:
+                print(f"[WARN] No se pudo leer el snapshot {ruta}: {e}. Se inicia vacío.")
+        return cls()
@@ -0,0 +1,95 @@
+from datetime import date, timedelta
+
+import numpy
+
+from core.pipeline import Pipeline
+
+# Días de historial necesarios para calcular todas las features de un día
+# (lag11 y los cuatro últimos días de fin de semana caben en dos semanas)
+VENTANA_HISTORIAL = 14
+
+# Umbrales de las banderas de caída (fracción de la media de la última semana)
+UMBRAL_CAIDA = 0.8
+UMBRAL_BAJO = 0.8
+
+# Orden de columnas que espera el modelo (mismo orden que InputDataRetiroAtm)
+COLUMNAS_MODELO = [
+    "dia_semana", "quincena", "semana_mes", "dia_mes",
+    "lag1", "lag5", "lag7", "lag11", "tendencia_lags",
+    "esFeriado", "caida_reciente", "volatilidad_reciente", "media_movil_3d",
+    "retiros_finde_anterior", "lunes_post_finde_bajo", "domingo_bajo",
+    "ubicacion", "ambiente"
+]
+
+# Pipeline de las requests que traen las 18 features ya calculadas; el pronóstico
+# recursivo las deriva del historial con construir_features, en el mismo orden
+PIPELINE = Pipeline("retiro_atm", COLUMNAS_MODELO, entradas=COLUMNAS_MODELO).compilar()
+
+# Definición de las features derivadas a partir del historial diario de retiros:
+#   dia_semana             0=lunes ... 6=domingo
+#   quincena               0 si el día es <= 15, 1 en otro caso
+#   semana_mes             semana del mes empezando en 0 ((dia - 1) // 7)
+#   dia_mes                día del mes
+#   lagN                   retiro de N días antes
+#   tendencia_lags         lag1 - lag7
+#   media_movil_3d         media de los últimos 3 días
+#   volatilidad_reciente   desviación estándar / media de los últimos 7 días
+#   caida_reciente         1 si lag1 < UMBRAL_CAIDA * media de los últimos 7 días
+#   retiros_finde_anterior media de los últimos 4 días de fin de semana
+#   lunes_post_finde_bajo  1 si es lunes y retiros_finde_anterior < UMBRAL_BAJO * media 7 días
+#   domingo_bajo           1 si es domingo y el domingo anterior (lag7) < UMBRAL_BAJO * media 7 días
+
+
+def features_calendario(fecha: date) -> tuple:
+    """Devuelve (dia_semana, quincena, semana_mes, dia_mes) de una fecha"""
+    return fecha.weekday(), 0 if fecha.day <= 15 else 1, (fecha.day - 1) // 7, fecha.day
+
+
+def indices_fin_de_semana(fecha: date, ventana: int = VENTANA_HISTORIAL) -> numpy.ndarray:
+    """Posiciones, dentro de una ventana que termina el día anterior a `fecha`, de sus últimos 4 días de fin de semana"""
+    posiciones = [
+        posicion for posicion in range(ventana)
+        if (fecha - timedelta(days=ventana - posicion)).weekday() >= 5
+    ]
+    return numpy.array(posiciones[-4:])
+
+
+def construir_features(historial: numpy.ndarray, fecha: date, es_feriado: int,
+                       ubicacion: numpy.ndarray, ambiente: numpy.ndarray) -> numpy.ndarray:
+    """
+    Construye la matriz de features (N, 18) para predecir `fecha` en N cajeros a la vez.
+
+    `historial` es una matriz (N, VENTANA_HISTORIAL) de retiros diarios en orden
+    cronológico, cuya última columna corresponde al día anterior a `fecha`.
+    """
+    n = historial.shape[0]
+    dia_semana, quincena, semana_mes, dia_mes = features_calendario(fecha)
+
+    lag1 = historial[:, -1]
+    lag7 = historial[:, -7]
+    semana = historial[:, -7:]
+    media_7d = semana.mean(axis=1)
+    with numpy.errstate(divide="ignore", invalid="ignore"):
+        volatilidad = numpy.where(media_7d > 0, semana.std(axis=1, ddof=1) / media_7d, 0.0)
+    finde = historial[:, indices_fin_de_semana(fecha, historial.shape[1])].mean(axis=1)
+
+    X = numpy.empty((n, len(COLUMNAS_MODELO)))
+    X[:, 0] = dia_semana
+    X[:, 1] = quincena
+    X[:, 2] = semana_mes
+    X[:, 3] = dia_mes
+    X[:, 4] = lag1
+    X[:, 5] = historial[:, -5]
+    X[:, 6] = lag7
+    X[:, 7] = historial[:, -11]
+    X[:, 8] = lag1 - lag7
+    X[:, 9] = es_feriado
+    X[:, 10] = lag1 < UMBRAL_CAIDA * media_7d
+    X[:, 11] = volatilidad
+    X[:, 12] = historial[:, -3:].mean(axis=1)
+    X[:, 13] = finde
+    X[:, 14] = (dia_semana == 0) & (finde < UMBRAL_BAJO * media_7d)
+    X[:, 15] = (dia_semana == 6) & (lag7 < UMBRAL_BAJO * media_7d)
+    X[:, 16] = ubicacion
+    X[:, 17] = ambiente
+    return X
@@ -1,43 +1,110 @@
-from xgboost import XGBRegressor
 from joblib import load
+import os
 import numpy
+from datetime import date, timedelta
+from typing import TYPE_CHECKING, Dict, List, Set
 from src.retiro_atm.schema import InputDataRetiroAtm
 from src.retiro_atm.schema import OutputDataRetiroAtm
+from src.retiro_atm.schema import InputPronosticoRetiroAtm, OutputPronosticoRetiroAtm
+from src.retiro_atm.schema import PrediccionDiaRetiroAtm, PronosticoCajero
+from core.arboles import compilar_si_corresponde
+from core.deriva import registrar_deriva
+from core.metricas import etapa
+from core.respuestas import construir
+from src.retiro_atm.service.features_retiro_atm import PIPELINE, VENTANA_HISTORIAL, construir_features
+
+#Deriva del retiro predicho en las requests (el pronóstico recursivo no se observa)
+DERIVA = registrar_deriva("retiro_atm", cuantiles=("retiro",))
+
+if TYPE_CHECKING:
+    # Solo para la anotación: xgboost se importa al deserializar el modelo, no al importar el módulo
+    from xgboost import XGBRegressor
 
 
 class ServicioPredicticionRetiroAtm():
-    __path_model: str = r"src/retiro_atm/models_files/retiro_atm_model.joblib"
-    __model : XGBRegressor
+    PATH_MODEL: str = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "models_files", "retiro_atm_model.joblib")
+    __model : "XGBRegressor"
 
-    def __init__(self):
-        self.__model = load(self.__path_model)
+    def __init__(self, path_model: str = PATH_MODEL):
+        self.__model = load(path_model)
+        # Versión compilada del ensamble si BANKMIND_ARBOLES_COMPILADOS_RETIRO_ATM está activo
+        self.__predictor = compilar_si_corresponde("retiro_atm", self.__model)
     
     def predecir_retiro(self,input:InputDataRetiroAtm) -> OutputDataRetiroAtm:
-        x = numpy.array([[
-            input.dia_semana,
-            input.quincena,
-            input.semana_mes,
-            input.dia_mes,
-            input.lag1,
-            input.lag5,
-            input.lag7,
-            input.lag11,
-            input.tendencia_lags,
-            input.esFeriado,
-            input.caida_reciente,
-            input.volatilidad_reciente,
-            input.media_movil_3d,
-            input.retiros_finde_anterior,
-            input.lunes_post_finde_bajo,
-            input.domingo_bajo,
-            input.ubicacion,  
-            input.ambiente
-        ]])
-
-        #Obtenemosla predicción del modelo 
-        y_pred_log = self.__model.predict(x)
+        return self.predecir_retiro_lote([input])[0]
+
+    def predecir_retiro_lote(self,inputs:List[InputDataRetiroAtm]) -> List[OutputDataRetiroAtm]:
+        if not inputs:
+            return []
+
+        with etapa("retiro_atm", "features"):
+            x = PIPELINE.transformar(inputs)
+
+        #Obtenemos las predicciones del modelo en una sola llamada
+        with etapa("retiro_atm", "modelo"):
+            y_pred_log = self.__predictor.predict(x)
         y_pred_final = numpy.expm1(y_pred_log) # Volver a la escala de pesos/dólares
+        with etapa("retiro_atm", "deriva"):
+            DERIVA.observar(retiro=y_pred_final)
         
-        #Casteamos el valor deseado a predecir
-        prediccion_retiro = float(y_pred_final[0])
-        return OutputDataRetiroAtm(retiro=prediccion_retiro)
\ No newline at end of file
+        #Casteamos los valores deseados a predecir
+        with etapa("retiro_atm", "salida"):
+            return [construir("retiro_atm", OutputDataRetiroAtm, retiro=float(prediccion_retiro)) for prediccion_retiro in y_pred_final]
+
+    def predecir_retiro_columnas(self, columnas: Dict[str, numpy.ndarray]) -> Dict[str, numpy.ndarray]:
+        """Predice un lote que llega en columnas (cuerpo Arrow o MessagePack ya validado)"""
+        with etapa("retiro_atm", "features"):
+            x, _ = PIPELINE.lote_columnar(columnas)
+        retiros = self.predecir_features(x)
+        with etapa("retiro_atm", "deriva"):
+            DERIVA.observar(retiro=retiros)
+        return {"retiro": retiros}
+
+    def predecir_features(self, x: numpy.ndarray) -> numpy.ndarray:
+        """Predice una matriz de features ya construida (N, 18) y devuelve los retiros en pesos/dólares"""
+        with etapa("retiro_atm", "modelo"):
+            return numpy.expm1(self.__predictor.predict(x))
+
+    def pronosticar(self, historial: numpy.ndarray, fecha_inicio: date, horizonte: int,
+                    ubicacion: numpy.ndarray, ambiente: numpy.ndarray, feriados: Set[date] = frozenset()) -> numpy.ndarray:
+        """
+        Pronóstico recursivo de `horizonte` días para N cajeros a la vez.
+        Cada día se predice con una sola llamada al modelo para toda la flota y
+        la predicción (en pesos/dólares) se incorpora al historial del día siguiente.
+        Devuelve una matriz (N, horizonte).
+        """
+        ventana = numpy.array(historial[:, -VENTANA_HISTORIAL:], dtype=float)
+        pronostico = numpy.empty((ventana.shape[0], horizonte))
+
+        for paso in range(horizonte):
+            fecha = fecha_inicio + timedelta(days=paso)
+            with etapa("retiro_atm", "features"):
+                x = construir_features(ventana, fecha, int(fecha in feriados), ubicacion, ambiente)
+            pronostico[:, paso] = self.predecir_features(x)
+
+            #Desplazamos la ventana un día e incorporamos la predicción como historial
+            ventana[:, :-1] = ventana[:, 1:]
+            ventana[:, -1] = pronostico[:, paso]
+
+        return pronostico
+
+    def pronosticar_flota(self, input:InputPronosticoRetiroAtm) -> OutputPronosticoRetiroAtm:
+        historial = numpy.array([cajero.retiros[-VENTANA_HISTORIAL:] for cajero in input.cajeros])
+        ubicacion = numpy.array([cajero.ubicacion for cajero in input.cajeros])
+        ambiente = numpy.array([cajero.ambiente for cajero in input.cajeros])
+
+        pronostico = self.pronosticar(historial, input.fecha_inicio, input.horizonte,
+                                      ubicacion, ambiente, set(input.feriados))
+
+        fechas = [input.fecha_inicio + timedelta(days=paso) for paso in range(input.horizonte)]
+        return construir("retiro_atm", OutputPronosticoRetiroAtm, cajeros=[
+            construir(
+                "retiro_atm", PronosticoCajero,
+                id_cajero=cajero.id_cajero,
+                predicciones=[
+                    construir("retiro_atm", PrediccionDiaRetiroAtm, fecha=fecha, retiro=float(retiro))
+                    for fecha, retiro in zip(fechas, fila)
+                ]
+            )
+            for cajero, fila in zip(input.cajeros, pronostico)
+        ])
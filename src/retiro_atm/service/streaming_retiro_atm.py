@@ -0,0 +1,38 @@
+import json
+from typing import IO, Iterator, Optional
+
+from core.config import obtener_entero
+from core.registro import registro
+from core.respuestas import a_json
+from src.retiro_atm.schema import InputPronosticoRetiroAtm
+
+#Cajeros por bloque; cada bloque es una sola pasada de pronosticar_flota
+TAMANO_BLOQUE_DEFECTO = 5000
+
+FORMATOS = ("json",)
+
+
+def pronosticar_stream(archivo: IO, formato: str, tamano: Optional[int] = None) -> Iterator[str]:
+    """
+    Pronostica una flota completa (un documento InputPronosticoRetiroAtm) por
+    bloques de cajeros y produce una línea NDJSON {"fila", "resultado"} por
+    cajero, en el orden de entrada. Bloque configurable con BANKMIND_STREAM_BLOQUE_RETIRO_ATM.
+
+    Raises:
+        ValueError: Si el documento no es válido.
+        ModeloNoDisponibleError: Si el modelo no está cargado.
+    """
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato no soportado: {formato}")
+    servicio = registro.obtener("retiro_atm")
+    flota = InputPronosticoRetiroAtm.model_validate(json.load(archivo))
+    tamano = tamano or obtener_entero("STREAM_BLOQUE", TAMANO_BLOQUE_DEFECTO, modelo="retiro_atm")
+
+    for inicio in range(0, len(flota.cajeros), tamano):
+        bloque = flota.model_copy(update={"cajeros": flota.cajeros[inicio:inicio + tamano]})
+        pronostico = servicio.pronosticar_flota(bloque)
+        cajeros = pronostico["cajeros"] if isinstance(pronostico, dict) else pronostico.cajeros
+        yield "\n".join(
+            a_json({"fila": inicio + posicion, "resultado": cajero}).decode("utf-8")
+            for posicion, cajero in enumerate(cajeros)
+        ) + "\n"
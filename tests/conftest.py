@@ -0,0 +1,31 @@
+# tests/conftest.py
+import json
+import os
+import sys
+
+import pytest
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, os.path.join(RAIZ, "src"))
+
+import main  # noqa: E402,F401  (registra los modelos)
+from core.registro import registro  # noqa: E402
+
+# Entradas grabadas por modelo: valores variados alrededor de los ejemplos
+# de la documentación, con categorías conocidas y desconocidas
+RUTA_PAYLOADS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "datos", "payloads.json")
+
+
+@pytest.fixture(scope="session")
+def modelos():
+    """Registro con todos los modelos cargados (incluidos los diferidos)"""
+    fallidos = registro.cargar_pendientes(incluir_diferidos=True)
+    assert not fallidos, f"No se pudieron cargar: {fallidos}"
+    return registro
+
+
+@pytest.fixture(scope="session")
+def payloads():
+    with open(RUTA_PAYLOADS, encoding="utf-8") as archivo:
+        return json.load(archivo)
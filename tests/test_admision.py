@@ -0,0 +1,128 @@
+# tests/test_admision.py
+"""
+Control de admisión (core.admision): rechazo con cola llena y por plazo, y
+transferencia de lugares al vencer o cancelarse una request en la cola, sin
+perder ni duplicar lugares (en_curso vuelve siempre a 0).
+"""
+import asyncio
+import time
+
+import pytest
+
+from core.admision import ControlAdmision, SolicitudRechazadaError
+
+
+async def ocupar(control: ControlAdmision, salir: asyncio.Event, admitidas: list, plazo=None):
+    """Request que ocupa un lugar hasta que el test la deja salir"""
+    async with control.admitir(plazo):
+        admitidas.append(asyncio.current_task().get_name())
+        await salir.wait()
+
+
+async def ceder():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_cola_llena():
+    control = ControlAdmision("prueba", max_concurrentes=1, max_cola=1)
+
+    async def escenario():
+        salir, admitidas = asyncio.Event(), []
+        tareas = [asyncio.create_task(ocupar(control, salir, admitidas), name=f"r{i}") for i in range(2)]
+        await ceder()
+        assert (control.en_curso, len(control._cola)) == (1, 1)
+        with pytest.raises(SolicitudRechazadaError) as rechazo:
+            await ocupar(control, salir, admitidas)
+        assert rechazo.value.motivo == "cola_llena"
+        salir.set()
+        await asyncio.gather(*tareas)
+        return admitidas
+
+    assert asyncio.run(escenario()) == ["r0", "r1"]
+    assert control.en_curso == 0 and not control._cola
+    assert control.estadisticas()["rechazadas_cola_llena"] == 1
+
+
+def test_plazo_imposible_se_rechaza_sin_esperar():
+    control = ControlAdmision("prueba", max_concurrentes=1, max_cola=4)
+    control.servicio_s = 1.0
+
+    async def escenario():
+        with pytest.raises(SolicitudRechazadaError) as rechazo:
+            await ocupar(control, asyncio.Event(), [], plazo=time.monotonic() + 0.5)
+        return rechazo.value
+
+    assert asyncio.run(escenario()).motivo == "plazo"
+    assert control.en_curso == 0 and control.admitidas == 0
+
+
+def test_plazo_vencido_en_la_cola():
+    control = ControlAdmision("prueba", max_concurrentes=1, max_cola=4)
+
+    async def escenario():
+        salir, admitidas = asyncio.Event(), []
+        ocupada = asyncio.create_task(ocupar(control, salir, admitidas), name="ocupada")
+        await ceder()
+        with pytest.raises(SolicitudRechazadaError) as rechazo:
+            await ocupar(control, salir, admitidas, plazo=time.monotonic() + 0.05)
+        assert rechazo.value.motivo == "plazo"
+        assert not control._cola and control.en_curso == 1
+        # La siguiente request entra cuando se libera el lugar
+        siguiente = asyncio.create_task(ocupar(control, salir, admitidas), name="siguiente")
+        salir.set()
+        await asyncio.gather(ocupada, siguiente)
+        return admitidas
+
+    assert asyncio.run(escenario()) == ["ocupada", "siguiente"]
+    assert control.en_curso == 0
+
+
+def test_cancelada_despues_de_recibir_el_lugar_lo_transfiere():
+    control = ControlAdmision("prueba", max_concurrentes=1, max_cola=4)
+
+    async def escenario():
+        liberar_primera, salir, admitidas = asyncio.Event(), asyncio.Event(), []
+        primera = asyncio.create_task(ocupar(control, liberar_primera, admitidas), name="primera")
+        await ceder()
+        cancelada = asyncio.create_task(ocupar(control, salir, admitidas), name="cancelada")
+        ultima = asyncio.create_task(ocupar(control, salir, admitidas), name="ultima")
+        await ceder()
+        assert len(control._cola) == 2
+
+        # Al terminar "primera" su lugar pasa al turno de "cancelada", que se cancela
+        # antes de llegar a ejecutarse: el lugar tiene que seguir hacia "ultima"
+        primera.add_done_callback(lambda _: cancelada.cancel())
+        liberar_primera.set()
+        await primera
+        with pytest.raises(asyncio.CancelledError):
+            await cancelada
+        await ceder()
+        assert control.en_curso == 1 and not control._cola
+        salir.set()
+        await ultima
+        return admitidas
+
+    assert asyncio.run(escenario()) == ["primera", "ultima"]
+    assert control.en_curso == 0
+
+
+def test_cancelada_en_la_cola_no_consume_lugar():
+    control = ControlAdmision("prueba", max_concurrentes=1, max_cola=4)
+
+    async def escenario():
+        salir, admitidas = asyncio.Event(), []
+        ocupada = asyncio.create_task(ocupar(control, salir, admitidas), name="ocupada")
+        await ceder()
+        en_cola = asyncio.create_task(ocupar(control, salir, admitidas), name="en_cola")
+        await ceder()
+        en_cola.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await en_cola
+        assert not control._cola and control.en_curso == 1
+        salir.set()
+        await ocupada
+        return admitidas
+
+    assert asyncio.run(escenario()) == ["ocupada"]
+    assert control.en_curso == 0
@@ -0,0 +1,77 @@
+# tests/test_arboles.py
+"""
+Paridad de core.arboles con cada ensamble versionado: el evaluador compilado
+debe reproducir al modelo original sobre las entradas grabadas
+(tests/datos/payloads.json) y sobre las filas sintéticas alrededor de los umbrales.
+"""
+import numpy as np
+import pytest
+
+from core import arboles
+from fraude.schema.inputs import FraudInput
+from fraude.service.fusion import COLUMNA_ANOMALIA
+from morosidad.schema import MorosidadRequest
+from morosidad.service.morosidad_service import PIPELINE as PIPELINE_MOROSIDAD
+from src.retiro_atm.schema import InputDataRetiroAtm
+from src.retiro_atm.service.features_retiro_atm import PIPELINE as PIPELINE_RETIRO
+
+
+def _fraude(modelos, payloads):
+    servicio = modelos.obtener("fraude")
+    X = servicio._features_pandas([FraudInput(**fila) for fila in payloads["fraude"]])
+    base = [i for i, c in enumerate(servicio.columnas_modelo) if c != COLUMNA_ANOMALIA]
+    anomalia = servicio.columnas_modelo.index(COLUMNA_ANOMALIA)
+    X_if = X[:, base]
+    # El XGBoost recibe el anomaly_score del Isolation Forest original
+    X[:, anomalia] = servicio.if_model.decision_function(arboles._como_original(servicio.if_model, X_if))
+    return [("fraude-xgboost", servicio.xgb_model, X), ("fraude-isolation_forest", servicio.if_model, X_if)]
+
+
+def _fuga(modelos, payloads):
+    servicio = modelos.obtener("fuga")
+    return [("fuga", servicio.model, servicio.preprocess_batch(payloads["fuga"]))]
+
+
+def _morosidad(modelos, payloads):
+    X = PIPELINE_MOROSIDAD.lote([MorosidadRequest(**fila) for fila in payloads["morosidad"]])
+    return [("morosidad", modelos.obtener("morosidad"), X)]
+
+
+def _retiro_atm(modelos, payloads):
+    servicio = modelos.obtener("retiro_atm")
+    X = PIPELINE_RETIRO.lote([InputDataRetiroAtm(**fila) for fila in payloads["retiro_atm"]])
+    return [("retiro_atm", servicio._ServicioPredicticionRetiroAtm__model, X)]
+
+
+@pytest.fixture(scope="module")
+def ensambles(modelos, payloads):
+    """(nombre, modelo original, compilado, entradas grabadas) de cada ensamble versionado"""
+    casos = []
+    for armar in (_fraude, _fuga, _morosidad, _retiro_atm):
+        for nombre, modelo, X in armar(modelos, payloads):
+            casos.append((nombre, modelo, arboles.compilar(modelo), np.asarray(X, dtype=np.float64)))
+    return {nombre: caso for nombre, *caso in casos}
+
+
+NOMBRES = ["fraude-xgboost", "fraude-isolation_forest", "fuga", "morosidad", "retiro_atm"]
+
+
+@pytest.mark.parametrize("nombre", NOMBRES)
+def test_paridad_entradas_grabadas(ensambles, nombre):
+    modelo, compilado, X = ensambles[nombre]
+    assert arboles.verificar_paridad(modelo, compilado, X) <= 1e-4
+
+
+@pytest.mark.parametrize("nombre", NOMBRES)
+def test_paridad_alrededor_de_umbrales(ensambles, nombre):
+    modelo, compilado, _ = ensambles[nombre]
+    assert arboles.verificar_paridad(modelo, compilado) <= 1e-4
+
+
+def test_paridad_detecta_diferencias(ensambles):
+    modelo, compilado, X = ensambles["fuga"]
+    # Mismos árboles con las hojas desplazadas: la verificación tiene que rechazarlo
+    otro = arboles.compilar(modelo)
+    otro.bosque.valor = otro.bosque.valor + 0.5
+    with pytest.raises(arboles.ParidadError):
+        arboles.verificar_paridad(modelo, otro, X)
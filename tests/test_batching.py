@@ -0,0 +1,70 @@
+# tests/test_batching.py
+"""
+Micro-batcher (core.batching): una fila inválida solo hace fallar a su propia
+request, y los errores que no dependen de las filas no se reintentan fila a fila.
+"""
+import asyncio
+import threading
+
+import pytest
+
+from core.batching import MicroBatcher
+from core.ejecutor import ColaLlenaError
+from core.registro import ModeloNoDisponibleError
+
+
+class FuncionLote:
+    """funcion_lote que registra cada llamada y falla según `error(entradas)`"""
+
+    def __init__(self, error=None):
+        self.error = error
+        self.llamadas = []
+        self._lock = threading.Lock()
+
+    def __call__(self, entradas):
+        with self._lock:
+            self.llamadas.append(list(entradas))
+        if self.error is not None and (error := self.error(entradas)) is not None:
+            raise error
+        return [entrada * 2 for entrada in entradas]
+
+
+def enviar_todas(batcher: MicroBatcher, entradas):
+    async def escenario():
+        return await asyncio.gather(*(batcher.enviar(e) for e in entradas), return_exceptions=True)
+    return asyncio.run(escenario())
+
+
+def test_fila_envenenada_solo_falla_su_futuro():
+    funcion = FuncionLote(lambda entradas: ValueError("fila inválida") if 3 in entradas else None)
+    batcher = MicroBatcher("prueba_lote", funcion, max_lote=8, max_espera_ms=50)
+
+    resultados = enviar_todas(batcher, [1, 2, 3, 4])
+
+    assert resultados[:2] == [2, 4] and resultados[3] == 8
+    assert isinstance(resultados[2], ValueError)
+    # Un intento con el lote completo y uno por fila
+    assert funcion.llamadas[0] == [1, 2, 3, 4]
+    assert sorted(funcion.llamadas[1:]) == [[1], [2], [3], [4]]
+
+
+def test_resultados_de_largo_distinto_se_reintentan_fila_a_fila():
+    funcion = FuncionLote()
+    # Devuelve un solo resultado por llamada: solo es correcto con lotes de una fila
+    batcher = MicroBatcher("prueba_lote", lambda entradas: funcion(entradas)[:1], max_lote=8, max_espera_ms=50)
+
+    resultados = enviar_todas(batcher, [1, 2, 3])
+
+    assert resultados == [2, 4, 6]
+    assert len(funcion.llamadas) == 4
+
+
+@pytest.mark.parametrize("error", [ColaLlenaError("cola llena"), ModeloNoDisponibleError("sin modelo")])
+def test_errores_del_lote_no_se_reintentan(error):
+    funcion = FuncionLote(lambda entradas: error)
+    batcher = MicroBatcher("prueba_lote", funcion, max_lote=8, max_espera_ms=50)
+
+    resultados = enviar_todas(batcher, [1, 2, 3, 4])
+
+    assert all(resultado is error for resultado in resultados)
+    assert funcion.llamadas == [[1, 2, 3, 4]]
@@ -0,0 +1,165 @@
+# tests/test_cache.py
+"""
+Caché de predicciones (core.cache): single-flight, cancelación de un cliente,
+expiración por TTL con expulsión LRU y clave atada a la versión del modelo.
+"""
+import asyncio
+
+import pytest
+
+from core import cache as modulo_cache
+from core.cache import CachePredicciones
+from core.registro import registro
+
+
+class Reloj:
+    """Reemplazo de core.cache.time con un monotonic que avanza a mano"""
+
+    def __init__(self):
+        self.ahora = 1000.0
+
+    def monotonic(self) -> float:
+        return self.ahora
+
+
+class Contador:
+    """calcular() que cuenta sus ejecuciones y espera a que el test lo libere"""
+
+    def __init__(self):
+        self.llamadas = 0
+        self.liberar = None
+
+    async def __call__(self):
+        self.llamadas += 1
+        if self.liberar is not None:
+            await self.liberar.wait()
+        return {"resultado": self.llamadas}
+
+
+@pytest.fixture
+def reloj(monkeypatch):
+    reloj = Reloj()
+    monkeypatch.setattr(modulo_cache, "time", reloj)
+    return reloj
+
+
+@pytest.fixture
+def modelo_versionado(tmp_path):
+    """Modelo registrado con dos artefactos (versiones) de contenido distinto"""
+    nombre = "cache_prueba"
+    rutas = []
+    for contenido in ("v1", "v2"):
+        ruta = tmp_path / f"{contenido}.txt"
+        ruta.write_text(contenido)
+        rutas.append(str(ruta))
+    registro.registrar(nombre, lambda ruta: open(ruta).read(), rutas[0], diferida=False)
+    registro.cargar(nombre)
+    yield nombre, rutas
+    registro._entradas.pop(nombre, None)
+
+
+def test_single_flight():
+    cache = CachePredicciones("sin_registro", activa=True)
+    calcular = Contador()
+
+    async def escenario():
+        calcular.liberar = asyncio.Event()
+        esperas = [asyncio.create_task(cache.obtener({"a": 1}, calcular)) for _ in range(5)]
+        await asyncio.sleep(0)
+        calcular.liberar.set()
+        return await asyncio.gather(*esperas)
+
+    resultados = asyncio.run(escenario())
+    assert calcular.llamadas == 1
+    assert resultados == [{"resultado": 1}] * 5
+    estadisticas = cache.estadisticas()
+    assert (estadisticas["fallos"], estadisticas["coalescidas"], estadisticas["en_vuelo"]) == (1, 4, 0)
+
+
+def test_cancelar_un_cliente_no_cancela_el_calculo():
+    cache = CachePredicciones("sin_registro", activa=True)
+    calcular = Contador()
+
+    async def escenario():
+        calcular.liberar = asyncio.Event()
+        primero = asyncio.create_task(cache.obtener({"a": 1}, calcular))
+        segundo = asyncio.create_task(cache.obtener({"a": 1}, calcular))
+        await asyncio.sleep(0)
+        primero.cancel()
+        await asyncio.sleep(0)
+        calcular.liberar.set()
+        resultado = await segundo
+        with pytest.raises(asyncio.CancelledError):
+            await primero
+        # El resultado compartido quedó en la caché
+        return resultado, await cache.obtener({"a": 1}, calcular)
+
+    resultado, cacheado = asyncio.run(escenario())
+    assert resultado == cacheado == {"resultado": 1}
+    assert calcular.llamadas == 1
+
+
+def test_los_errores_no_se_cachean():
+    cache = CachePredicciones("sin_registro", activa=True)
+    intentos = []
+
+    async def falla():
+        intentos.append(1)
+        raise RuntimeError("modelo caído")
+
+    async def escenario():
+        for _ in range(2):
+            with pytest.raises(RuntimeError):
+                await cache.obtener({"a": 1}, falla)
+
+    asyncio.run(escenario())
+    assert len(intentos) == 2
+    assert cache.estadisticas()["entradas"] == 0
+
+
+def test_ttl_y_expulsion_lru(reloj):
+    cache = CachePredicciones("sin_registro", max_entradas=2, ttl_s=10.0, activa=True)
+    calcular = Contador()
+
+    async def escenario():
+        await cache.obtener({"a": 1}, calcular)
+        await cache.obtener({"a": 2}, calcular)
+        # Usar {"a": 1} la deja como la más reciente: la siguiente alta expulsa a {"a": 2}
+        reloj.ahora += 5
+        assert await cache.obtener({"a": 1}, calcular) == {"resultado": 1}
+        assert await cache.obtener({"a": 3}, calcular) == {"resultado": 3}
+        assert await cache.obtener({"a": 1}, calcular) == {"resultado": 1}
+        # {"a": 1} se guardó en t=1000 y expira en t=1010 aunque se haya usado después
+        reloj.ahora += 6
+        assert await cache.obtener({"a": 1}, calcular) == {"resultado": 4}
+        assert await cache.obtener({"a": 3}, calcular) == {"resultado": 3}
+        assert await cache.obtener({"a": 2}, calcular) == {"resultado": 5}
+
+    asyncio.run(escenario())
+    estadisticas = cache.estadisticas()
+    assert (estadisticas["aciertos"], estadisticas["expiradas"], estadisticas["expulsiones"]) == (3, 1, 2)
+    assert estadisticas["entradas"] == 2
+
+
+def test_clave_cambia_con_la_version(modelo_versionado):
+    nombre, (_, ruta_v2) = modelo_versionado
+    cache = CachePredicciones(nombre, activa=True)
+    calcular = Contador()
+    entrada = {"a": 1}
+
+    async def consultar():
+        return await cache.obtener(entrada, calcular)
+
+    clave_v1 = cache._clave(entrada)
+    assert asyncio.run(consultar()) == {"resultado": 1}
+    assert asyncio.run(consultar()) == {"resultado": 1}
+
+    registro.cargar(nombre, ruta_v2)
+    assert cache._clave(entrada) != clave_v1
+    assert asyncio.run(consultar()) == {"resultado": 2}
+
+    # El rollback vuelve a la versión anterior y a sus predicciones cacheadas
+    registro.rollback(nombre)
+    assert cache._clave(entrada) == clave_v1
+    assert asyncio.run(consultar()) == {"resultado": 1}
+    assert calcular.llamadas == 2
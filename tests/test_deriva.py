@@ -0,0 +1,110 @@
+# tests/test_deriva.py
+"""
+Resúmenes de deriva (core.deriva): combinar sketches equivale a resumir todos
+los datos juntos, los cuantiles respetan ERROR_RELATIVO y el PSI/KS distingue
+una muestra de la misma distribución de una desplazada.
+"""
+import math
+
+import numpy as np
+import pytest
+
+from core.deriva import (
+    ERROR_RELATIVO, UMBRAL_PSI_DEFECTO, ContadorCategorias, HistogramaPuntajes, SketchCuantiles, _Resumen,
+    comparar, importar_sketch,
+)
+
+CUANTILES = (0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99)
+
+
+def sketch(clase, valores):
+    resumen = clase()
+    resumen.agregar(valores)
+    return resumen
+
+
+def muestras(semilla: int):
+    generador = np.random.default_rng(semilla)
+    return {
+        "lognormal": generador.lognormal(mean=8, sigma=1.5, size=20_000),
+        "con_signo": np.concatenate([generador.normal(0, 50, 15_000), np.zeros(500),
+                                     generador.uniform(-1e-8, 1e-8, 100)]),
+    }
+
+
+def test_resumen_es_abstracto():
+    with pytest.raises(TypeError):
+        _Resumen()
+
+
+@pytest.mark.parametrize("clase", [SketchCuantiles, HistogramaPuntajes])
+def test_combinar_equivale_a_un_solo_sketch(clase):
+    generador = np.random.default_rng(1)
+    valores = generador.beta(2, 5, 10_000) if clase is HistogramaPuntajes else muestras(1)["con_signo"]
+    valores = np.concatenate([valores, [np.nan, np.inf]])
+    partes = np.array_split(generador.permutation(valores), 3)
+
+    combinado = sketch(clase, partes[0])
+    for parte in partes[1:]:
+        otro = clase()
+        for valor in parte:
+            otro.agregar_uno(valor)
+        combinado.combinar(otro)
+    unico = sketch(clase, valores)
+
+    np.testing.assert_array_equal(combinado.conteos(), unico.conteos())
+    assert (combinado.total, combinado.invalidos) == (unico.total, unico.invalidos) == (len(valores) - 2, 2)
+    assert (combinado.minimo, combinado.maximo) == (unico.minimo, unico.maximo)
+    assert combinado.suma == pytest.approx(unico.suma)
+    assert combinado.suma_cuadrados == pytest.approx(unico.suma_cuadrados)
+    assert [combinado.cuantil(q) for q in CUANTILES] == [unico.cuantil(q) for q in CUANTILES]
+
+    importado = importar_sketch(combinado.exportar())
+    np.testing.assert_array_equal(importado.conteos(), unico.conteos())
+    assert importado.describir() == combinado.describir()
+
+
+@pytest.mark.parametrize("nombre", ["lognormal", "con_signo"])
+def test_cuantiles_dentro_del_error_relativo(nombre):
+    valores = muestras(2)[nombre]
+    resumen = sketch(SketchCuantiles, valores)
+    ordenados = np.sort(valores)
+
+    for q in CUANTILES + (0.0, 1.0):
+        exacto = ordenados[int(q * (len(valores) - 1))]
+        estimado = resumen.cuantil(q)
+        if abs(exacto) < 1e-6:
+            # Debajo de MINIMO_INDEXABLE los valores cuentan como cero
+            assert abs(estimado) < 1e-6
+        else:
+            assert abs(estimado - exacto) <= ERROR_RELATIVO * abs(exacto) * (1 + 1e-9), (q, exacto, estimado)
+
+
+def test_psi_y_ks_de_la_misma_distribucion_y_de_una_desplazada():
+    generador = np.random.default_rng(3)
+    referencia = sketch(SketchCuantiles, generador.lognormal(8, 1.0, 50_000))
+    misma = comparar(referencia, sketch(SketchCuantiles, generador.lognormal(8, 1.0, 50_000)))
+    desplazada = comparar(referencia, sketch(SketchCuantiles, generador.lognormal(8.5, 1.0, 50_000)))
+
+    assert misma["psi"] < 0.02 and misma["ks"] < 0.02
+    assert desplazada["psi"] > UMBRAL_PSI_DEFECTO and desplazada["ks"] > 0.15
+    # KS de dos lognormales con la misma sigma: Φ(Δμ / 2σ) - Φ(-Δμ / 2σ)
+    assert desplazada["ks"] == pytest.approx(math.erf(0.25 / math.sqrt(2)), abs=0.02)
+    assert desplazada["variacion_media"] > 0
+
+    puntajes = sketch(HistogramaPuntajes, generador.beta(2, 5, 20_000))
+    assert comparar(puntajes, sketch(HistogramaPuntajes, generador.beta(2, 5, 20_000)))["psi"] < 0.02
+    assert comparar(puntajes, sketch(HistogramaPuntajes, generador.beta(5, 2, 20_000)))["psi"] > UMBRAL_PSI_DEFECTO
+
+
+def test_psi_de_categorias():
+    generador = np.random.default_rng(4)
+    categorias, pesos = ["A", "B", "C", "D"], [0.4, 0.3, 0.2, 0.1]
+    referencia = sketch(ContadorCategorias, generador.choice(categorias, 20_000, p=pesos))
+    misma = comparar(referencia, sketch(ContadorCategorias, generador.choice(categorias, 20_000, p=pesos)))
+    nueva = comparar(referencia, sketch(ContadorCategorias,
+                                        generador.choice(categorias + ["E"], 20_000, p=[0.2, 0.2, 0.1, 0.1, 0.4])))
+
+    assert misma["psi"] < 0.01 and misma["nuevas"] == {}
+    assert nueva["psi"] > UMBRAL_PSI_DEFECTO
+    assert nueva["nuevas"]["E"] == pytest.approx(0.4, abs=0.02)
@@ -0,0 +1,106 @@
+# tests/test_feature_store.py
+"""
+Almacén de features por cajero (feature_store): las features O(1) de los
+buffers circulares con sumas acumuladas deben coincidir con las recalculadas
+desde cero (construir_features) sobre una secuencia con huecos, correcciones
+del último día y un hueco largo que reinicia el historial.
+"""
+import random
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+
+from src.retiro_atm.service.feature_store import AlmacenFeaturesAtm
+from src.retiro_atm.service.features_retiro_atm import VENTANA_HISTORIAL, construir_features
+
+CAJEROS = {"ATM-1": (1, 0), "ATM-2": (3, 1), "ATM-3": (2, 2)}
+
+
+class Referencia:
+    """Historial completo por cajero, del que se recalcula la ventana desde cero"""
+
+    def __init__(self):
+        self.retiros = {}
+        self.inicio = {}
+        self.ultima = {}
+
+    def registrar(self, id_cajero: str, fecha: date, retiro: float) -> None:
+        ultima = self.ultima.get(id_cajero)
+        # Un hueco de toda la ventana reinicia el historial del cajero
+        if ultima is None or (fecha - ultima).days - 1 >= VENTANA_HISTORIAL:
+            self.retiros[id_cajero] = {}
+            self.inicio[id_cajero] = fecha
+        self.retiros[id_cajero][fecha] = retiro
+        self.ultima[id_cajero] = fecha
+
+    def disponible(self, id_cajero: str, fecha: date) -> bool:
+        return (self.ultima[id_cajero] == fecha - timedelta(days=1)
+                and (fecha - self.inicio[id_cajero]).days >= VENTANA_HISTORIAL)
+
+    def features(self, id_cajero: str, fecha: date) -> np.ndarray:
+        # Los días sin registro dentro de la ventana valen 0
+        historial = np.array([[
+            self.retiros[id_cajero].get(fecha - timedelta(days=VENTANA_HISTORIAL - k), 0.0)
+            for k in range(VENTANA_HISTORIAL)
+        ]])
+        ubicacion, ambiente = CAJEROS[id_cajero]
+        return construir_features(historial, fecha, 0, np.array([ubicacion]), np.array([ambiente]))
+
+
+def test_features_incrementales_coinciden_con_la_ventana_recalculada():
+    generador = random.Random(8)
+    almacen, referencia = AlmacenFeaturesAtm(capacidad=1), Referencia()
+    fechas = {id_cajero: date(2024, 1, 1) for id_cajero in CAJEROS}
+    comparadas = reinicios = 0
+
+    for paso in range(400):
+        id_cajero = generador.choice(list(CAJEROS))
+        fecha = fechas[id_cajero]
+        sorteo = generador.random()
+        if paso and sorteo < 0.1:
+            # Corrección del último día registrado
+            fecha -= timedelta(days=1)
+        elif sorteo < 0.25:
+            fecha += timedelta(days=generador.randint(1, 4))
+        elif sorteo < 0.27:
+            fecha += timedelta(days=generador.randint(VENTANA_HISTORIAL, VENTANA_HISTORIAL + 5))
+            reinicios += id_cajero in referencia.ultima
+        if id_cajero not in referencia.ultima and fecha < fechas[id_cajero]:
+            fecha = fechas[id_cajero]
+        retiro = round(generador.uniform(0, 50_000), 2) if generador.random() > 0.05 else 0.0
+
+        ubicacion, ambiente = CAJEROS[id_cajero]
+        almacen.registrar(id_cajero, fecha, retiro, ubicacion, ambiente)
+        referencia.registrar(id_cajero, fecha, retiro)
+        fechas[id_cajero] = fecha + timedelta(days=1)
+
+        siguiente = fecha + timedelta(days=1)
+        if referencia.disponible(id_cajero, siguiente):
+            np.testing.assert_allclose(almacen.features([id_cajero], siguiente),
+                                       referencia.features(id_cajero, siguiente), rtol=1e-9, atol=1e-6)
+            comparadas += 1
+        else:
+            with pytest.raises(ValueError):
+                almacen.features([id_cajero], siguiente)
+
+    assert comparadas > 100 and reinicios > 0
+
+
+def test_snapshot_conserva_las_features(tmp_path):
+    generador = random.Random(3)
+    almacen = AlmacenFeaturesAtm()
+    inicio = date(2024, 3, 1)
+    for id_cajero, (ubicacion, ambiente) in CAJEROS.items():
+        for dia in range(30):
+            if generador.random() > 0.2:
+                almacen.registrar(id_cajero, inicio + timedelta(days=dia), generador.uniform(0, 9000),
+                                  ubicacion, ambiente)
+        almacen.registrar(id_cajero, inicio + timedelta(days=30), generador.uniform(0, 9000))
+
+    ruta = str(tmp_path / "almacen.npz")
+    almacen.guardar(ruta)
+    cargado = AlmacenFeaturesAtm.cargar(ruta)
+    fecha = inicio + timedelta(days=31)
+    np.testing.assert_allclose(cargado.features(list(CAJEROS), fecha), almacen.features(list(CAJEROS), fecha),
+                               rtol=1e-9, atol=1e-6)
@@ -0,0 +1,107 @@
+# tests/test_incremental.py
+"""
+Índice incremental de morosidad: solo se recalculan los clientes nuevos o
+con features distintas, con ids repetidos gana la última aparición, el índice
+de otra versión del modelo (u otro orden de columnas) se descarta y las
+corridas simultáneas se fusionan al guardar.
+"""
+import io
+import json
+
+import numpy as np
+import pytest
+
+from morosidad.service import incremental_service
+from morosidad.service.incremental_service import EjecucionIncremental, IndiceIncremental
+from morosidad.service.streaming_service import puntuar_stream
+
+
+@pytest.fixture
+def ruta_indice(tmp_path, monkeypatch):
+    ruta = str(tmp_path / "indice_incremental.npz")
+    monkeypatch.setenv("BANKMIND_INCREMENTAL_INDICE_MOROSIDAD", ruta)
+    return ruta
+
+
+def correr(filas):
+    """Corre una puntuación incremental sobre `filas` (NDJSON) y devuelve las líneas por id"""
+    cuerpo = "".join(json.dumps(fila) + "\n" for fila in filas).encode("utf-8")
+    lineas = "".join(puntuar_stream(io.BytesIO(cuerpo), "ndjson", "id_cliente", incremental=True))
+    return {resultado["id"]: resultado for resultado in map(json.loads, lineas.splitlines())}
+
+
+def arreglos(*valores, dtype=np.uint64):
+    return np.array(valores, dtype=dtype)
+
+
+def test_solo_se_recalcula_la_fila_que_cambio(modelos, payloads, ruta_indice):
+    cartera = [{"id_cliente": f"C{i}", **fila} for i, fila in enumerate(payloads["morosidad"])]
+    primera = correr(cartera)
+    assert all(resultado["recalculada"] for resultado in primera.values())
+
+    cambiada = [dict(fila) for fila in cartera]
+    cambiada[7]["PAY_0"] = cambiada[7]["PAY_0"] + 1
+    segunda = correr(cambiada)
+
+    assert [id_ for id_, resultado in segunda.items() if resultado["recalculada"]] == ["C7"]
+    for id_, resultado in segunda.items():
+        if id_ != "C7":
+            assert resultado["probabilidad_default"] == primera[id_]["probabilidad_default"]
+
+    # La fila cambiada quedó guardada con sus nuevas features
+    assert not any(resultado["recalculada"] for resultado in correr(cambiada).values())
+
+
+def test_con_ids_repetidos_gana_la_ultima_aparicion():
+    indice = IndiceIncremental("v1")
+    indice.actualizar(arreglos(5, 3, 5), arreglos(50, 30, 51), np.array([False, True, True]),
+                      np.array([0.1, 0.3, 0.9]))
+    indice.actualizar(arreglos(3), arreglos(31), np.array([False]), np.array([0.2]))
+
+    assert indice.ids.tolist() == [3, 5]
+    assert indice.huellas.tolist() == [31, 51]
+    assert indice.defaults.tolist() == [False, True]
+    assert indice.probabilidades.tolist() == [0.2, 0.9]
+    vigentes, _, probabilidades = indice.buscar(arreglos(5, 5, 4), arreglos(51, 50, 40))
+    assert vigentes.tolist() == [True, False, False]
+    assert probabilidades[0] == 0.9
+
+
+def test_otra_version_u_otro_esquema_descartan_el_indice(tmp_path, monkeypatch):
+    ruta = str(tmp_path / "indice.npz")
+    indice = IndiceIncremental("v1")
+    indice.actualizar(arreglos(1, 2), arreglos(10, 20), np.array([False, True]), np.array([0.1, 0.8]))
+    indice.guardar(ruta)
+
+    assert len(IndiceIncremental.cargar(ruta, "v1")) == 2
+    assert len(IndiceIncremental.cargar(ruta, "v2")) == 0
+    monkeypatch.setattr(incremental_service, "ESQUEMA", incremental_service.ESQUEMA + 1)
+    assert len(IndiceIncremental.cargar(ruta, "v1")) == 0
+
+
+def test_corridas_simultaneas_se_fusionan_al_guardar(tmp_path):
+    ruta = str(tmp_path / "indice.npz")
+    # Las dos corridas empiezan con el índice vacío
+    primera, segunda = EjecucionIncremental("v1", ruta), EjecucionIncremental("v1", ruta)
+    primera.registrar(arreglos(1, 2), arreglos(10, 20), np.array([False, False]), np.array([0.1, 0.2]), 0)
+    segunda.registrar(arreglos(2, 3), arreglos(21, 30), np.array([True, False]), np.array([0.7, 0.3]), 0)
+    primera.guardar()
+    segunda.guardar()
+
+    indice = IndiceIncremental.cargar(ruta, "v1")
+    assert indice.ids.tolist() == [1, 2, 3]
+    # El id 2 queda con lo que guardó la última corrida
+    assert indice.huellas.tolist() == [10, 21, 30]
+    assert indice.probabilidades.tolist() == [0.1, 0.7, 0.3]
+
+
+def test_indice_de_otra_version_del_modelo_recalcula_todo(modelos, payloads, ruta_indice):
+    cartera = [{"id_cliente": f"C{i}", **fila} for i, fila in enumerate(payloads["morosidad"])]
+    correr(cartera)
+    # El mismo índice, como si lo hubiera guardado otra versión del modelo
+    guardado = IndiceIncremental.cargar(ruta_indice, modelos.version("morosidad").version)
+    assert len(guardado) == len(cartera)
+    guardado.version = "otra_version"
+    guardado.guardar(ruta_indice)
+
+    assert all(resultado["recalculada"] for resultado in correr(cartera).values())
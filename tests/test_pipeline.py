@@ -0,0 +1,105 @@
+# tests/test_pipeline.py
+"""
+Paridad del pipeline compilado (core.pipeline) con los caminos anteriores de
+cada modelo: la matriz de features y las probabilidades del camino por lotes,
+del de una fila y del columnar deben coincidir con las del código pandas/NumPy
+que reemplazaron.
+"""
+import numpy as np
+import pandas as pd
+
+from fraude.schema.inputs import FraudInput
+from morosidad.schema import MorosidadRequest
+from morosidad.service.morosidad_service import COLUMNAS_MODELO as COLUMNAS_MOROSIDAD
+from morosidad.service.morosidad_service import PIPELINE as PIPELINE_MOROSIDAD
+from src.retiro_atm.schema import InputDataRetiroAtm
+from src.retiro_atm.service.features_retiro_atm import PIPELINE as PIPELINE_RETIRO
+
+TOLERANCIA = 1e-9
+
+# Orden de columnas que armaba a mano predecir_retiro_lote antes del pipeline
+COLUMNAS_RETIRO_ANTERIOR = [
+    "dia_semana", "quincena", "semana_mes", "dia_mes", "lag1", "lag5", "lag7", "lag11",
+    "tendencia_lags", "esFeriado", "caida_reciente", "volatilidad_reciente", "media_movil_3d",
+    "retiros_finde_anterior", "lunes_post_finde_bajo", "domingo_bajo", "ubicacion", "ambiente",
+]
+
+
+def caminos(pipeline, filas):
+    """Matrices del camino por lotes, del de una fila (fila a fila) y de transformar"""
+    lote = pipeline.lote(filas)
+    por_fila = np.vstack([pipeline.fila(fila).copy() for fila in filas])
+    una = pipeline.transformar(filas[:1]).copy()
+    return lote, por_fila, una
+
+
+def assert_iguales(obtenido, esperado, tolerancia=TOLERANCIA):
+    np.testing.assert_allclose(np.asarray(obtenido, dtype=float), np.asarray(esperado, dtype=float),
+                               rtol=tolerancia, atol=tolerancia, equal_nan=True)
+
+
+def columnas(filas, nombres):
+    return {nombre: np.array([fila[nombre] for fila in filas]) for nombre in nombres}
+
+
+def test_fraude(modelos, payloads):
+    servicio = modelos.obtener("fraude")
+    assert servicio.pipeline is not None
+    entradas = [FraudInput(**fila) for fila in payloads["fraude"]]
+    referencia = servicio._features_pandas(entradas)
+
+    lote, por_fila, una = caminos(servicio.pipeline, entradas)
+    for matriz in (lote, por_fila):
+        assert_iguales(matriz, referencia)
+    assert_iguales(una, referencia[:1])
+    columnar = servicio.pipeline.lote_columnar(columnas(payloads["fraude"], FraudInput.model_fields))[0]
+    assert_iguales(columnar, referencia)
+
+    esperadas, anomalias_esperadas = servicio._puntuar_pandas(referencia)
+    obtenidas, anomalias = servicio._puntuar_pandas(lote)
+    assert_iguales(obtenidas, esperadas)
+    assert_iguales(anomalias, anomalias_esperadas)
+
+
+def test_fuga(modelos, payloads):
+    servicio = modelos.obtener("fuga")
+    assert servicio.pipeline is not None
+    filas = payloads["fuga"]
+    referencia = servicio.preprocess_batch(filas)
+
+    lote, por_fila, una = caminos(servicio.pipeline, filas)
+    for matriz in (lote, por_fila):
+        assert_iguales(matriz, referencia)
+    assert_iguales(una, referencia[:1])
+    assert_iguales(servicio.pipeline.lote_columnar(columnas(filas, filas[0]))[0], referencia)
+
+    assert_iguales(servicio.model.predict_proba(lote), servicio.model.predict_proba(referencia))
+
+
+def test_morosidad(modelos, payloads):
+    modelo = modelos.obtener("morosidad")
+    entradas = [MorosidadRequest(**fila) for fila in payloads["morosidad"]]
+    # Camino anterior de predecir_morosidad_lote
+    referencia = pd.DataFrame([entrada.model_dump() for entrada in entradas], columns=COLUMNAS_MOROSIDAD)
+
+    lote, por_fila, una = caminos(PIPELINE_MOROSIDAD, entradas)
+    for matriz in (lote, por_fila):
+        assert_iguales(matriz, referencia.to_numpy(dtype=float))
+    assert_iguales(una, referencia.to_numpy(dtype=float)[:1])
+
+    obtenidas = modelo.predict_proba(pd.DataFrame(lote, columns=COLUMNAS_MOROSIDAD))
+    assert_iguales(obtenidas, modelo.predict_proba(referencia))
+
+
+def test_retiro_atm(modelos, payloads):
+    servicio = modelos.obtener("retiro_atm")
+    entradas = [InputDataRetiroAtm(**fila) for fila in payloads["retiro_atm"]]
+    referencia = np.array([[getattr(entrada, nombre) for nombre in COLUMNAS_RETIRO_ANTERIOR] for entrada in entradas])
+
+    lote, por_fila, una = caminos(PIPELINE_RETIRO, entradas)
+    for matriz in (lote, por_fila):
+        assert_iguales(matriz, referencia)
+    assert_iguales(una, referencia[:1])
+
+    assert_iguales(servicio.predecir_features(lote), servicio.predecir_features(referencia))
+
@@ -0,0 +1,67 @@
+# tests/test_trabajos.py
+"""
+Cancelación de trabajos asíncronos (core.trabajos) frente al arranque del
+trabajo en el pool: un trabajo cancelado termina "cancelado", nunca "fallido".
+"""
+import io
+import threading
+import time
+
+import pytest
+
+from core.trabajos import GestorTrabajos, registrar_trabajo
+
+MODELO = "prueba_trabajo"
+
+
+def procesar(archivo, formato):
+    for linea in archivo:
+        yield linea.decode("utf-8")
+
+
+@pytest.fixture
+def gestor(tmp_path):
+    registrar_trabajo(MODELO, procesar, ("ndjson",))
+    return GestorTrabajos(directorio=str(tmp_path), max_concurrentes=1, max_cola=4)
+
+
+def crear(gestor: GestorTrabajos):
+    return gestor.crear(MODELO, io.BytesIO(b'{"a": 1}\n{"a": 2}\n{"a": 3}\n'), formato="ndjson")
+
+
+def test_completado(gestor):
+    trabajo = crear(gestor)
+    gestor._ejecutar(trabajo)
+    assert gestor.obtener(trabajo.id)["estado"] == "completado"
+    with open(gestor.ruta_resultado(trabajo.id), encoding="utf-8") as archivo:
+        assert archivo.read().count("\n") == 3
+
+
+def test_cancelado_en_cola_no_se_ejecuta(gestor):
+    trabajo = crear(gestor)
+    assert gestor.cancelar(trabajo.id)["estado"] == "cancelado"
+    gestor._ejecutar(trabajo)
+    assert gestor.obtener(trabajo.id)["estado"] == "cancelado"
+
+
+def test_cancelar_mientras_arranca(gestor, monkeypatch):
+    trabajo = crear(gestor)
+    cancelacion = threading.Thread(target=gestor.cancelar, args=(trabajo.id,))
+    cancelado_original = gestor._cancelado
+    llamadas = []
+
+    def cancelado(t):
+        # Primera verificación de _ejecutar: la cancelación llega justo después
+        if not llamadas:
+            llamadas.append(1)
+            cancelacion.start()
+            time.sleep(0.05)
+            return False
+        return cancelado_original(t)
+
+    monkeypatch.setattr(gestor, "_cancelado", cancelado)
+    gestor._ejecutar(trabajo)
+    cancelacion.join()
+
+    descripcion = gestor.obtener(trabajo.id)
+    assert descripcion["estado"] == "cancelado", descripcion["error"]